@@ -1,20 +1,41 @@
 import os
 import json
-from tkinter import (
-    Tk,
-    Label,
-    Button,
-    Entry,
-    StringVar,
-    IntVar,
-    BooleanVar,
-    Text,
-    END,
-    DISABLED,
-    NORMAL,
-    filedialog,
-    messagebox,
-)
+import asyncio
+import functools
+import importlib.util
+import io
+import itertools
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack, contextmanager, nullcontext
+from queue import Empty, Full, Queue
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, TimeoutError as FutureTimeoutError, wait
+
+try:
+    from tkinter import (
+        Tk,
+        Label,
+        Button,
+        Entry,
+        StringVar,
+        IntVar,
+        BooleanVar,
+        Text,
+        END,
+        DISABLED,
+        NORMAL,
+        filedialog,
+        messagebox,
+    )
+except ImportError:  # pragma: no cover
+    # Headless servers often ship Python without Tk; the CLI still works.
+    Tk = Label = Button = Entry = StringVar = IntVar = BooleanVar = Text = None
+    END = DISABLED = NORMAL = filedialog = messagebox = None
 
 try:
     from dotenv import load_dotenv
@@ -28,39 +49,1662 @@ try:
 except ImportError:  # pragma: no cover
     ttk = None
 
+# MoviePy, NumPy, Pillow and the AI SDKs take seconds to import, so they
+# are loaded on first use by the load_* functions below. Until then (or if
+# they are missing) these names are None.
 moviepy_import_error = None
-try:
-    from moviepy.editor import VideoFileClip, concatenate_videoclips, CompositeVideoClip, ImageClip
-except Exception as e:  # pragma: no cover
-    # Store the original import error so we can show it in the GUI
-    moviepy_import_error = e
-    VideoFileClip = None
-    concatenate_videoclips = None
-    CompositeVideoClip = None
-    ImageClip = None
+VideoFileClip = concatenate_videoclips = CompositeVideoClip = ImageClip = None
+np = None
+Image = ImageColor = ImageDraw = ImageFont = None
+OpenAI = AsyncOpenAI = None
+genai = None
 
-try:
-    from PIL import Image, ImageDraw, ImageFont
-    PIL_AVAILABLE = True
-except ImportError:  # pragma: no cover
-    Image = None
-    ImageDraw = None
-    ImageFont = None
-    PIL_AVAILABLE = False
+_import_lock = threading.Lock()
+_missing_modules: set[str] = set()
 
-try:
-    from openai import OpenAI
-except ImportError:  # pragma: no cover
-    OpenAI = None
 
-try:
-    import google.generativeai as genai
-except ImportError:  # pragma: no cover
-    genai = None
+def module_available(name: str) -> bool:
+    """Whether `name` could be imported, without importing it."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def load_moviepy() -> bool:
+    """Import MoviePy (and NumPy) on first use.
+
+    Returns False if it can't be imported; the original error is kept in
+    `moviepy_import_error` so it can be shown to the user.
+    """
+    global VideoFileClip, concatenate_videoclips, CompositeVideoClip, ImageClip, np, moviepy_import_error
+    with _import_lock:
+        if VideoFileClip is None and moviepy_import_error is None:
+            try:
+                import numpy as np
+                from moviepy.editor import VideoFileClip, concatenate_videoclips, CompositeVideoClip, ImageClip
+            except Exception as e:
+                moviepy_import_error = e
+    return VideoFileClip is not None
+
+
+def load_pil() -> bool:
+    """Import Pillow (and NumPy, used by the thumbnail renderer) on first use."""
+    global Image, ImageColor, ImageDraw, ImageFont, np
+    with _import_lock:
+        if Image is None and "PIL" not in _missing_modules:
+            try:
+                import numpy as np
+                from PIL import Image, ImageColor, ImageDraw, ImageFont
+            except ImportError:
+                _missing_modules.add("PIL")
+    return Image is not None
+
+
+def load_openai() -> bool:
+    """Import the OpenAI SDK on first use."""
+    global OpenAI, AsyncOpenAI
+    with _import_lock:
+        if OpenAI is None and "openai" not in _missing_modules:
+            try:
+                from openai import OpenAI, AsyncOpenAI
+            except ImportError:
+                _missing_modules.add("openai")
+    return OpenAI is not None
+
+
+def load_genai() -> bool:
+    """Import the Google Generative AI SDK on first use."""
+    global genai
+    with _import_lock:
+        if genai is None and "google.generativeai" not in _missing_modules:
+            try:
+                import google.generativeai as genai
+            except ImportError:
+                _missing_modules.add("google.generativeai")
+    return genai is not None
+
+
+class TaskScheduler:
+    """Run a small DAG of tasks, each on a named worker pool.
+
+    A task starts as soon as all of its dependencies have finished, so
+    independent work (e.g. one clip's thumbnail and the next clip's render)
+    overlaps instead of running stage by stage. Every pool has its own
+    concurrency limit, which keeps CPU-heavy renders apart from
+    network-bound AI calls.
+
+    When several tasks in a pool are ready, the one added first wins. Adding
+    tasks clip by clip therefore finishes early clips before starting late
+    ones.
+    """
+
+    def __init__(
+        self,
+        pools: dict[str, int],
+        shared_limits: dict | None = None,
+        on_task_done=None,
+        cancel_event: threading.Event | None = None,
+    ) -> None:
+        """`pools` maps pool name -> worker count.
+
+        `shared_limits` optionally maps a pool name to a semaphore held while
+        each of its tasks runs, to cap a pool across several schedulers.
+        `on_task_done(name, error)` is called from the thread running `run`
+        whenever a task finishes, fails or is skipped. Once `cancel_event` is
+        set no new task starts; tasks already running are waited for.
+        """
+        self.pools = {name: max(1, int(size)) for name, size in pools.items()}
+        self.shared_limits = shared_limits or {}
+        self.on_task_done = on_task_done
+        self.cancel_event = cancel_event
+        self.results: dict[str, object] = {}
+        self.errors: dict[str, BaseException] = {}
+        self._tasks: dict[str, tuple] = {}
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def _call(self, name: str, pool: str, func, args):
+        with tracer.span(name, pool=pool):
+            limit = self.shared_limits.get(pool)
+            if limit is None:
+                return func(*args)
+            with limit:
+                return func(*args)
+
+    def _finished(self, name: str) -> None:
+        if self.on_task_done is not None:
+            self.on_task_done(name, self.errors.get(name))
+
+    def add(self, name: str, func, deps: tuple | list = (), pool: str = "io") -> str:
+        """Register `func` as task `name`.
+
+        `func` is called with the results of `deps` as positional arguments,
+        in the order they are listed. Dependencies must already be registered,
+        which also guarantees the graph has no cycles.
+        """
+        if name in self._tasks:
+            raise ValueError(f"Duplicate task name: {name}")
+        if pool not in self.pools:
+            raise ValueError(f"Unknown worker pool: {pool}")
+        for dep in deps:
+            if dep not in self._tasks:
+                raise ValueError(f"Task {name!r} depends on unknown task {dep!r}")
+        self._tasks[name] = (func, tuple(deps), pool)
+        return name
+
+    def run(self) -> dict[str, object]:
+        """Execute every registered task and wait for all of them.
+
+        Failures do not stop the run: the exception is stored in `errors` and
+        every task that depends on the failed one is skipped (its entry in
+        `errors` is a RuntimeError naming the failed dependency).
+
+        Returns the `results` dict (task name -> return value).
+        """
+        executors = {
+            pool: ThreadPoolExecutor(max_workers=size, thread_name_prefix=f"{pool}-worker")
+            for pool, size in self.pools.items()
+        }
+        pending = dict(self._tasks)
+        running: dict = {}
+        busy = {pool: 0 for pool in self.pools}
+
+        try:
+            while pending or running:
+                # Insertion order is a topological order, so a single pass also
+                # propagates skips down a chain of failed dependencies.
+                for name in list(pending):
+                    func, deps, pool = pending[name]
+                    if self.cancel_event is not None and self.cancel_event.is_set():
+                        self.errors[name] = RuntimeError("Cancelled")
+                        del pending[name]
+                        self._finished(name)
+                        continue
+                    failed = [dep for dep in deps if dep in self.errors]
+                    if failed:
+                        self.errors[name] = RuntimeError(f"Skipped: dependency {failed[0]!r} failed")
+                        del pending[name]
+                        self._finished(name)
+                        continue
+                    if busy[pool] >= self.pools[pool]:
+                        continue
+                    if all(dep in self.results for dep in deps):
+                        args = [self.results[dep] for dep in deps]
+                        future = executors[pool].submit(self._call, name, pool, func, args)
+                        running[future] = (name, pool)
+                        busy[pool] += 1
+                        del pending[name]
+
+                if not running:
+                    break
+
+                finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name, pool = running.pop(future)
+                    busy[pool] -= 1
+                    try:
+                        self.results[name] = future.result()
+                    except Exception as exc:
+                        self.errors[name] = exc
+                    self._finished(name)
+        finally:
+            for executor in executors.values():
+                executor.shutdown(wait=True)
+
+        return self.results
+
+
+class Metrics:
+    """Per-stage timings, byte and error counts for this process.
+
+    Stages (extract_audio, upload, transcribe, identify, render, subtitle,
+    split, thumbnail, hashtags) are recorded with `record` or `timed`; every
+    MoviePy encode also adds frames and media seconds, from which encode fps
+    and the realtime factor are derived, and every AI request made through
+    AICallGuard adds a latency sample per provider.
+
+    Nothing is written until `configure` points it at a directory. Then each
+    sample is appended to `clips-<instance>.jsonl` and the aggregates are
+    rewritten to `clips-<instance>.prom` (Prometheus text format, for the
+    node exporter's textfile collector) at most every TEXTFILE_INTERVAL
+    seconds and on `export`. `instance` keeps processes from overwriting
+    each other's files and is exported as the `worker` label.
+    """
+
+    PERCENTILES = (0.5, 0.9, 0.99)
+
+    # Latency samples kept per series for the percentiles
+    MAX_SAMPLES = 1000
+
+    TEXTFILE_INTERVAL = 15.0
+
+    def __init__(self) -> None:
+        self.directory = None
+        self.instance = "app"
+        self._lock = threading.Lock()
+        self._jsonl = None
+        self._last_export = 0.0
+        self._reset()
+
+    def _reset(self) -> None:
+        self._stages: dict[str, dict] = {}
+        self._ai: dict[str, dict] = {}
+        self._encode = {"frames": 0, "seconds": 0.0, "media_seconds": 0.0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    def configure(self, directory: str | None, instance: str = "app") -> None:
+        """Start writing to `directory` (None stops). Counters start from zero."""
+        with self._lock:
+            if self._jsonl is not None:
+                self._jsonl.close()
+                self._jsonl = None
+            self._reset()
+            self.directory = directory
+            self.instance = instance
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+                self._jsonl = open(
+                    os.path.join(directory, f"clips-{instance}.jsonl"), "a", encoding="utf-8", buffering=1
+                )
+
+    @staticmethod
+    def _series() -> dict:
+        return {"count": 0, "seconds": 0.0, "bytes": 0, "errors": 0, "samples": deque(maxlen=Metrics.MAX_SAMPLES)}
+
+    def _write_line(self, sample: dict) -> None:
+        # Caller holds the lock
+        if self._jsonl is not None:
+            self._jsonl.write(json.dumps(sample, ensure_ascii=False) + "\n")
+
+    def _maybe_export(self) -> None:
+        if self.enabled and time.monotonic() - self._last_export >= self.TEXTFILE_INTERVAL:
+            self.export()
+
+    def record(self, stage: str, seconds: float, bytes: int = 0, error: bool = False, **extra) -> None:
+        """Record one run of `stage`. `extra` fields only go to the JSON line."""
+        with self._lock:
+            series = self._stages.setdefault(stage, self._series())
+            series["count"] += 1
+            series["seconds"] += seconds
+            series["bytes"] += bytes or 0
+            series["errors"] += bool(error)
+            series["samples"].append(seconds)
+            self._write_line(
+                {
+                    "ts": time.time(),
+                    "worker": self.instance,
+                    "stage": stage,
+                    "seconds": round(seconds, 4),
+                    "bytes": bytes or 0,
+                    "error": bool(error),
+                    **extra,
+                }
+            )
+        self._maybe_export()
+
+    @contextmanager
+    def timed(self, stage: str, **extra):
+        """Time the block as `stage`. Set 'bytes' (or other fields) on the yielded dict.
+
+        An exception in the block is recorded as an error and re-raised.
+        """
+        fields = dict(extra)
+        started = time.perf_counter()
+        try:
+            yield fields
+        except BaseException as exc:
+            if isinstance(exc, (RenderCancelled, PipelineCancelled)):
+                fields["cancelled"] = True
+            else:
+                fields["error"] = True
+                fields.setdefault("message", str(exc))
+            raise
+        finally:
+            self.record(stage, time.perf_counter() - started, **fields)
+
+    def record_encode(
+        self, stage: str, seconds: float, frames: int, media_seconds: float, bytes: int = 0, **extra
+    ) -> None:
+        """Record a finished encode, adding its fps and realtime factor to the JSON line."""
+        with self._lock:
+            self._encode["frames"] += frames
+            self._encode["seconds"] += seconds
+            self._encode["media_seconds"] += media_seconds
+        self.record(
+            stage,
+            seconds,
+            bytes=bytes,
+            frames=frames,
+            fps=round(frames / seconds, 2) if seconds else 0.0,
+            realtime_factor=round(media_seconds / seconds, 3) if seconds else 0.0,
+            **extra,
+        )
+
+    def record_ai(self, provider: str, model: str, seconds: float, error: bool = False) -> None:
+        """Record one AI request attempt (retries count separately)."""
+        with self._lock:
+            series = self._ai.setdefault(provider, self._series())
+            series["count"] += 1
+            series["seconds"] += seconds
+            series["errors"] += bool(error)
+            series["samples"].append(seconds)
+            self._write_line(
+                {
+                    "ts": time.time(),
+                    "worker": self.instance,
+                    "stage": "ai_request",
+                    "provider": provider,
+                    "model": model,
+                    "seconds": round(seconds, 4),
+                    "error": bool(error),
+                }
+            )
+
+    def record_ai_retry(self, provider: str, model: str, delay: float, exc: BaseException) -> None:
+        """Record that a failed AI request will be retried after `delay` seconds."""
+        with self._lock:
+            self._write_line(
+                {
+                    "ts": time.time(),
+                    "worker": self.instance,
+                    "stage": "ai_retry",
+                    "provider": provider,
+                    "model": model,
+                    "delay": round(delay, 4),
+                    "message": str(exc),
+                }
+            )
+
+    @classmethod
+    def _percentiles(cls, samples) -> dict[float, float]:
+        ordered = sorted(samples)
+        if not ordered:
+            return {}
+        return {q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in cls.PERCENTILES}
+
+    def snapshot(self) -> dict:
+        """Aggregates as a JSON-friendly dict (percentiles keyed "p50" etc.)."""
+        def summarize(series: dict) -> dict:
+            summary = {key: series[key] for key in ("count", "seconds", "bytes", "errors")}
+            for q, value in self._percentiles(series["samples"]).items():
+                summary[f"p{int(q * 100)}"] = round(value, 4)
+            return summary
+
+        with self._lock:
+            encode = dict(self._encode)
+            return {
+                "stages": {stage: summarize(series) for stage, series in self._stages.items()},
+                "ai": {provider: summarize(series) for provider, series in self._ai.items()},
+                "encode": {
+                    **encode,
+                    "fps": encode["frames"] / encode["seconds"] if encode["seconds"] else 0.0,
+                    "realtime_factor": encode["media_seconds"] / encode["seconds"] if encode["seconds"] else 0.0,
+                },
+            }
+
+    def prometheus_text(self) -> str:
+        """Render the aggregates in the Prometheus text exposition format."""
+        snap = self.snapshot()
+        worker = self.instance.replace("\\", "\\\\").replace('"', '\\"')
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str, samples: list[tuple[str, dict, float]]) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for suffix, labels, value in samples:
+                label_text = ",".join([f'worker="{worker}"'] + [f'{k}="{v}"' for k, v in labels.items()])
+                lines.append(f"{name}{suffix}{{{label_text}}} {value}")
+
+        def summary(name: str, help_text: str, label: str, groups: dict) -> None:
+            samples = []
+            for key, series in groups.items():
+                for q in self.PERCENTILES:
+                    field = f"p{int(q * 100)}"
+                    if field in series:
+                        samples.append(("", {label: key, "quantile": q}, series[field]))
+                samples.append(("_sum", {label: key}, series["seconds"]))
+                samples.append(("_count", {label: key}, series["count"]))
+            metric(name, "summary", help_text, samples)
+
+        stages, ai, encode = snap["stages"], snap["ai"], snap["encode"]
+        summary("clips_stage_duration_seconds", "Wall time per pipeline stage run.", "stage", stages)
+        metric(
+            "clips_stage_bytes_total", "counter", "Bytes produced or sent per stage.",
+            [("", {"stage": stage}, series["bytes"]) for stage, series in stages.items()],
+        )
+        metric(
+            "clips_stage_errors_total", "counter", "Failed stage runs.",
+            [("", {"stage": stage}, series["errors"]) for stage, series in stages.items()],
+        )
+        metric("clips_encode_frames_total", "counter", "Video frames encoded.", [("", {}, encode["frames"])])
+        metric("clips_encode_seconds_total", "counter", "Wall time spent encoding.", [("", {}, encode["seconds"])])
+        metric(
+            "clips_encode_media_seconds_total", "counter", "Seconds of video encoded.",
+            [("", {}, encode["media_seconds"])],
+        )
+        metric("clips_encode_fps", "gauge", "Average encode speed in frames per second.", [("", {}, encode["fps"])])
+        metric(
+            "clips_encode_realtime_factor", "gauge", "Seconds of video encoded per second of wall time.",
+            [("", {}, encode["realtime_factor"])],
+        )
+        summary("clips_ai_request_duration_seconds", "Latency of AI request attempts.", "provider", ai)
+        metric(
+            "clips_ai_request_errors_total", "counter", "Failed AI request attempts.",
+            [("", {"provider": provider}, series["errors"]) for provider, series in ai.items()],
+        )
+        return "\n".join(lines) + "\n"
+
+    def export(self) -> None:
+        """Rewrite the Prometheus textfile now (atomically, for the node exporter)."""
+        if not self.enabled:
+            return
+        self._last_export = time.monotonic()
+        path = os.path.join(self.directory, f"clips-{self.instance}.prom")
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(temp_path, path)
+
+
+# Process-wide metrics; enabled by CLIPS_METRICS_DIR or the --metrics-dir option.
+metrics = Metrics()
+
+
+class Tracer:
+    """Span tracing exported as Chrome trace-event JSON (open it in Perfetto).
+
+    Off until `configure` gives it a directory. While off, `span` returns a
+    shared no-op context manager and `traced` functions call straight
+    through, so the instrumentation costs one attribute check per call.
+
+    Spans are "complete" events on the thread that ran them, so nested
+    calls nest in the viewer; coroutines interleave on one thread and use
+    `async_span` (async begin/end events) instead. `export` writes the
+    spans collected so far to `<directory>/<name>.trace.json` and starts
+    a new trace.
+    """
+
+    def __init__(self) -> None:
+        self.directory = None
+        self.process_name = "app"
+        self._lock = threading.Lock()
+        self._events: list[dict] = []
+        self._threads: set[tuple[int, int]] = set()
+        self._async_ids = itertools.count(1)
+        self._off = nullcontext()
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    def configure(self, directory: str | None, process_name: str = "app") -> None:
+        """Start collecting spans for export to `directory` (None turns tracing off)."""
+        with self._lock:
+            self.directory = directory
+            self.process_name = process_name
+            self._events = []
+            self._threads = set()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _add(self, event: dict) -> None:
+        thread = threading.current_thread()
+        key = (os.getpid(), thread.ident)
+        event["pid"], event["tid"] = key
+        with self._lock:
+            if key not in self._threads:
+                self._threads.add(key)
+                self._events.append(
+                    {"name": "thread_name", "ph": "M", "pid": key[0], "tid": key[1], "args": {"name": thread.name}}
+                )
+            self._events.append(event)
+
+    def span(self, name: str, **args):
+        """Context manager recording the block as a span; yields its args dict (None when off)."""
+        if self.directory is None:
+            return self._off
+        return self._span(name, args)
+
+    @contextmanager
+    def _span(self, name: str, args: dict):
+        started = time.time_ns()
+        try:
+            yield args
+        finally:
+            self._add(
+                {
+                    "name": name,
+                    "ph": "X",
+                    "ts": started / 1000,
+                    "dur": (time.time_ns() - started) / 1000,
+                    "args": args,
+                }
+            )
+
+    def async_span(self, name: str, **args):
+        """Like `span`, for code that awaits inside the block."""
+        if self.directory is None:
+            return self._off
+        return self._async_span(name, args)
+
+    @contextmanager
+    def _async_span(self, name: str, args: dict):
+        span_id = next(self._async_ids)
+        self._add({"name": name, "ph": "b", "cat": "async", "id": span_id, "ts": time.time_ns() / 1000, "args": args})
+        try:
+            yield args
+        finally:
+            self._add({"name": name, "ph": "e", "cat": "async", "id": span_id, "ts": time.time_ns() / 1000})
+
+    def export(self, name: str) -> str | None:
+        """Write the collected spans to `<directory>/<name>.trace.json`; returns the path."""
+        if self.directory is None:
+            return None
+        with self._lock:
+            events, self._events = self._events, []
+            self._threads = set()
+        events.insert(
+            0,
+            {"name": "process_name", "ph": "M", "pid": os.getpid(), "tid": 0, "args": {"name": self.process_name}},
+        )
+        path = os.path.join(self.directory, f"{name}.trace.json")
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        os.replace(temp_path, path)
+        return path
+
+
+# Process-wide tracer; enabled by CLIPS_TRACE_DIR or the --trace-dir option.
+tracer = Tracer()
+
+
+def traced(func):
+    """Record every call of `func` as a span named after it while tracing is on."""
+    name = func.__qualname__
+
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            if tracer.directory is None:
+                return await func(*args, **kwargs)
+            with tracer.async_span(name):
+                return await func(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if tracer.directory is None:
+            return func(*args, **kwargs)
+        with tracer.span(name):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+class StageProfiler:
+    """Opt-in cProfile, tracemalloc and RSS reports per pipeline stage.
+
+    Enabled with CLIPS_PROFILE=1 or the --profile option. Each stage
+    wrapped with `stage` (or `wrap`) writes into `<output_dir>/profile/`:
+      - `<stage>.prof`: cProfile stats for the thread that ran the stage
+        (open with `python -m pstats` or snakeviz)
+      - `<stage>.alloc.txt`: the top CLIPS_PROFILE_TOP (default 25) lines
+        by memory allocated during the stage and still held at its end
+      - a line in `summary.jsonl` with the stage's wall time, peak RSS
+        (sampled every 100 ms) and tracemalloc peak
+
+    tracemalloc and RSS are process-wide, so stages running in parallel
+    share their numbers; use --render-workers 1 for clean per-clip peaks.
+    Profiling slows everything down noticeably; it is off by default and
+    `stage` is then a no-op.
+    """
+
+    TOP_ALLOCATIONS = 25
+    RSS_SAMPLE_INTERVAL = 0.1
+
+    def __init__(self) -> None:
+        self.enabled = os.getenv("CLIPS_PROFILE", "").lower() in ("1", "true", "yes")
+        try:
+            self.top = int(os.getenv("CLIPS_PROFILE_TOP") or self.TOP_ALLOCATIONS)
+        except ValueError:
+            self.top = self.TOP_ALLOCATIONS
+        self._lock = threading.Lock()
+
+    def configure(self, enabled: bool) -> None:
+        self.enabled = enabled
+
+    @staticmethod
+    def current_rss(pid: int | str = "self") -> int | None:
+        """Resident set size of this process (or `pid`) in bytes, if the OS tells us."""
+        try:
+            with open(f"/proc/{pid}/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, AttributeError):
+            pass
+        if pid != "self":
+            return None
+        try:
+            import resource
+        except ImportError:  # Windows
+            return None
+        # No /proc (macOS): fall back to the lifetime peak, which is in bytes there
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+    def stage(self, name: str, output_dir: str):
+        """Context manager profiling the block as stage `name`."""
+        if not self.enabled:
+            return nullcontext()
+        return self._profile(name, output_dir)
+
+    def wrap(self, name: str, output_dir: str, func):
+        """Return `func` profiled as stage `name` (unchanged when profiling is off)."""
+        if not self.enabled:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self._profile(name, output_dir):
+                return func(*args, **kwargs)
+        return wrapper
+
+    @contextmanager
+    def _profile(self, name: str, output_dir: str):
+        import cProfile
+        import tracemalloc
+
+        directory = os.path.join(output_dir, "profile")
+        os.makedirs(directory, exist_ok=True)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+
+        rss_start = self.current_rss()
+        rss_peak = [rss_start or 0]
+        stop = threading.Event()
+
+        def sample_rss() -> None:
+            while not stop.wait(self.RSS_SAMPLE_INTERVAL):
+                rss_peak[0] = max(rss_peak[0], self.current_rss() or 0)
+
+        sampler = threading.Thread(target=sample_rss, name=f"rss-{name}", daemon=True)
+        sampler.start()
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows one active profiler per process
+            profile = None
+        started = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as exc:
+            error = str(exc) or type(exc).__name__
+            raise
+        finally:
+            seconds = time.perf_counter() - started
+            if profile is not None:
+                profile.disable()
+            stop.set()
+            sampler.join()
+            rss_peak[0] = max(rss_peak[0], self.current_rss() or 0)
+            _, traced_peak = tracemalloc.get_traced_memory()
+            # Snapshot before writing the .prof so the dump isn't in the report
+            after = tracemalloc.take_snapshot().filter_traces(
+                [
+                    tracemalloc.Filter(False, tracemalloc.__file__),
+                    tracemalloc.Filter(False, cProfile.__file__),
+                    tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+                ]
+            )
+            if profile is not None:
+                profile.dump_stats(os.path.join(directory, f"{name}.prof"))
+            summary = {
+                "stage": name,
+                "seconds": round(seconds, 3),
+                "rss_start": rss_start,
+                "rss_peak": rss_peak[0] or None,
+                "tracemalloc_peak": traced_peak,
+                "cpu_profile": profile is not None,
+                "error": error,
+            }
+            self._write_allocations(
+                os.path.join(directory, f"{name}.alloc.txt"),
+                summary,
+                after.compare_to(before, "lineno")[: self.top],
+            )
+            with self._lock, open(os.path.join(directory, "summary.jsonl"), "a", encoding="utf-8") as f:
+                f.write(json.dumps(summary) + "\n")
+
+    @staticmethod
+    def _write_allocations(path: str, summary: dict, stats: list) -> None:
+        def mb(value: int | None) -> str:
+            return f"{value / 1e6:.1f} MB" if value else "n/a"
+
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(
+                f"Stage {summary['stage']}: {summary['seconds']:.1f}s, "
+                f"peak RSS {mb(summary['rss_peak'])} (started at {mb(summary['rss_start'])}), "
+                f"tracemalloc peak {mb(summary['tracemalloc_peak'])}\n\n"
+                f"Top {len(stats)} lines by memory allocated during the stage and still held at its end:\n"
+            )
+            for stat in stats:
+                f.write(f"{stat}\n")
+
+
+# Process-wide profiler; enabled by CLIPS_PROFILE=1 or the --profile option.
+profiler = StageProfiler()
+
+
+class RecentItems(dict):
+    """A dict that keeps only its `maxsize` most recently added items."""
+
+    def __init__(self, maxsize: int) -> None:
+        super().__init__()
+        self.maxsize = maxsize
+
+    def __setitem__(self, key, value) -> None:
+        super().__setitem__(key, value)
+        while len(self) > self.maxsize:
+            del self[next(iter(self))]
+
+
+class AnalysisCache:
+    """The results of a per-source analysis for the `maxsize` latest keys.
+
+    get() runs the analysis once per key: callers asking for a key that is
+    being analysed wait for that run, while other keys go ahead in
+    parallel. The lock is only held to look keys up, never during a run.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self._lock = threading.Lock()
+        self._results = RecentItems(maxsize)
+        self._running: dict = {}
+
+    def get(self, key, analyse):
+        """Return the result for `key`, calling `analyse()` if there is none yet."""
+        with self._lock:
+            if key in self._results:
+                return self._results[key]
+            future = self._running.get(key)
+            owner = future is None
+            if owner:
+                future = self._running[key] = Future()
+        if not owner:
+            return future.result()
+        try:
+            result = analyse()
+        except BaseException as exc:
+            with self._lock:
+                del self._running[key]
+            future.set_exception(exc)
+            raise
+        with self._lock:
+            self._results[key] = result
+            del self._running[key]
+        future.set_result(result)
+        return result
+
+
+class RenderCancelled(RuntimeError):
+    """A render was stopped because its cancel event was set."""
+
+
+class CropTracker:
+    """Where the action is, horizontally, over the course of a source video.
+
+    track() makes one cheap pass over a source: ffmpeg decodes it at FPS
+    frames per second as a WIDTH x HEIGHT grayscale image, and NumPy finds
+    the WINDOW-wide band of columns with the most motion in each frame,
+    takes the centroid of the motion inside it, holds that through still
+    moments and smooths it into a pan path. The result is a small array (FPS
+    floats per second of video, 0 = left edge, 1 = right edge) cached per
+    file, so every clip and rendition cut from a source reuses it.
+    """
+
+    FPS = 4
+    WIDTH, HEIGHT = 160, 90
+    BLOCK = 256  # frames diffed per NumPy call
+    WINDOW = 0.3  # band searched for motion, about a 9:16 crop of a 16:9 frame
+    # Mean absolute frame difference (0-255) below which a frame counts as still
+    MOTION_THRESHOLD = 1.0
+    SMOOTHING_SECONDS = 1.0  # sigma of the Gaussian the path is smoothed with
+
+    def __init__(self) -> None:
+        self._tracks = AnalysisCache(8)
+
+    def track(self, input_path: str):
+        """Return the pan path of `input_path`, or None if it could not be analysed.
+
+        A failed analysis is recorded as an error of the "crop_track" stage
+        in `metrics`; clips of that source then use center crops.
+        """
+        stat = os.stat(input_path)
+        key = (os.path.abspath(input_path), stat.st_size, stat.st_mtime)
+        # One pass per source: concurrent renders of the same video wait for it
+        return self._tracks.get(key, lambda: self._measure(input_path))
+
+    def _measure(self, input_path: str):
+        with metrics.timed("crop_track", source=os.path.basename(input_path)) as sample:
+            try:
+                track = self._analyse(input_path)
+            except (OSError, RuntimeError) as exc:
+                sample["error"] = True
+                sample["message"] = str(exc)
+                return None
+            sample["samples"] = len(track)
+            return track
+
+    def _analyse(self, input_path: str):
+        if not load_moviepy():
+            raise RuntimeError(f"MoviePy could not be imported. Details: {moviepy_import_error!r}")
+        from moviepy.config import get_setting
+
+        frame_size = self.WIDTH * self.HEIGHT
+        proc = subprocess.Popen(
+            [
+                get_setting("FFMPEG_BINARY"), "-loglevel", "error", "-nostats", "-i", input_path, "-an",
+                "-vf", f"fps={self.FPS},scale={self.WIDTH}:{self.HEIGHT}",
+                "-pix_fmt", "gray", "-f", "rawvideo", "pipe:1",
+            ],
+            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+        columns = np.arange(self.WIDTH, dtype=np.float32) / (self.WIDTH - 1)
+        band = int(self.WIDTH * self.WINDOW)
+        offsets = np.arange(band)
+        centers = []
+        previous = None
+        try:
+            while True:
+                data = proc.stdout.read(self.BLOCK * frame_size)
+                if len(data) < frame_size:
+                    break
+                block = np.frombuffer(data, np.uint8)[: len(data) // frame_size * frame_size]
+                block = block.reshape(-1, self.HEIGHT, self.WIDTH).astype(np.int16)
+                if previous is None:
+                    centers.append(np.nan)
+                else:
+                    block = np.concatenate([previous, block])
+                previous = block[-1:]
+                # Motion per column, minus each frame's noise floor
+                energy = np.abs(np.diff(block, axis=0)).sum(axis=1, dtype=np.float32)
+                energy = np.maximum(energy - np.median(energy, axis=1, keepdims=True), 0)
+                moving = energy.sum(axis=1) > self.MOTION_THRESHOLD * frame_size
+                # The busiest band, so motion elsewhere doesn't drag the crop off its subject
+                cumulative = np.concatenate([np.zeros((len(energy), 1), np.float32), energy.cumsum(axis=1)], axis=1)
+                start = (cumulative[:, band:] - cumulative[:, :-band]).argmax(axis=1)
+                inside = np.take_along_axis(energy, start[:, None] + offsets, axis=1)
+                centroid = (inside * columns[start[:, None] + offsets]).sum(axis=1) / np.maximum(inside.sum(axis=1), 1)
+                centers.extend(np.where(moving, centroid, np.nan))
+            errors = proc.stderr.read()
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+            proc.wait()
+        if proc.returncode != 0:
+            raise RuntimeError(errors.decode(errors="replace").strip() or f"ffmpeg exited with {proc.returncode}")
+        if not centers:
+            raise RuntimeError("no frames decoded")
+
+        path = np.asarray(centers, dtype=np.float32)
+        # Hold the last position through still stretches (center before any motion)
+        valid = ~np.isnan(path)
+        if not valid.any():
+            return np.full(len(path), 0.5, dtype=np.float32)
+        held = np.where(valid, np.arange(len(path)), 0)
+        np.maximum.accumulate(held, out=held)
+        path = np.where(valid[held], path[held], path[valid.argmax()])
+        # A running median drops one-off jumps, the Gaussian turns steps into pans
+        window = np.lib.stride_tricks.sliding_window_view(np.pad(path, 2, mode="edge"), 5)
+        path = np.median(window, axis=1)
+        sigma = self.SMOOTHING_SECONDS * self.FPS
+        radius = int(3 * sigma)
+        kernel = np.exp(-0.5 * (np.arange(-radius, radius + 1) / sigma) ** 2)
+        path = np.convolve(np.pad(path, radius, mode="edge"), kernel / kernel.sum(), mode="valid")
+        return path.astype(np.float32)
+
+    def clip_track(self, input_path: str, start: float, end: float, before: float = 0.0, after: float = 0.0):
+        """The pan path of a clip's output: `start`..`end` of the source, with
+        `before`/`after` seconds (intro and outro) held at the center.
+
+        Sampled at FPS like track(); None if the source could not be analysed.
+        """
+        track = self.track(input_path)
+        if track is None:
+            return None
+        times = np.arange(start, end, 1.0 / self.FPS)
+        return np.concatenate([
+            np.full(round(before * self.FPS), 0.5, dtype=np.float32),
+            np.interp(times * self.FPS, np.arange(len(track)), track).astype(np.float32),
+            np.full(round(after * self.FPS), 0.5, dtype=np.float32),
+        ])
+
+
+crop_tracker = CropTracker()
+
+
+class LoudnessIndex:
+    """Loudness of a media file's audio, RATE values per second.
+
+    One ffmpeg pass over the audio records, every 100 ms, the BS.1770
+    momentary loudness (LUFS over the 400 ms block ending there, from the
+    ebur128 filter) and the sample peak (dBFS, from astats). Both are kept
+    as float32 arrays, cached per file, so the gated loudness of any range
+    - and the static gain that brings it to a target - is a NumPy reduction
+    instead of another pass over the audio.
+    """
+
+    RATE = 10
+    BLOCK = 4  # 100 ms steps per 400 ms momentary block
+    MAX_GAIN_DB = 12.0
+    PEAK_CEILING_DB = -1.0  # highest sample peak a gain may push a range to
+
+    def __init__(self) -> None:
+        self._indexes = AnalysisCache(8)
+
+    def index(self, path: str):
+        """Return (momentary LUFS, peak dBFS) arrays for `path`, or None without usable audio.
+
+        A failed analysis is recorded as an error of the "loudness" stage in
+        `metrics`; the file's level is then left unchanged.
+        """
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_size, stat.st_mtime)
+        return self._indexes.get(key, lambda: self._measure(path))
+
+    def _measure(self, path: str):
+        with metrics.timed("loudness", source=os.path.basename(path)) as sample:
+            try:
+                index = self._analyse(path)
+            except (OSError, RuntimeError) as exc:
+                sample["error"] = True
+                sample["message"] = str(exc)
+                return None
+            sample["samples"] = len(index[0])
+            return index
+
+    @staticmethod
+    def _analyse(path: str):
+        if not load_moviepy():
+            raise RuntimeError(f"MoviePy could not be imported. Details: {moviepy_import_error!r}")
+        from moviepy.config import get_setting
+
+        proc = subprocess.run(
+            [
+                get_setting("FFMPEG_BINARY"), "-loglevel", "error", "-nostats", "-i", path, "-vn",
+                "-af", "ebur128=metadata=1,"
+                       "astats=metadata=1:reset=1:measure_perchannel=none:measure_overall=Peak_level,"
+                       "ametadata=mode=print:file=-",
+                "-f", "null", "-",
+            ],
+            stdin=subprocess.DEVNULL, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr.strip() or f"ffmpeg exited with {proc.returncode}")
+        momentary, peaks = [], []
+        for line in proc.stdout.splitlines():
+            key, _, value = line.partition("=")
+            if key == "lavfi.r128.M":
+                momentary.append(value)
+            elif key == "lavfi.astats.Overall.Peak_level":
+                peaks.append(value)
+        if not momentary:
+            raise RuntimeError("no audio stream")
+        count = min(len(momentary), len(peaks))
+        # astats reports silence as -inf
+        return (
+            np.asarray(momentary[:count], dtype=np.float32),
+            np.maximum(np.asarray(peaks[:count], dtype=np.float32), -120.0),
+        )
+
+    def loudness(self, path: str, start: float = 0.0, end: float | None = None):
+        """Gated integrated loudness (LUFS) and sample peak (dBFS) of `start`..`end`.
+
+        Uses the BS.1770 gating (-70 LUFS absolute, -10 LU relative) over
+        the momentary blocks that fall inside the range. None if the range
+        is silent or the file has no usable audio.
+        """
+        index = self.index(path)
+        if index is None:
+            return None
+        momentary, peaks = index
+        first = int(start * self.RATE)
+        last = len(peaks) if end is None else min(len(peaks), int(np.ceil(end * self.RATE)))
+        # Block i ends at (i + 1) / RATE and needs BLOCK steps of the range
+        blocks = momentary[first + self.BLOCK - 1:last]
+        blocks = blocks[blocks > -70.0]
+        if not len(blocks):
+            return None
+        power = 10.0 ** (blocks / 10.0)
+        relative_gate = 10.0 * np.log10(power.mean()) - 10.0
+        integrated = 10.0 * np.log10(power[blocks > relative_gate].mean())
+        return float(integrated), float(peaks[first:last].max())
+
+    def gain(self, path: str, target: float, start: float = 0.0, end: float | None = None) -> float:
+        """Linear factor that brings `start`..`end` of `path` to `target` LUFS.
+
+        Limited to MAX_GAIN_DB either way and to what keeps the range's peak
+        under PEAK_CEILING_DB; 1.0 when the loudness is unknown.
+        """
+        measured = self.loudness(path, start, end)
+        if measured is None:
+            return 1.0
+        integrated, peak = measured
+        gain_db = max(-self.MAX_GAIN_DB, min(self.MAX_GAIN_DB, target - integrated, self.PEAK_CEILING_DB - peak))
+        return float(10.0 ** (gain_db / 20.0))
+
+
+loudness_index = LoudnessIndex()
+
+
+class KeyframeIndex:
+    """Where the video packets and keyframes of a source are.
+
+    One demux-only ffprobe pass (nothing is decoded) lists every packet
+    of the first video stream: presentation and decode time, size,
+    keyframe flag and byte offset in the file (-1 where the container
+    doesn't report one). Without ffprobe, ffmpeg's framecrc muxer lists
+    the same packets without their offsets. The arrays are cached per
+    file, so every seek and cut plan on a source is a binary search.
+
+    attach() makes a MoviePy clip seek with it, and copy_cuts() plans
+    stream-copy splits on keyframes. With `enabled` off (CLIPS_KEYFRAME_INDEX=0)
+    nothing is indexed: MoviePy seeks on its own and splits cut wherever
+    the segment muxer does.
+    """
+
+    enabled = os.getenv("CLIPS_KEYFRAME_INDEX", "1") != "0"
+    # The FFMPEG_VideoReader (MoviePy 1.x) internals attach() drives
+    READER_FIELDS = (
+        "proc", "pos", "lastread", "fps", "size", "filename", "bufsize", "pix_fmt", "resize_algo",
+        "read_frame", "skip_frames", "close",
+    )
+    # Starting ffmpeg costs about as much as piping this many seconds of frames
+    RESTART_SECONDS = 0.5
+    # Decoding a frame that ffmpeg drops while seeking, relative to piping one to MoviePy
+    DECODE_COST = 0.5
+
+    def __init__(self) -> None:
+        self._indexes = AnalysisCache(8)
+
+    def index(self, path: str) -> dict | None:
+        """Return the packet arrays of `path` ('pts', 'dts', 'size', 'key', 'offset'), or None.
+
+        None if indexing is off or failed; a failure is recorded as an error
+        of the "keyframe_index" stage in `metrics`.
+        """
+        if not self.enabled:
+            return None
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_size, stat.st_mtime)
+        return self._indexes.get(key, lambda: self._measure(path))
+
+    def _measure(self, path: str) -> dict | None:
+        with metrics.timed("keyframe_index", source=os.path.basename(path)) as sample:
+            try:
+                index = self._analyse(path)
+            except (OSError, RuntimeError, ValueError, KeyError) as exc:
+                sample["error"] = True
+                sample["message"] = str(exc)
+                return None
+            sample["packets"] = len(index["pts"])
+            sample["keyframes"] = int(index["key"].sum())
+            return index
+
+    @staticmethod
+    def _ffprobe() -> str | None:
+        """The ffprobe next to MoviePy's ffmpeg, else the one on PATH, else None."""
+        import shutil
+        from moviepy.config import get_setting
+
+        ffmpeg = get_setting("FFMPEG_BINARY")
+        folder, name = os.path.split(ffmpeg)
+        sibling = os.path.join(folder, name.replace("ffmpeg", "ffprobe", 1))
+        if folder and sibling != ffmpeg and os.path.isfile(sibling):
+            return sibling
+        return shutil.which("ffprobe")
+
+    @staticmethod
+    def _analyse(path: str) -> dict:
+        if not load_moviepy():
+            raise RuntimeError(f"MoviePy could not be imported. Details: {moviepy_import_error!r}")
+        ffprobe = KeyframeIndex._ffprobe()
+        if ffprobe is None:
+            return KeyframeIndex._analyse_framecrc(path)
+        proc = subprocess.run(
+            [
+                ffprobe, "-v", "error", "-select_streams", "v:0",
+                "-show_entries", "stream=time_base:packet=pts,dts,size,pos,flags", "-of", "json", path,
+            ],
+            stdin=subprocess.DEVNULL, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr.strip() or f"ffprobe exited with {proc.returncode}")
+        return KeyframeIndex.parse_ffprobe(json.loads(proc.stdout))
+
+    @staticmethod
+    def parse_ffprobe(data: dict) -> dict:
+        """Packet arrays from ffprobe's `-show_packets -of json` output for one stream.
+
+        ffprobe leaves out fields it has no value for: a packet without a
+        pts is shown at its dts, one without a position gets offset -1.
+        """
+        numerator, denominator = data["streams"][0]["time_base"].split("/")
+        rows = []
+        for packet in data.get("packets", ()):
+            dts = packet.get("dts", packet.get("pts"))
+            if dts is None:
+                # A skipped packet would shift every seek after it
+                raise ValueError(f"packet without timestamps: {packet!r}")
+            rows.append((
+                int(dts),
+                int(packet.get("pts", dts)),
+                int(packet.get("size", 0)),
+                "K" in packet.get("flags", ""),
+                int(packet.get("pos", -1)),
+            ))
+        return KeyframeIndex._packet_arrays(rows, int(numerator) / int(denominator))
+
+    @staticmethod
+    def _analyse_framecrc(path: str) -> dict:
+        """Index without ffprobe: ffmpeg's framecrc muxer lists the packets, but not their offsets."""
+        from moviepy.config import get_setting
+
+        # Every packet, straight from the demuxer: "stream, dts, pts, duration, size, crc[, F=flags]"
+        proc = subprocess.run(
+            [
+                get_setting("FFMPEG_BINARY"), "-loglevel", "error", "-nostats", "-i", path,
+                "-map", "0:v:0", "-c", "copy", "-f", "framecrc", "-",
+            ],
+            stdin=subprocess.DEVNULL, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr.strip() or f"ffmpeg exited with {proc.returncode}")
+        time_base = 1.0
+        rows = []
+        for line in proc.stdout.splitlines():
+            try:
+                if line.startswith("#tb 0:"):
+                    numerator, denominator = line.split(":", 1)[1].split("/")
+                    time_base = int(numerator) / int(denominator)
+                elif line and not line.startswith("#"):
+                    fields = [field.strip() for field in line.split(",")]
+                    flags = next((int(field[2:], 16) for field in fields[6:] if field.startswith("F=")), 1)
+                    rows.append((int(fields[1]), int(fields[2]), int(fields[4]), flags & 1, -1))
+            except (ValueError, IndexError, ZeroDivisionError):
+                # A skipped packet would shift every seek after it
+                raise RuntimeError(f"unexpected framecrc line {line!r}") from None
+        return KeyframeIndex._packet_arrays(rows, time_base)
+
+    @staticmethod
+    def _packet_arrays(rows: list[tuple], time_base: float) -> dict:
+        """index()'s arrays from (dts, pts, size, keyframe, offset) rows in stream time_base units."""
+        if not rows:
+            raise RuntimeError("no video packets")
+        packets = np.array(rows, dtype=np.int64)
+        dts, pts = packets[:, 0], packets[:, 1]
+        pts = np.where(pts == -(2**63), dts, pts)  # AV_NOPTS_VALUE
+        return {
+            "pts": pts * time_base,
+            "dts": dts * time_base,
+            "size": packets[:, 2],
+            "key": packets[:, 3].astype(bool),
+            "offset": packets[:, 4],
+        }
+
+    def keyframes(self, path: str):
+        """Sorted presentation times of the keyframes of `path`, or None."""
+        index = self.index(path)
+        return None if index is None else np.sort(index["pts"][index["key"]])
+
+    def seek_point(self, path: str, seconds: float) -> tuple[float, int] | None:
+        """(time, byte offset) of the keyframe decoding must start from to show `seconds`.
+
+        The offset is -1 if the container didn't report one; None without an index.
+        """
+        index = self.index(path)
+        if index is None:
+            return None
+        keys = np.flatnonzero(index["key"])
+        before = keys[index["pts"][keys] <= seconds + 1e-6]
+        packet = before[index["pts"][before].argmax()] if len(before) else keys[index["pts"][keys].argmin()]
+        return float(index["pts"][packet]), int(index["offset"][packet])
+
+    def copy_cuts(self, path: str, clip_length: float, duration: float) -> list[float] | None:
+        """Keyframe times at which a stream copy can split `path` into `clip_length` chunks.
+
+        Each cut is the keyframe nearest its multiple of `clip_length`, so
+        chunks are off by at most half a keyframe interval and the error
+        doesn't add up over the video. A multiple whose nearest keyframe is
+        already a cut (keyframes further apart than the clip length) gets
+        none. Returns None if `path` couldn't be indexed.
+        """
+        keyframes = self.keyframes(path)
+        if keyframes is None:
+            return None
+        cuts = []
+        for target in np.arange(clip_length, duration, clip_length):
+            nearest = float(keyframes[np.abs(keyframes - target).argmin()])
+            if nearest > (cuts[-1] if cuts else 0) and nearest < duration:
+                cuts.append(nearest)
+        return cuts
+
+    def attach(self, clip):
+        """Make `clip`, a VideoFileClip, seek by the index of its file. Returns the clip.
+
+        MoviePy reopens ffmpeg a second before every seek target (which can
+        be a whole GOP further back) and otherwise pipes up to 100 frames
+        it doesn't need. Here a seek starts ffmpeg at the frame itself, so
+        it decodes only from the keyframe before it, and a forward jump
+        restarts ffmpeg whenever that is cheaper than piping the frames in
+        between, going by how far back that keyframe is.
+
+        The clip is left alone unless its reader is MoviePy 1.x's
+        FFMPEG_VideoReader. If a seek fails, the reader goes back to
+        MoviePy's own get_frame for good and the failure is recorded as an
+        error of the "keyframe_seek" stage in `metrics`.
+        """
+        import moviepy
+
+        reader = getattr(clip, "reader", None)
+        if (
+            reader is None
+            or getattr(reader, "keyframes", None) is not None
+            or not moviepy.__version__.startswith("1.")
+            or not all(hasattr(reader, name) for name in self.READER_FIELDS)
+        ):
+            return clip
+        index = self.index(reader.filename)
+        if index is None or not index["key"].any():
+            return clip
+        from moviepy.config import get_setting
+
+        fps = reader.fps
+        frames = np.sort(index["pts"])
+        keyframes = reader.keyframes = np.sort(index["pts"][index["key"]])
+        restart_frames = self.RESTART_SECONDS * fps
+
+        def start_at(pos: int) -> None:
+            reader.close()
+            # A sequential read shows, at frame `pos`, the frame nearest its
+            # time; start ffmpeg a hair before that frame. (Any further off
+            # and its constant frame rate output would duplicate it.)
+            slot = (pos - 1) / fps
+            nearest = min(int(np.searchsorted(frames, slot)), len(frames) - 1)
+            if nearest and slot - frames[nearest - 1] <= frames[nearest] - slot:
+                nearest -= 1
+            seconds = max(0.0, frames[nearest] - 0.05 / fps)
+            reader.proc = subprocess.Popen(
+                [
+                    get_setting("FFMPEG_BINARY"), "-ss", "%.06f" % seconds, "-i", reader.filename,
+                    "-loglevel", "error", "-f", "image2pipe", "-vf", "scale=%d:%d" % tuple(reader.size),
+                    "-sws_flags", reader.resize_algo, "-pix_fmt", reader.pix_fmt, "-vcodec", "rawvideo", "-",
+                ],
+                bufsize=reader.bufsize, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            )
+
+        def seek(t):
+            # Same frame numbering as FFMPEG_VideoReader.get_frame
+            pos = int(fps * t + 0.00001) + 1
+            if reader.proc is not None and pos == reader.pos:
+                return reader.lastread
+            if reader.proc is None or pos < reader.pos:
+                start_at(pos)
+            else:
+                key = keyframes[max(0, int(np.searchsorted(keyframes, (pos - 1) / fps + 1e-6)) - 1)]
+                decoded = pos - (int(fps * key + 0.00001) + 1)
+                if pos - reader.pos > restart_frames + self.DECODE_COST * decoded:
+                    start_at(pos)
+                else:
+                    reader.skip_frames(pos - reader.pos - 1)
+            result = reader.read_frame()
+            reader.pos = pos
+            return result
+
+        stock_get_frame = reader.get_frame
+
+        def get_frame(t):
+            try:
+                return seek(t)
+            except Exception as exc:
+                metrics.record(
+                    "keyframe_seek", 0.0, error=True, message=str(exc), file=os.path.basename(reader.filename)
+                )
+                reader.get_frame = stock_get_frame
+                reader.close()  # MoviePy reopens it at `t`
+                return stock_get_frame(t)
+
+        reader.get_frame = get_frame
+        return clip
+
+
+keyframe_index = KeyframeIndex()
+
+
+class ReactionDetector:
+    """Find audience reactions - laughter and applause - in a show's audio.
+
+    Reactions are loud, broadband and noise-like where speech is tonal:
+    every 32 ms frame is scored by how far its level, spectral flatness
+    and share of energy above 2 kHz sit above the show's typical values,
+    all computed with one batched FFT per minute of audio. Stretches where
+    the smoothed score stays above the threshold for MIN_SECONDS are the
+    reactions, ranked by how much they stand out times how long they last.
+    """
+
+    RATE = 16000
+    FRAME = 1024  # samples per FFT (64 ms)
+    HOP = 512
+    BLOCK_SECONDS = 60  # audio decoded and analysed per batch
+    SMOOTHING_SECONDS = 1.0
+    THRESHOLD = 1.5  # robust standard deviations above the median score
+    MIN_SECONDS = 0.8
+    MERGE_SECONDS = 1.5  # gaps shorter than this join two reactions
+
+    @staticmethod
+    def detect(audio: "AudioBuffer | str", cancel_event: threading.Event | None = None) -> list[dict]:
+        """Return reactions as dicts with 'start', 'end', 'peak' (seconds) and 'score', strongest first.
+
+        `audio` is an AudioBuffer or the path of an audio or video file.
+        Raises RenderCancelled, at the next block of audio, once
+        `cancel_event` is set.
+        """
+        if not load_moviepy():
+            raise RuntimeError(f"MoviePy could not be imported. Details: {moviepy_import_error!r}")
+        features = ReactionDetector._features(audio, cancel_event)
+        if len(features) < 2:
+            return []
+        hop_seconds = ReactionDetector.HOP / ReactionDetector.RATE
+
+        # Robust z-scores against the show's own levels, summed and smoothed
+        median = np.median(features, axis=0)
+        spread = 1.4826 * np.median(np.abs(features - median), axis=0) + 1e-6
+        score = ((features - median) / spread).sum(axis=1)
+        width = max(1, int(ReactionDetector.SMOOTHING_SECONDS / hop_seconds))
+        score = np.convolve(score, np.ones(width) / width, mode="same")
+        center = np.median(score)
+        threshold = center + ReactionDetector.THRESHOLD * 1.4826 * np.median(np.abs(score - center))
+
+        above = np.concatenate([[False], score > threshold, [False]])
+        edges = np.flatnonzero(np.diff(above.astype(np.int8)))
+        starts, ends = edges[0::2], edges[1::2]
+        if not len(starts):
+            return []
+        # Merge reactions separated by short dips
+        gap = max(1, int(ReactionDetector.MERGE_SECONDS / hop_seconds))
+        keep = np.concatenate([[True], starts[1:] - ends[:-1] > gap])
+        starts = starts[keep]
+        ends = np.concatenate([ends[np.flatnonzero(keep)[1:] - 1], ends[-1:]])
+        long_enough = (ends - starts) * hop_seconds >= ReactionDetector.MIN_SECONDS
+        starts, ends = starts[long_enough], ends[long_enough]
+        if not len(starts):
+            return []
+
+        excess = np.concatenate([[0.0], np.cumsum(np.maximum(score - threshold, 0))])
+        areas = (excess[ends] - excess[starts]) * hop_seconds
+        peaks = [int(start + np.argmax(score[start:end])) for start, end in zip(starts, ends)]
+        reactions = [
+            {
+                "start": round(float(start * hop_seconds), 2),
+                "end": round(float(end * hop_seconds), 2),
+                "peak": round(float(peak * hop_seconds), 2),
+                "score": round(float(area), 2),
+            }
+            for start, end, peak, area in zip(starts, ends, peaks, areas)
+        ]
+        return sorted(reactions, key=lambda reaction: reaction["score"], reverse=True)
+
+    @staticmethod
+    def _features(audio: "AudioBuffer | str", cancel_event: threading.Event | None = None):
+        """(frames, 3) array of level (dB), spectral flatness and high-band share."""
+        from moviepy.config import get_setting
+
+        rate, frame, hop = ReactionDetector.RATE, ReactionDetector.FRAME, ReactionDetector.HOP
+        frequencies = np.fft.rfftfreq(frame, 1.0 / rate)
+        band = (frequencies >= 300) & (frequencies <= 6000)
+        high = frequencies[band] >= 2000
+        window = np.hanning(frame).astype(np.float32)
+        output_args = ["-vn", "-ac", "1", "-ar", str(rate), "-f", "s16le", "pipe:1"]
+        if isinstance(audio, AudioBuffer):
+            proc = audio.popen_ffmpeg(output_args)
+        else:
+            proc = subprocess.Popen(
+                [get_setting("FFMPEG_BINARY"), "-loglevel", "error", "-nostats", "-i", audio, *output_args],
+                stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            )
+        blocks = []
+        pending = np.zeros(0, dtype=np.float32)
+        try:
+            while True:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise RenderCancelled()
+                data = proc.stdout.read(ReactionDetector.BLOCK_SECONDS * rate * 2)
+                if not data:
+                    break
+                samples = np.concatenate([pending, np.frombuffer(data[: len(data) // 2 * 2], np.int16) / 32768.0])
+                count = (len(samples) - frame) // hop + 1
+                if count <= 0:
+                    pending = samples
+                    continue
+                frames = np.lib.stride_tricks.sliding_window_view(samples, frame)[::hop][:count]
+                power = np.abs(np.fft.rfft(frames * window, axis=1))[:, band] ** 2 + 1e-12
+                total = power.sum(axis=1)
+                blocks.append(np.stack([
+                    10.0 * np.log10(total),
+                    np.exp(np.log(power).mean(axis=1)) / power.mean(axis=1),
+                    power[:, high].sum(axis=1) / total,
+                ], axis=1).astype(np.float32))
+                pending = samples[count * hop:]
+            errors = proc.stderr.read()
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+            proc.wait()
+        if proc.returncode != 0:
+            raise RuntimeError(errors.decode(errors="replace").strip() or f"ffmpeg exited with {proc.returncode}")
+        return np.concatenate(blocks) if blocks else np.zeros((0, 3), dtype=np.float32)
+
+
+class AudioBuffer:
+    """Encoded audio kept off the disk, from extraction through upload.
+
+    Data is held in memory up to SPOOL_MB (CLIPS_AUDIO_SPOOL_MB, default
+    64) and beyond that in an anonymous file in the system temp dir (point
+    TMPDIR at a tmpfs to keep it in RAM) that the OS reclaims even if the
+    process dies, never next to the user's output. reader() hands out
+    independent file objects, so an upload and a local analysis can read
+    the same buffer at once; ffmpeg gets it on stdin via popen_ffmpeg().
+    """
+
+    SPOOL_MB = int(os.getenv("CLIPS_AUDIO_SPOOL_MB") or 64)
+
+    def __init__(self, name: str = "audio.mp3", mime_type: str = "audio/mpeg", duration: float = 0.0) -> None:
+        self.name = name
+        self.mime_type = mime_type
+        self.duration = duration
+        self._file = tempfile.SpooledTemporaryFile(max_size=self.SPOOL_MB * 2**20)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path: str) -> "AudioBuffer":
+        """Copy an audio file into a buffer (for callers that still pass paths)."""
+        if not load_moviepy():
+            raise RuntimeError(f"MoviePy could not be imported. Details: {moviepy_import_error!r}")
+        from moviepy.editor import AudioFileClip
+
+        with AudioFileClip(path) as audio:
+            duration = audio.duration
+        extension = os.path.splitext(path)[1].lower()
+        buffer = cls(os.path.basename(path), "audio/mpeg" if extension == ".mp3" else f"audio/{extension[1:]}", duration)
+        with open(path, "rb") as f:
+            while chunk := f.read(2**20):
+                buffer.write(chunk)
+        return buffer
+
+    def write(self, data: bytes) -> None:
+        with self._lock:
+            self._file.seek(0, io.SEEK_END)
+            self._file.write(data)
+
+    def read_at(self, offset: int, size: int) -> bytes:
+        with self._lock:
+            self._file.seek(offset)
+            return self._file.read(size)
+
+    @property
+    def size(self) -> int:
+        with self._lock:
+            return self._file.seek(0, io.SEEK_END)
+
+    def reader(self) -> io.BufferedReader:
+        """A new file object over the buffer, positioned at the start."""
+        return io.BufferedReader(_AudioBufferReader(self), buffer_size=2**20)
+
+    def popen_ffmpeg(self, output_args: list[str], input_args: list[str] | None = None) -> subprocess.Popen:
+        """Start ffmpeg reading this buffer as its input; stdout and stderr are pipes."""
+        from moviepy.config import get_setting
+
+        proc = subprocess.Popen(
+            [get_setting("FFMPEG_BINARY"), "-loglevel", "error", "-nostats", *(input_args or []), "-i", "pipe:0", *output_args],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+
+        def feed() -> None:
+            try:
+                with self.reader() as reader:
+                    while chunk := reader.read(2**20):
+                        proc.stdin.write(chunk)
+            except (BrokenPipeError, ValueError):
+                pass  # ffmpeg stopped reading, e.g. at the end of a slice
+            finally:
+                try:
+                    proc.stdin.close()
+                except OSError:
+                    pass
+
+        threading.Thread(target=feed, name="ffmpeg-feed", daemon=True).start()
+        return proc
+
+    def slice(self, start: float, end: float) -> "AudioBuffer":
+        """A new MP3 buffer with `start`..`end` seconds of this one (MP3s are cut without re-encoding)."""
+        part = AudioBuffer(os.path.splitext(self.name)[0] + ".mp3", "audio/mpeg", end - start)
+        codec = ["-c", "copy"] if self.mime_type == "audio/mpeg" else ["-b:a", "32k"]
+        proc = self.popen_ffmpeg(
+            [*codec, "-f", "mp3", "pipe:1"], ["-ss", f"{start:.3f}", "-t", f"{end - start:.3f}"]
+        )
+        try:
+            while chunk := proc.stdout.read(2**20):
+                part.write(chunk)
+            errors = proc.stderr.read()
+        finally:
+            proc.wait()
+        if proc.returncode != 0:
+            part.close()
+            raise RuntimeError(f"Could not cut audio: {errors.decode(errors='replace').strip()}")
+        return part
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "AudioBuffer":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class _AudioBufferReader(io.RawIOBase):
+    """Raw file object with its own position over an AudioBuffer."""
+
+    def __init__(self, buffer: AudioBuffer) -> None:
+        self._buffer = buffer
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        data = self._buffer.read_at(self._position, len(b))
+        b[: len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: self._buffer.size}[whence]
+        self._position = max(0, base + offset)
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
 
 
 class VideoProcessor:
-    """Helpers for splitting videos and adding intro/outro and logo overlay."""
+    """Helpers for splitting videos and adding intro/outro and logo overlay.
+
+    Methods that encode accept optional `progress` and `cancel_event`
+    arguments. `progress(info)` receives dicts with 'path', 'index', 'total'
+    (frames) and 'bytes' (size of the output so far) about twice a second.
+    Setting `cancel_event` aborts the encode with RenderCancelled and
+    removes the partial output.
+
+    With `memory_limit_mb` set (CLIPS_MEMORY_LIMIT_MB, or --memory-limit),
+    encodes run in a memory-bounded mode sized to that (advisory) ceiling;
+    see _write_video_frames.
+
+    With `loudness_target` set (CLIPS_LOUDNESS_TARGET, or --loudness-target),
+    smart clips and the intro/outro around them are brought to that many
+    LUFS with a static gain taken from the source's LoudnessIndex.
+    """
+
+    # Per-encode memory ceiling in MB, 0 = MoviePy's own writer
+    memory_limit_mb = int(os.getenv("CLIPS_MEMORY_LIMIT_MB") or 0)
+    # Smart clip loudness in LUFS, e.g. -14; 0 = leave the audio as it is
+    loudness_target = float(os.getenv("CLIPS_LOUDNESS_TARGET") or 0)
+
+    # Renditions a smart clip can be written as. "size" None keeps the
+    # rendered size; otherwise the frame is cropped to the target's aspect
+    # ratio and scaled down to "size" if it is larger. The crop is centered
+    # ("center"), follows the source's CropTracker pan path ("track"), or
+    # is skipped ("stretch"). "bitrate" None leaves the rate to x264's CRF.
+    OUTPUT_TARGETS = {
+        "source": {"size": None, "crop": "center", "bitrate": None, "suffix": ""},
+        "vertical": {"size": (1080, 1920), "crop": "track", "bitrate": "6000k", "suffix": "_9x16"},
+        "720p": {"size": (1280, 720), "crop": "center", "bitrate": "2500k", "suffix": "_720p"},
+    }
+    DEFAULT_TARGETS = ("source",)
+
+    @staticmethod
+    def target_path(output_path: str, target: dict) -> str:
+        """Where `target` of the video at `output_path` is written."""
+        return os.path.splitext(output_path)[0] + target.get("suffix", "") + ".mp4"
+
+    @staticmethod
+    def _target_region(size: tuple[int, int], target: dict) -> tuple[int, int, int, int]:
+        """The (x, y, width, height) of a `size` frame that `target` keeps, centered."""
+        width, height = size
+        if target.get("size") is None or target.get("crop") not in ("center", "track"):
+            return 0, 0, width, height
+        target_width, target_height = target["size"]
+        if width * target_height > height * target_width:
+            # Wider than the target: trim the sides (to an even width for yuv420p)
+            keep = height * target_width // target_height
+            keep -= keep % 2
+            return (width - keep) // 2, 0, keep, height
+        keep = width * target_height // target_width
+        keep -= keep % 2
+        return 0, (height - keep) // 2, width, keep
 
     @staticmethod
     def _get_logo_position(position: str):
@@ -73,31 +1717,363 @@ class VideoProcessor:
         return mapping.get(position, ("right", "bottom"))
 
     @staticmethod
-    def extract_audio(input_path: str, output_audio_path: str) -> str:
+    def _render_logger(output_path: str, progress=None, cancel_event: threading.Event | None = None):
+        """Build a proglog logger for MoviePy that reports progress and checks for cancel.
+
+        Returns None (MoviePy's silent default) when neither is requested.
+        """
+        if progress is None and cancel_event is None:
+            return None
+
+        import proglog
+
+        class RenderLogger(proglog.ProgressBarLogger):
+            last_report = 0.0
+
+            def bars_callback(self, bar, attr, value, old_value=None):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise RenderCancelled(f"Render of {os.path.basename(output_path)} cancelled")
+                # MoviePy names the video frame bar "t" and the audio bar "chunk"
+                if progress is None or attr != "index" or bar != "t":
+                    return
+                total = self.bars[bar].get("total") or 0
+                now = time.monotonic()
+                if now - self.last_report < 0.5 and value < total:
+                    return
+                self.last_report = now
+                try:
+                    written = os.path.getsize(output_path)
+                except OSError:
+                    written = 0
+                progress({"path": output_path, "index": value, "total": total, "bytes": written})
+
+        return RenderLogger()
+
+    @staticmethod
+    def _trace_frame_time(clip, span: dict) -> None:
+        """Accumulate the time `clip` spends in get_frame into span['frame_seconds']."""
+        get_frame = clip.get_frame
+        span["frame_seconds"] = 0.0
+
+        def timed_get_frame(t):
+            started = time.perf_counter()
+            try:
+                return get_frame(t)
+            finally:
+                span["frame_seconds"] += time.perf_counter() - started
+
+        clip.get_frame = timed_get_frame
+
+    @staticmethod
+    def _write_video(
+        clip,
+        output_path: str,
+        progress=None,
+        cancel_event: threading.Event | None = None,
+        stage: str = "render",
+        targets: list[dict] | None = None,
+        crop_track=None,
+    ) -> list[str]:
+        """Encode `clip` to `output_path` with the app's standard settings.
+
+        Every entry of `targets` (see OUTPUT_TARGETS; default the source-
+        sized one) is written at target_path(output_path, target) from the
+        same frames: each frame is decoded and composited once and handed
+        to one encoder per target. Returns the paths written.
+
+        `crop_track` is the clip's pan path (see CropTracker.clip_track)
+        for "track" targets; without one they are cropped at the center.
+
+        The encode is recorded in `metrics` under `stage`. When tracing, its
+        span also reports how much of the time went into producing frames
+        (decoding and compositing) rather than x264 and the audio track.
+        """
+        outputs = [
+            (VideoProcessor.target_path(output_path, target), target)
+            for target in targets or [VideoProcessor.OUTPUT_TARGETS[name] for name in VideoProcessor.DEFAULT_TARGETS]
+        ]
+        paths = [path for path, _ in outputs]
+        plain = len(outputs) == 1 and outputs[0][1].get("size") is None and not outputs[0][1].get("bitrate")
+        with tracer.span(f"write_video {stage}", file=os.path.basename(output_path)) as span:
+            if span is not None:
+                VideoProcessor._trace_frame_time(clip, span)
+            started = time.perf_counter()
+            # MoviePy would put its temp audio track in the working directory,
+            # named after the output file, so parallel renders of clip_001.mp4
+            # for different videos would collide. Keep it next to the output.
+            temp_audio = os.path.splitext(output_path)[0] + "TEMP_MPY_wvf_snd.mp4"
+            logger = VideoProcessor._render_logger(paths[0], progress, cancel_event)
+            extra = {"outputs": len(paths)} if len(paths) > 1 else {}
+            try:
+                if VideoProcessor.memory_limit_mb > 0:
+                    extra["peak_rss"], extra["encode_memory"] = VideoProcessor._write_video_frames(
+                        clip, outputs, temp_audio, logger, VideoProcessor.memory_limit_mb * 2**20, crop_track
+                    )
+                elif not plain:
+                    VideoProcessor._write_video_frames(clip, outputs, temp_audio, logger, crop_track=crop_track)
+                else:
+                    clip.write_videofile(
+                        paths[0],
+                        codec="libx264",
+                        audio_codec="aac",
+                        fps=clip.fps or 25,
+                        temp_audiofile=temp_audio,
+                        verbose=False,
+                        logger=logger,
+                    )
+            except BaseException as exc:
+                # Don't leave a truncated clip (or MoviePy's temp audio) behind
+                for path in paths + [temp_audio]:
+                    if os.path.isfile(path):
+                        os.remove(path)
+                cancelled = isinstance(exc, RenderCancelled)
+                metrics.record(
+                    stage,
+                    time.perf_counter() - started,
+                    error=not cancelled,
+                    cancelled=cancelled,
+                    file=os.path.basename(paths[0]),
+                )
+                raise
+            metrics.record_encode(
+                stage,
+                time.perf_counter() - started,
+                frames=int(clip.duration * (clip.fps or 25)),
+                media_seconds=clip.duration,
+                bytes=sum(os.path.getsize(path) for path in paths),
+                file=os.path.basename(paths[0]),
+                **extra,
+            )
+        return paths
+
+    @staticmethod
+    def _write_video_frames(
+        clip, outputs: list[tuple[str, dict]], temp_audio: str, logger, limit: int = 0, crop_track=None
+    ) -> tuple[int, int]:
+        """Encode `clip` like write_videofile, to one encoder per (path, target).
+
+        Frames are produced (decoded and composited) on a thread and handed
+        to the encoders through a bounded queue, so at most a fixed number
+        of frames is in flight however long the source is. MoviePy returns
+        a new array for every frame, so the queue bounds how many are alive
+        rather than reusing buffers. Each encoder gets its target's crop of the frame (a view,
+        not a copy; for "track" targets it slides along `crop_track`) and
+        scales it itself; the audio track is encoded once and muxed into
+        every output.
+
+        With `limit` (bytes) set, the queue and x264's lookahead, the
+        encoder's biggest allocation, are sized to keep memory within about
+        that budget. The budget is advisory: nothing is throttled or
+        stopped when an encode goes over it. Returns (peak RSS of this process plus the encoders,
+        peak memory the encode added on top of what the process used when
+        it started), and warns when the latter goes over `limit`.
+        """
+        import proglog
+        from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+
+        logger = logger or proglog.default_bar_logger(None)
+        fps = clip.fps or 25
+        width, height = clip.size
+        frame_bytes = width * height * 3
+        params = []
+        depth = 4
+        if limit:
+            # A quarter of the budget for frames in flight, half for the
+            # encoders' lookahead (YUV 4:2:0 frames, half the size of RGB ones)
+            depth = max(2, min(16, limit // 4 // frame_bytes))
+            lookahead = max(4, min(40, limit // 2 // len(outputs) // (frame_bytes // 2)))
+            params = ["-x264-params", f"rc-lookahead={lookahead}"]
+
+        audiofile = None
+        if clip.audio is not None:
+            clip.audio.write_audiofile(temp_audio, fps=44100, nbytes=4, codec="aac", logger=logger)
+            audiofile = temp_audio
+
+        frames = Queue(maxsize=depth)
+        stop = threading.Event()
+        n_frames = int(clip.duration * fps)
+
+        def offer(item) -> None:
+            while not stop.is_set():
+                try:
+                    frames.put(item, timeout=0.1)
+                    return
+                except Full:
+                    continue
+
+        def produce() -> None:
+            try:
+                for index in range(n_frames):
+                    frame = clip.get_frame(index / fps)
+                    if frame.dtype != np.uint8:
+                        frame = frame.astype(np.uint8)
+                    offer(frame)
+            except BaseException as exc:
+                offer(exc)
+
+        baseline = profiler.current_rss() or 0
+        peak = 0
+        try:
+            with ExitStack() as writers:
+                encoders = []
+                for path, target in outputs:
+                    x, y, crop_width, crop_height = VideoProcessor._target_region(clip.size, target)
+                    scale = []
+                    # Scale down to the target's size, never up
+                    if target.get("size") is not None and target["size"][1] < crop_height:
+                        scale = ["-vf", "scale={}:{}".format(*target["size"])]
+                    writer = writers.enter_context(FFMPEG_VideoWriter(
+                        path,
+                        (crop_width, crop_height),
+                        fps,
+                        codec="libx264",
+                        audiofile=audiofile,
+                        bitrate=target.get("bitrate"),
+                        ffmpeg_params=scale + params,
+                    ))
+                    offsets = None
+                    if target.get("crop") == "track" and crop_track is not None and len(crop_track):
+                        centers = np.interp(
+                            np.arange(n_frames) * (CropTracker.FPS / fps), np.arange(len(crop_track)), crop_track
+                        )
+                        offsets = np.clip(np.rint(centers * width - crop_width / 2), 0, width - crop_width)
+                        offsets = offsets.astype(int).tolist()
+                    encoders.append((writer, slice(y, y + crop_height), x, crop_width, offsets))
+                producer = threading.Thread(target=produce, name="frame-producer", daemon=True)
+                producer.start()
+                try:
+                    for index in logger.iter_bar(t=range(n_frames)):
+                        item = frames.get()
+                        if isinstance(item, BaseException):
+                            raise item
+                        for writer, rows, x, crop_width, offsets in encoders:
+                            if offsets is not None:
+                                x = offsets[index]
+                            writer.write_frame(item[rows, x:x + crop_width])
+                        if index % max(1, int(fps)) == 0:
+                            rss = (profiler.current_rss() or 0) + sum(
+                                profiler.current_rss(writer.proc.pid) or 0 for writer, *_ in encoders
+                            )
+                            peak = max(peak, rss)
+                finally:
+                    stop.set()
+                    producer.join()
+        finally:
+            if audiofile is not None and os.path.isfile(audiofile):
+                os.remove(audiofile)
+        if limit and peak - baseline > limit:
+            print(
+                f"{os.path.basename(outputs[0][0])}: encode used {(peak - baseline) // 2**20} MB, "
+                f"over the {limit // 2**20} MB limit"
+            )
+        return peak, max(0, peak - baseline)
+
+    @staticmethod
+    @traced
+    def get_duration(input_path: str) -> float:
+        """Return the duration of a video in seconds."""
+        if not load_moviepy():
+            raise RuntimeError(
+                f"MoviePy could not be imported. "
+                f"Details: {moviepy_import_error!r}"
+            )
+
+        with VideoFileClip(input_path, audio=False) as clip:
+            return float(clip.duration or 0)
+
+    @staticmethod
+    @traced
+    def extract_audio(
+        input_path: str,
+        output_audio_path: str,
+        cancel_event: threading.Event | None = None,
+    ) -> str:
         """Extract audio from video and save as .mp3 for transcription.
 
         Returns the path to the audio file.
         """
-        if VideoFileClip is None:
+        if not load_moviepy():
             raise RuntimeError(
                 f"MoviePy could not be imported. "
                 f"Details: {moviepy_import_error!r}"
             )
 
-        with VideoFileClip(input_path) as clip:
-            if clip.audio is None:
-                raise ValueError("Video has no audio track.")
-            # Use lower bitrate to keep file under 25MB for Whisper API
-            clip.audio.write_audiofile(
-                output_audio_path,
-                bitrate="32k",  # Lower bitrate = smaller file
-                verbose=False,
-                logger=None
-            )
+        with metrics.timed("extract_audio", source=os.path.basename(input_path)) as sample:
+            with VideoFileClip(input_path) as clip:
+                if clip.audio is None:
+                    raise ValueError("Video has no audio track.")
+                # Use lower bitrate to keep file under 25MB for Whisper API
+                clip.audio.write_audiofile(
+                    output_audio_path,
+                    bitrate="32k",  # Lower bitrate = smaller file
+                    verbose=False,
+                    logger=VideoProcessor._render_logger(output_audio_path, None, cancel_event)
+                )
+                sample["bytes"] = os.path.getsize(output_audio_path)
+                sample["media_seconds"] = clip.duration
 
         return output_audio_path
 
     @staticmethod
+    @traced
+    def extract_audio_buffer(
+        input_path: str,
+        cancel_event: threading.Event | None = None,
+    ) -> AudioBuffer:
+        """Like extract_audio, but into an AudioBuffer instead of a file.
+
+        ffmpeg encodes the same 32 kbps MP3 straight into the buffer, so
+        nothing is written to the output folder. Raises ValueError if the
+        video has no audio track.
+        """
+        if not load_moviepy():
+            raise RuntimeError(
+                f"MoviePy could not be imported. "
+                f"Details: {moviepy_import_error!r}"
+            )
+        from moviepy.config import get_setting
+
+        bitrate = 32000  # Lower bitrate = smaller upload; also how the duration is derived
+        buffer = AudioBuffer(os.path.splitext(os.path.basename(input_path))[0] + ".mp3")
+        with metrics.timed("extract_audio", source=os.path.basename(input_path)) as sample:
+            proc = subprocess.Popen(
+                [
+                    get_setting("FFMPEG_BINARY"), "-loglevel", "error", "-nostats", "-i", input_path,
+                    "-map", "0:a:0", "-vn", "-ar", "44100", "-b:a", str(bitrate), "-f", "mp3", "pipe:1",
+                ],
+                stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            )
+            cancelled = False
+            errors = ""
+            try:
+                while chunk := proc.stdout.read(2**20):
+                    if cancel_event is not None and cancel_event.is_set():
+                        # Killed in finally; ffmpeg can't exit on its own
+                        # while its stdout pipe is full, so don't wait on stderr
+                        cancelled = True
+                        break
+                    buffer.write(chunk)
+                else:
+                    errors = proc.stderr.read().decode(errors="replace").strip()
+            finally:
+                if proc.poll() is None:
+                    proc.kill()
+                proc.wait()
+            if cancelled or proc.returncode != 0:
+                buffer.close()
+                if cancelled:
+                    raise RenderCancelled(f"Audio extraction of {os.path.basename(input_path)} cancelled")
+                if "matches no streams" in errors:
+                    raise ValueError("Video has no audio track.")
+                raise RuntimeError(f"Audio extraction failed: {errors or proc.returncode}")
+            buffer.duration = buffer.size * 8 / bitrate
+            sample["bytes"] = buffer.size
+            sample["media_seconds"] = buffer.duration
+
+        return buffer
+
+    @staticmethod
+    @traced
     def split_video(
         input_path: str,
         output_dir: str,
@@ -107,8 +2083,20 @@ class VideoProcessor:
         logo_path: str | None = None,
         logo_position: str = "bottom-right",
         output_prefix: str = "clip",
+        progress=None,
+        cancel_event: threading.Event | None = None,
     ) -> list[str]:
-        if VideoFileClip is None:
+        """Cut the video into consecutive `clip_length_seconds` chunks.
+
+        Without intro/outro the whole video goes through ffmpeg's segment
+        muxer in one pass (see _segment_video); without a logo either, the
+        streams are copied and each chunk starts at the first keyframe after
+        its N-second mark, so lengths vary by up to a keyframe interval.
+        With intro/outro every chunk is rendered separately.
+
+        `progress` events also carry 'clip' (1-based) and 'clips' (total).
+        """
+        if not load_moviepy():
             raise RuntimeError(
                 f"MoviePy could not be imported. "
                 f"Details: {moviepy_import_error!r}"
@@ -119,6 +2107,26 @@ class VideoProcessor:
 
         os.makedirs(output_dir, exist_ok=True)
 
+        if not intro_path and not outro_path:
+            try:
+                return VideoProcessor._segment_video(
+                    input_path,
+                    output_dir,
+                    clip_length_seconds,
+                    logo_path=logo_path if logo_path and os.path.isfile(logo_path) else None,
+                    logo_position=logo_position,
+                    output_prefix=output_prefix,
+                    progress=progress,
+                    cancel_event=cancel_event,
+                )
+            except RenderCancelled:
+                raise
+            except (OSError, RuntimeError) as e:
+                # Render clip by clip below instead
+                metrics.record(
+                    "split_fallback", 0.0, error=True, message=str(e), file=os.path.basename(input_path)
+                )
+
         clips_created: list[str] = []
 
         with VideoFileClip(input_path) as main_clip:
@@ -128,62 +2136,205 @@ class VideoProcessor:
 
             intro_clip = VideoFileClip(intro_path) if intro_path else None
             outro_clip = VideoFileClip(outro_path) if outro_path else None
+            total_clips = int(-(-duration // clip_length_seconds))
+
+            try:
+                # Loop over the main video and cut into chunks
+                clip_index = 1
+                start = 0.0
+                while start < duration:
+                    end = min(start + clip_length_seconds, duration)
+                    subclip = main_clip.subclip(start, end)
+
+                    pieces = []
+                    if intro_clip is not None:
+                        pieces.append(intro_clip)
+                    pieces.append(subclip)
+                    if outro_clip is not None:
+                        pieces.append(outro_clip)
+
+                    if len(pieces) > 1:
+                        final_clip = concatenate_videoclips(pieces)
+                    else:
+                        final_clip = pieces[0]
+
+                    # Add logo overlay if provided
+                    if logo_path and os.path.isfile(logo_path) and ImageClip is not None:
+                        logo = (
+                            ImageClip(logo_path)
+                            .set_duration(final_clip.duration)
+                            .set_pos(VideoProcessor._get_logo_position(logo_position))
+                        )
+                        final_with_logo = CompositeVideoClip([final_clip, logo])
+                    else:
+                        final_with_logo = final_clip
 
-            # Loop over the main video and cut into chunks
-            clip_index = 1
-            start = 0.0
-            while start < duration:
-                end = min(start + clip_length_seconds, duration)
-                subclip = main_clip.subclip(start, end)
+                    output_filename = f"{output_prefix}_{clip_index:03d}.mp4"
+                    output_path = os.path.join(output_dir, output_filename)
 
-                pieces = []
+                    # Export clip
+                    clip_progress = None
+                    if progress is not None:
+                        clip_progress = lambda info, i=clip_index: progress({**info, "clip": i, "clips": total_clips})
+                    try:
+                        VideoProcessor._write_video(final_with_logo, output_path, clip_progress, cancel_event)
+                    finally:
+                        VideoProcessor._close_composites(final_with_logo, final_clip)
+
+                    clips_created.append(output_path)
+                    clip_index += 1
+                    start += clip_length_seconds
+            finally:
                 if intro_clip is not None:
-                    pieces.append(intro_clip)
-                pieces.append(subclip)
+                    intro_clip.close()
                 if outro_clip is not None:
-                    pieces.append(outro_clip)
+                    outro_clip.close()
 
-                if len(pieces) > 1:
-                    final_clip = concatenate_videoclips(pieces)
-                else:
-                    final_clip = pieces[0]
-
-                # Add logo overlay if provided
-                if logo_path and os.path.isfile(logo_path) and ImageClip is not None:
-                    logo = (
-                        ImageClip(logo_path)
-                        .set_duration(final_clip.duration)
-                        .set_pos(VideoProcessor._get_logo_position(logo_position))
-                    )
-                    final_with_logo = CompositeVideoClip([final_clip, logo])
-                else:
-                    final_with_logo = final_clip
-
-                output_filename = f"{output_prefix}_{clip_index:03d}.mp4"
-                output_path = os.path.join(output_dir, output_filename)
-
-                # Export clip
-                final_with_logo.write_videofile(
-                    output_path,
-                    codec="libx264",
-                    audio_codec="aac",
-                    fps=final_with_logo.fps or 25,
-                    verbose=False,
-                    logger=None,
-                )
+        return clips_created
 
-                clips_created.append(output_path)
-                clip_index += 1
-                start += clip_length_seconds
+    @staticmethod
+    def _segment_video(
+        input_path: str,
+        output_dir: str,
+        clip_length_seconds: int,
+        logo_path: str | None = None,
+        logo_position: str = "bottom-right",
+        output_prefix: str = "clip",
+        progress=None,
+        cancel_event: threading.Event | None = None,
+    ) -> list[str]:
+        """split_video's fast path: one ffmpeg run with the segment muxer.
+
+        Without a logo the streams are copied, so the source is read once
+        and nothing is re-encoded; the cuts are the keyframes nearest each
+        multiple of the clip length (see KeyframeIndex.copy_cuts). With a
+        logo the video is decoded and encoded once with the logo overlaid
+        and keyframes forced at every multiple, so chunks are exact. Raises
+        RuntimeError if ffmpeg fails.
+        """
+        from moviepy.config import get_setting
+
+        with VideoFileClip(input_path, audio=False) as probe:
+            duration = probe.duration or 0
+            fps = probe.fps or 25
+        if duration <= 0:
+            raise ValueError("Could not determine video duration.")
+        encode = bool(logo_path)
+        # Without an index the muxer cuts at the first keyframe after each multiple
+        cuts = None if encode else keyframe_index.copy_cuts(input_path, clip_length_seconds, duration)
+        total_clips = len(cuts) + 1 if cuts is not None else int(-(-duration // clip_length_seconds))
+        total_frames = int(duration * fps)
+
+        pattern = os.path.join(output_dir, f"{output_prefix.replace('%', '%%')}_%03d.mp4")
+        fd, list_path = tempfile.mkstemp(suffix=".txt", prefix="segments-")
+        os.close(fd)
+
+        cmd = [
+            get_setting("FFMPEG_BINARY"), "-y", "-loglevel", "error", "-nostats",
+            "-progress", "pipe:1", "-i", input_path,
+        ]
+        if logo_path:
+            horizontal, vertical = VideoProcessor._get_logo_position(logo_position)
+            x = "W-w" if horizontal == "right" else "0"
+            y = "H-h" if vertical == "bottom" else "0"
+            cmd += [
+                "-i", logo_path,
+                "-filter_complex", f"[0:v][1:v]overlay={x}:{y}[v]",
+                "-map", "[v]", "-map", "0:a:0?",
+            ]
+        else:
+            cmd += ["-map", "0:v:0", "-map", "0:a:0?"]
+        if encode:
+            cmd += [
+                "-c:v", "libx264", "-pix_fmt", "yuv420p", "-c:a", "aac",
+                "-force_key_frames", f"expr:gte(t,n_forced*{clip_length_seconds})",
+            ]
+        else:
+            cmd += ["-c", "copy"]
+        cmd += ["-f", "segment"]
+        if cuts is not None:
+            # Just before each keyframe, so the muxer cuts exactly there
+            cmd += ["-segment_times", ",".join(f"{cut - 0.001:.3f}" for cut in cuts) or str(duration)]
+        else:
+            cmd += ["-segment_time", str(clip_length_seconds)]
+        cmd += [
+            "-segment_start_number", "1",
+            "-reset_timestamps", "1",
+            "-segment_list", list_path,
+            "-segment_list_type", "flat",
+            pattern,
+        ]
 
-            if intro_clip is not None:
-                intro_clip.close()
-            if outro_clip is not None:
-                outro_clip.close()
+        def written() -> list[str]:
+            with open(list_path, encoding="utf-8") as f:
+                return [os.path.join(output_dir, name) for name in f.read().split()]
 
+        mode = "segment" if encode else "copy"
+        started = time.perf_counter()
+        with tracer.span("segment_video", mode=mode, file=os.path.basename(input_path)):
+            proc = subprocess.Popen(
+                cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+            )
+            cancelled = False
+            try:
+                # -progress prints key=value blocks about twice a second
+                for line in proc.stdout:
+                    if cancel_event is not None and cancel_event.is_set():
+                        cancelled = True
+                        proc.terminate()
+                        break
+                    key, _, value = line.strip().partition("=")
+                    if progress is None or key != "out_time_us" or not value.isdigit():
+                        continue
+                    seconds = int(value) / 1e6
+                    if cuts is not None:
+                        clip = int(np.searchsorted(cuts, seconds, side="right")) + 1
+                    else:
+                        clip = min(total_clips, int(seconds // clip_length_seconds) + 1)
+                    path = pattern % clip
+                    progress({
+                        "path": path,
+                        "index": min(total_frames, int(seconds * fps)),
+                        "total": total_frames,
+                        "bytes": os.path.getsize(path) if os.path.isfile(path) else 0,
+                        "clip": clip,
+                        "clips": total_clips,
+                    })
+                errors = proc.stderr.read()
+                proc.wait()
+                clips_created = written()
+                failed = cancelled or proc.returncode != 0
+                if failed:
+                    # Remove the finished chunks and the one being written
+                    for path in clips_created + [pattern % (len(clips_created) + 1)]:
+                        if os.path.isfile(path):
+                            os.remove(path)
+            finally:
+                if proc.poll() is None:
+                    proc.kill()
+                    proc.wait()
+                os.remove(list_path)
+
+        seconds = time.perf_counter() - started
+        if failed:
+            metrics.record("render", seconds, error=not cancelled, cancelled=cancelled, mode=mode)
+            if cancelled:
+                raise RenderCancelled(f"Split of {os.path.basename(input_path)} cancelled")
+            raise RuntimeError(f"ffmpeg segmenting failed: {errors.strip() or proc.returncode}")
+        metrics.record_encode(
+            "render",
+            seconds,
+            frames=total_frames,
+            media_seconds=duration,
+            bytes=sum(os.path.getsize(path) for path in clips_created),
+            file=os.path.basename(input_path),
+            mode=mode,
+            clips=len(clips_created),
+        )
         return clips_created
 
     @staticmethod
+    @traced
     def create_smart_clips(
         input_path: str,
         output_dir: str,
@@ -192,6 +2343,7 @@ class VideoProcessor:
         outro_path: str | None = None,
         logo_path: str | None = None,
         logo_position: str = "bottom-right",
+        targets: list[dict] | None = None,
     ) -> list[dict]:
         """Create clips based on AI-identified time ranges.
 
@@ -200,9 +2352,14 @@ class VideoProcessor:
           - end_time (seconds)
           - title, description, thumbnail_idea (optional metadata)
 
-        Returns a list of dicts with 'path' and the original metadata.
+        `targets` lists the renditions to write per clip (see
+        OUTPUT_TARGETS; default just the source-sized one). All of a clip's
+        renditions are encoded in the same pass over its frames.
+
+        Returns a list of dicts with 'path' (the first target's file),
+        'output_paths' (one per target) and the original metadata.
         """
-        if VideoFileClip is None:
+        if not load_moviepy():
             raise RuntimeError(
                 f"MoviePy could not be imported. "
                 f"Details: {moviepy_import_error!r}"
@@ -216,89 +2373,320 @@ class VideoProcessor:
         clips_created: list[dict] = []
 
         with VideoFileClip(input_path) as main_clip:
+            keyframe_index.attach(main_clip)  # clips are cut from all over the source
             intro_clip = VideoFileClip(intro_path) if intro_path else None
             outro_clip = VideoFileClip(outro_path) if outro_path else None
 
-            for idx, spec in enumerate(clip_specs, start=1):
-                start_time = float(spec.get("start_time", 0))
-                end_time = float(spec.get("end_time", 0))
-                if end_time <= start_time:
-                    continue
+            try:
+                for idx, spec in enumerate(clip_specs, start=1):
+                    clip_info = VideoProcessor._render_smart_clip(
+                        main_clip,
+                        intro_clip,
+                        outro_clip,
+                        output_dir,
+                        idx,
+                        spec,
+                        logo_path=logo_path,
+                        logo_position=logo_position,
+                        targets=targets,
+                    )
+                    if clip_info is not None:
+                        clips_created.append(clip_info)
+            finally:
+                if intro_clip is not None:
+                    intro_clip.close()
+                if outro_clip is not None:
+                    outro_clip.close()
+
+        return clips_created
+
+    @staticmethod
+    @traced
+    def create_smart_clip(
+        input_path: str,
+        output_dir: str,
+        spec: dict,
+        idx: int,
+        intro_path: str | None = None,
+        outro_path: str | None = None,
+        logo_path: str | None = None,
+        logo_position: str = "bottom-right",
+        progress=None,
+        cancel_event: threading.Event | None = None,
+        targets: list[dict] | None = None,
+        track_crop: bool = False,
+    ) -> dict | None:
+        """Render a single clip of `create_smart_clips`.
+
+        Opens its own readers for the source, intro and outro, so several
+        clips can be rendered concurrently from different threads. `idx` is
+        the 1-based clip number used in the output filename.
+
+        With `track_crop` the clip's pan path is returned under 'crop_track'
+        (a NumPy array, not JSON-serializable) for a later burn_clip_subtitles
+        that writes "track" targets.
+
+        Returns the clip info dict, or None if the spec has no valid range.
+        """
+        if not load_moviepy():
+            raise RuntimeError(
+                f"MoviePy could not be imported. "
+                f"Details: {moviepy_import_error!r}"
+            )
 
-                subclip = main_clip.subclip(start_time, end_time)
+        if not os.path.isfile(input_path):
+            raise FileNotFoundError(f"Input video not found: {input_path}")
 
-                pieces = []
+        os.makedirs(output_dir, exist_ok=True)
+
+        with VideoFileClip(input_path) as main_clip:
+            keyframe_index.attach(main_clip)
+            intro_clip = VideoFileClip(intro_path) if intro_path else None
+            outro_clip = VideoFileClip(outro_path) if outro_path else None
+            try:
+                return VideoProcessor._render_smart_clip(
+                    main_clip,
+                    intro_clip,
+                    outro_clip,
+                    output_dir,
+                    idx,
+                    spec,
+                    logo_path=logo_path,
+                    logo_position=logo_position,
+                    progress=progress,
+                    cancel_event=cancel_event,
+                    targets=targets,
+                    track_crop=track_crop,
+                )
+            finally:
                 if intro_clip is not None:
-                    pieces.append(intro_clip)
-                pieces.append(subclip)
+                    intro_clip.close()
                 if outro_clip is not None:
-                    pieces.append(outro_clip)
+                    outro_clip.close()
 
-                if len(pieces) > 1:
-                    final_clip = concatenate_videoclips(pieces)
-                else:
-                    final_clip = pieces[0]
-
-                # Add logo overlay if provided
-                if logo_path and os.path.isfile(logo_path) and ImageClip is not None:
-                    logo = (
-                        ImageClip(logo_path)
-                        .set_duration(final_clip.duration)
-                        .set_pos(VideoProcessor._get_logo_position(logo_position))
-                    )
-                    final_with_logo = CompositeVideoClip([final_clip, logo])
-                else:
-                    final_with_logo = final_clip
-
-                # Use title for filename (sanitized)
-                title = spec.get("title", f"clip_{idx}")
-                safe_title = "".join(c if c.isalnum() or c in " _-" else "_" for c in title)
-                safe_title = safe_title[:50]  # limit length
-                output_filename = f"{idx:03d}_{safe_title}.mp4"
-                output_path = os.path.join(output_dir, output_filename)
-
-                # Export clip
-                final_with_logo.write_videofile(
-                    output_path,
-                    codec="libx264",
-                    audio_codec="aac",
-                    fps=final_with_logo.fps or 25,
-                    verbose=False,
-                    logger=None,
-                )
+    @staticmethod
+    def _close_composites(*clips) -> None:
+        """Release the frame-sized backgrounds of composites built for one render.
 
-                # Store clip info
-                clip_info = {
-                    "path": output_path,
-                    "start_time": start_time,
-                    "end_time": end_time,
-                    "title": spec.get("title", ""),
-                    "description": spec.get("description", ""),
-                    "thumbnail_idea": spec.get("thumbnail_idea", ""),
-                }
-                clips_created.append(clip_info)
+        Only composites are closed: closing a subclip would close the
+        reader it shares with its source.
+        """
+        for clip in clips:
+            if isinstance(clip, CompositeVideoClip):
+                clip.close()
+
+    @staticmethod
+    def _normalized(clip, path: str, start: float = 0.0, end: float | None = None):
+        """`clip` with a static gain that brings `start`..`end` of `path` to loudness_target.
 
+        The gain comes from the cached LoudnessIndex, and volumex only
+        scales the samples MoviePy produces for the encode anyway.
+        """
+        if clip.audio is None:
+            return clip
+        gain = loudness_index.gain(path, VideoProcessor.loudness_target, start, end)
+        return clip.volumex(gain) if gain != 1.0 else clip
+
+    @staticmethod
+    def smart_clip_path(output_dir: str, idx: int, spec: dict) -> str:
+        """Return the output path `create_smart_clips` uses for a clip."""
+        # Use title for filename (sanitized)
+        title = spec.get("title", f"clip_{idx}")
+        safe_title = "".join(c if c.isalnum() or c in " _-" else "_" for c in title)
+        safe_title = safe_title[:50]  # limit length
+        output_filename = f"{idx:03d}_{safe_title}.mp4"
+        return os.path.join(output_dir, output_filename)
+
+    @staticmethod
+    def _render_smart_clip(
+        main_clip,
+        intro_clip,
+        outro_clip,
+        output_dir: str,
+        idx: int,
+        spec: dict,
+        logo_path: str | None = None,
+        logo_position: str = "bottom-right",
+        progress=None,
+        cancel_event: threading.Event | None = None,
+        targets: list[dict] | None = None,
+        track_crop: bool = False,
+    ) -> dict | None:
+        start_time = float(spec.get("start_time", 0))
+        end_time = float(spec.get("end_time", 0))
+        if end_time <= start_time:
+            return None
+
+        subclip = main_clip.subclip(start_time, end_time)
+        if VideoProcessor.loudness_target:
+            subclip = VideoProcessor._normalized(subclip, main_clip.filename, start_time, end_time)
             if intro_clip is not None:
-                intro_clip.close()
+                intro_clip = VideoProcessor._normalized(intro_clip, intro_clip.filename)
             if outro_clip is not None:
-                outro_clip.close()
+                outro_clip = VideoProcessor._normalized(outro_clip, outro_clip.filename)
 
-        return clips_created
+        pieces = []
+        if intro_clip is not None:
+            pieces.append(intro_clip)
+        pieces.append(subclip)
+        if outro_clip is not None:
+            pieces.append(outro_clip)
+
+        if len(pieces) > 1:
+            final_clip = concatenate_videoclips(pieces)
+        else:
+            final_clip = pieces[0]
+
+        # Add logo overlay if provided
+        if logo_path and os.path.isfile(logo_path) and ImageClip is not None:
+            logo = (
+                ImageClip(logo_path)
+                .set_duration(final_clip.duration)
+                .set_pos(VideoProcessor._get_logo_position(logo_position))
+            )
+            final_with_logo = CompositeVideoClip([final_clip, logo])
+        else:
+            final_with_logo = final_clip
+
+        output_path = VideoProcessor.smart_clip_path(output_dir, idx, spec)
+
+        crop_track = None
+        if track_crop or any(target.get("crop") == "track" for target in targets or ()):
+            crop_track = crop_tracker.clip_track(
+                main_clip.filename,
+                start_time,
+                end_time,
+                before=intro_clip.duration if intro_clip is not None else 0.0,
+                after=outro_clip.duration if outro_clip is not None else 0.0,
+            )
+
+        # Export clip
+        try:
+            output_paths = VideoProcessor._write_video(
+                final_with_logo, output_path, progress, cancel_event, targets=targets, crop_track=crop_track
+            )
+        finally:
+            VideoProcessor._close_composites(final_with_logo, final_clip)
+
+        # Store clip info
+        clip_info = {
+            "path": output_paths[0],
+            "output_paths": output_paths,
+            "start_time": start_time,
+            "end_time": end_time,
+            "title": spec.get("title", ""),
+            "description": spec.get("description", ""),
+            "thumbnail_idea": spec.get("thumbnail_idea", ""),
+        }
+        if track_crop:
+            clip_info["crop_track"] = crop_track
+        return clip_info
+
+    @staticmethod
+    def subtitle_segments_for_range(
+        segments: list[dict],
+        start_time: float,
+        end_time: float,
+    ) -> list[dict]:
+        """Return the transcript segments overlapping a clip, relative to its start."""
+        clip_segments = []
+        for seg in segments:
+            seg_start = seg.get("start", 0.0)
+            seg_end = seg.get("end", 0.0)
+
+            # Check if segment overlaps with clip
+            if seg_end > start_time and seg_start < end_time:
+                # Adjust timestamps relative to clip start
+                clip_segments.append({
+                    "start": max(0, seg_start - start_time),
+                    "end": min(end_time - start_time, seg_end - start_time),
+                    "text": seg.get("text", "")
+                })
+        return clip_segments
+
+    @staticmethod
+    @traced
+    def burn_clip_subtitles(
+        clip: dict,
+        segments: list[dict],
+        progress=None,
+        cancel_event: threading.Event | None = None,
+        targets: list[dict] | None = None,
+    ) -> dict:
+        """Burn the transcript lines that fall inside `clip` into its video.
+
+        `clip` is an info dict from create_smart_clip(s); the file at
+        clip['path'] is replaced in place. On failure the original is kept.
+
+        With `targets` (see VideoProcessor.OUTPUT_TARGETS), clip['path']
+        should be a source-sized render: the subtitled video is written
+        as every target in one pass, even if no subtitles fall inside the
+        clip, and clip['path'] / clip['output_paths'] are updated. "track"
+        targets follow clip['crop_track'] (see create_smart_clip).
+        """
+        video_path = clip["path"]
+        clip_segments = VideoProcessor.subtitle_segments_for_range(
+            segments, clip["start_time"], clip["end_time"]
+        )
+        fan_out = bool(targets) and targets != [VideoProcessor.OUTPUT_TARGETS["source"]]
+
+        # If we have segments, add subtitles
+        if clip_segments or fan_out:
+            import shutil
+            temp_path = video_path.replace(".mp4", "_temp.mp4")
+            try:
+                # Rename original to temp
+                shutil.move(video_path, temp_path)
+
+                # Add subtitles (temp -> final)
+                output_paths = VideoProcessor.add_subtitles_to_video(
+                    temp_path,
+                    video_path,
+                    clip_segments,
+                    progress=progress,
+                    cancel_event=cancel_event,
+                    targets=targets,
+                    crop_track=clip.get("crop_track"),
+                )
+                clip["path"], clip["output_paths"] = output_paths[0], output_paths
+
+                # Remove temp file
+                if os.path.isfile(temp_path):
+                    os.remove(temp_path)
+            except Exception as e:
+                print(f"Error adding subtitles to {video_path}: {str(e)}")
+                # Restore original if subtitle failed
+                if os.path.isfile(temp_path):
+                    shutil.move(temp_path, video_path)
+                if isinstance(e, RenderCancelled):
+                    raise
+
+        return clip
 
     @staticmethod
+    @traced
     def add_subtitles_to_video(
         video_path: str,
         output_path: str,
-        transcript_segments: list[dict]
-    ) -> None:
+        transcript_segments: list[dict],
+        progress=None,
+        cancel_event: threading.Event | None = None,
+        targets: list[dict] | None = None,
+        crop_track=None,
+    ) -> list[str]:
         """Add burned-in subtitles to a video.
         
         Args:
             video_path: Path to input video
             output_path: Path to save video with subtitles
             transcript_segments: List of dicts with 'start', 'end', 'text' keys
+            targets: Renditions to write (see VideoProcessor.OUTPUT_TARGETS)
+            crop_track: Pan path for "track" targets (see CropTracker.clip_track)
+
+        Returns:
+            The paths written, one per target
         """
-        if VideoFileClip is None:
+        if not load_moviepy():
             raise RuntimeError("MoviePy is required for subtitle generation")
         
         try:
@@ -333,65 +2721,578 @@ class VideoProcessor:
             if text and end > start:
                 subtitle_data.append(((start, end), text))
         
-        if not subtitle_data:
+        if not subtitle_data and (not targets or targets == [VideoProcessor.OUTPUT_TARGETS["source"]]):
             # No subtitles to add, just copy the video
             import shutil
             shutil.copy2(video_path, output_path)
-            return
+            return [output_path]
         
         # Load video and add subtitles
         with VideoFileClip(video_path) as video:
-            # Create subtitle clip
-            subtitles = SubtitlesClip(subtitle_data, generator)
-            
-            # Position subtitles at bottom center
-            subtitles = subtitles.set_position(('center', 'bottom'))
-            
-            # Composite video with subtitles
-            final = CompositeVideoClip([video, subtitles])
+            if not subtitle_data:
+                # Only the renditions are needed
+                return VideoProcessor._write_video(
+                    video, output_path, progress, cancel_event, stage="subtitle", targets=targets, crop_track=crop_track
+                )
+            started = time.perf_counter()
+            try:
+                # Create subtitle clip
+                subtitles = SubtitlesClip(subtitle_data, generator)
+                # MoviePy keeps every subtitle image it renders, so memory
+                # would grow with the video's length; keep the last few
+                subtitles.textclips = RecentItems(4)
+
+                # Position subtitles at bottom center
+                subtitles = subtitles.set_position(('center', 'bottom'))
+
+                # Composite video with subtitles
+                final = CompositeVideoClip([video, subtitles])
+            except Exception as exc:
+                # Usually a missing ImageMagick; encode failures are recorded by _write_video
+                metrics.record(
+                    "subtitle",
+                    time.perf_counter() - started,
+                    error=True,
+                    file=os.path.basename(output_path),
+                    message=str(exc),
+                )
+                raise
             
             # Write output
-            final.write_videofile(
-                output_path,
-                codec='libx264',
-                audio_codec='aac',
-                fps=video.fps or 25,
-                verbose=False,
-                logger=None
+            try:
+                return VideoProcessor._write_video(
+                    final, output_path, progress, cancel_event, stage="subtitle", targets=targets, crop_track=crop_track
+                )
+            finally:
+                VideoProcessor._close_composites(final)
+
+
+# HTTP status codes worth retrying: timeouts, rate limits, 5xx.
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a provider's circuit breaker is rejecting calls."""
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """Return True for errors that are likely to succeed on retry.
+
+    Works for both SDKs without importing them: OpenAI errors carry
+    `status_code`, google.api_core errors carry an integer `code`, and
+    connection/timeout failures are recognised by their class name.
+    """
+    if isinstance(exc, CircuitOpenError):
+        return False
+    for attr in ("status_code", "code"):
+        status = getattr(exc, attr, None)
+        if isinstance(status, int) and status in TRANSIENT_STATUS_CODES:
+            return True
+    name = type(exc).__name__
+    if any(word in name for word in ("Timeout", "Connection", "RateLimit", "TooManyRequests",
+                                      "ResourceExhausted", "ServiceUnavailable", "DeadlineExceeded")):
+        return True
+    return isinstance(exc, (TimeoutError, ConnectionError))
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(capacity))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self, tokens: float) -> float:
+        """Take `tokens` if available (returns 0) or return the seconds to wait."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Block until `tokens` are available. Returns the seconds waited."""
+        waited = 0.0
+        while (delay := self._take(tokens)) > 0:
+            time.sleep(delay)
+            waited += delay
+        return waited
+
+    async def acquire_async(self, tokens: float = 1.0) -> float:
+        """Like `acquire`, but yields to the event loop while waiting."""
+        waited = 0.0
+        while (delay := self._take(tokens)) > 0:
+            await asyncio.sleep(delay)
+            waited += delay
+        return waited
+
+
+class CircuitBreaker:
+    """Open after `threshold` consecutive transient failures.
+
+    While open every call is rejected. After `cooldown` seconds the breaker
+    lets calls through again (half-open); the first success closes it and
+    the first failure opens it for another cooldown.
+    """
+
+    def __init__(self, threshold: int = 5, cooldown: float = 60.0) -> None:
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.trips = 0
+        self._opened_at: float | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.cooldown:
+                return "half-open"
+            return "open"
+
+    def allow(self) -> bool:
+        return self.state != "open"
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            half_open = (
+                self._opened_at is not None
+                and time.monotonic() - self._opened_at >= self.cooldown
             )
+            if half_open or (self._opened_at is None and self.failures >= self.threshold):
+                self._opened_at = time.monotonic()
+                self.trips += 1
+
+
+class AICallGuard:
+    """Shared wrapper for every outgoing AI request.
+
+    Each call goes through a token bucket for its (provider, model) pair,
+    is retried with jittered exponential backoff on transient errors
+    (429/5xx/timeouts), and feeds a per-provider circuit breaker. Counters
+    per provider are available from `stats()`.
+    """
+
+    # Requests per minute per provider, overridable with GEMINI_RPM / OPENAI_RPM.
+    DEFAULT_RPM = {"gemini": 60, "openai": 500}
+
+    # Async requests allowed in flight per provider, overridable with AI_MAX_IN_FLIGHT.
+    MAX_IN_FLIGHT = 100
+
+    def __init__(
+        self,
+        max_retries: int = 4,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        breaker_threshold: int = 5,
+        breaker_cooldown: float = 60.0,
+    ) -> None:
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self._buckets: dict[tuple[str, str], TokenBucket] = {}
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._counters: dict[str, dict[str, float]] = {}
+        self._semaphores: dict[tuple[int, str], asyncio.Semaphore] = {}
+        self._lock = threading.Lock()
+
+    def _rpm(self, provider: str) -> float:
+        env_value = os.getenv(f"{provider.upper()}_RPM")
+        try:
+            return float(env_value) if env_value else float(self.DEFAULT_RPM.get(provider, 60))
+        except ValueError:
+            return float(self.DEFAULT_RPM.get(provider, 60))
+
+    def bucket(self, provider: str, model: str) -> TokenBucket:
+        with self._lock:
+            key = (provider, model)
+            if key not in self._buckets:
+                rpm = self._rpm(provider)
+                # Allow a short burst of up to 10% of the per-minute quota.
+                self._buckets[key] = TokenBucket(rpm / 60.0, max(1.0, rpm / 10.0))
+            return self._buckets[key]
+
+    def breaker(self, provider: str) -> CircuitBreaker:
+        with self._lock:
+            if provider not in self._breakers:
+                self._breakers[provider] = CircuitBreaker(self.breaker_threshold, self.breaker_cooldown)
+            return self._breakers[provider]
+
+    def semaphore(self, provider: str) -> asyncio.Semaphore:
+        """Return the in-flight limit for `provider` on the running event loop."""
+        key = (id(asyncio.get_running_loop()), provider)
+        with self._lock:
+            if key not in self._semaphores:
+                try:
+                    limit = int(os.getenv("AI_MAX_IN_FLIGHT") or self.MAX_IN_FLIGHT)
+                except ValueError:
+                    limit = self.MAX_IN_FLIGHT
+                self._semaphores[key] = asyncio.Semaphore(max(1, limit))
+            return self._semaphores[key]
+
+    def count(self, provider: str, counter: str, amount: float = 1) -> None:
+        with self._lock:
+            counters = self._counters.setdefault(provider, {})
+            counters[counter] = counters.get(counter, 0) + amount
+
+    def stats(self) -> dict[str, dict]:
+        """Return a snapshot of the counters, keyed by provider."""
+        with self._lock:
+            snapshot = {provider: dict(values) for provider, values in self._counters.items()}
+            breakers = dict(self._breakers)
+        for provider, breaker in breakers.items():
+            entry = snapshot.setdefault(provider, {})
+            entry["breaker_state"] = breaker.state
+            entry["breaker_trips"] = breaker.trips
+        return snapshot
+
+    def _backoff(self, attempt: int, exc: BaseException) -> float:
+        # "Full jitter": a random delay up to the exponential cap, but never
+        # shorter than a Retry-After the provider asked for.
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        response = getattr(exc, "response", None)
+        headers = getattr(response, "headers", None)
+        if headers is not None:
+            try:
+                delay = max(delay, min(self.max_delay, float(headers.get("retry-after", 0))))
+            except (TypeError, ValueError):
+                pass
+        return delay
+
+    def call(self, provider: str, model: str, func, *args, **kwargs):
+        """Call `func(*args, **kwargs)` under the limits for provider/model."""
+        breaker = self.breaker(provider)
+        if not breaker.allow():
+            self.count(provider, "rejected")
+            raise CircuitOpenError(f"{provider} circuit is open after repeated failures")
+
+        bucket = self.bucket(provider, model)
+        attempt = 0
+        while True:
+            self.count(provider, "throttled_seconds", bucket.acquire())
+            self.count(provider, "calls")
+            started = time.perf_counter()
+            try:
+                with tracer.span(f"{provider} request", model=model, attempt=attempt):
+                    result = func(*args, **kwargs)
+            except Exception as exc:
+                metrics.record_ai(provider, model, time.perf_counter() - started, error=True)
+                if not is_transient_error(exc):
+                    self.count(provider, "errors")
+                    raise
+                breaker.record_failure()
+                self.count(provider, "transient_errors")
+                if attempt >= self.max_retries or not breaker.allow():
+                    self.count(provider, "errors")
+                    raise
+                delay = self._backoff(attempt, exc)
+                metrics.record_ai_retry(provider, model, delay, exc)
+                self.count(provider, "retries")
+                with tracer.span(f"{provider} backoff", seconds=delay):
+                    time.sleep(delay)
+                attempt += 1
+                continue
+            metrics.record_ai(provider, model, time.perf_counter() - started)
+            breaker.record_success()
+            self.count(provider, "successes")
+            return result
+
+    async def call_async(self, provider: str, model: str, func, *args, **kwargs):
+        """Async version of `call`: awaits `func(*args, **kwargs)`.
+
+        Waiting for tokens and backing off never block the event loop, and
+        the provider's semaphore caps how many requests are in flight.
+        """
+        breaker = self.breaker(provider)
+        if not breaker.allow():
+            self.count(provider, "rejected")
+            raise CircuitOpenError(f"{provider} circuit is open after repeated failures")
+
+        bucket = self.bucket(provider, model)
+        semaphore = self.semaphore(provider)
+        attempt = 0
+        while True:
+            self.count(provider, "throttled_seconds", await bucket.acquire_async())
+            self.count(provider, "calls")
+            started = None
+            try:
+                async with semaphore:
+                    started = time.perf_counter()
+                    with tracer.async_span(f"{provider} request", model=model, attempt=attempt):
+                        result = await func(*args, **kwargs)
+            except Exception as exc:
+                if started is not None:
+                    metrics.record_ai(provider, model, time.perf_counter() - started, error=True)
+                if not is_transient_error(exc):
+                    self.count(provider, "errors")
+                    raise
+                breaker.record_failure()
+                self.count(provider, "transient_errors")
+                if attempt >= self.max_retries or not breaker.allow():
+                    self.count(provider, "errors")
+                    raise
+                delay = self._backoff(attempt, exc)
+                metrics.record_ai_retry(provider, model, delay, exc)
+                self.count(provider, "retries")
+                with tracer.async_span(f"{provider} backoff", seconds=delay):
+                    await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            metrics.record_ai(provider, model, time.perf_counter() - started)
+            breaker.record_success()
+            self.count(provider, "successes")
+            return result
+
+
+class HedgePolicy:
+    """Decide when a slow transcription gets a second provider alongside it.
+
+    Completed transcriptions are remembered per provider as seconds of
+    latency per second of audio, so long and short videos share one
+    history. Once a provider has MIN_SAMPLES of them, a request that runs
+    past the `percentile` of that history (scaled to its audio length) is
+    hedged. A request that lost a hedge is remembered with the time it had
+    taken when it was cancelled, which keeps the percentile from drifting
+    down. `percentile` 0 turns hedging off.
+
+    The history lives in the process, so the GUI, a short batch or a fresh
+    worker has too little of it; until then a request is hedged after
+    `fallback_delay` seconds (0 = not at all).
+    """
+
+    MIN_SAMPLES = 5
+    MIN_DELAY = 10.0  # never hedge sooner than this, in seconds
+    MAX_SAMPLES = 200
+
+    def __init__(self, percentile: float = 0.0, fallback_delay: float = 0.0) -> None:
+        self.percentile = percentile
+        self.fallback_delay = fallback_delay
+        self._samples: dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.percentile > 0
+
+    def record(self, provider: str, seconds: float, media_seconds: float) -> None:
+        if media_seconds <= 0:
+            return
+        with self._lock:
+            samples = self._samples.setdefault(provider, deque(maxlen=self.MAX_SAMPLES))
+            samples.append(seconds / media_seconds)
+
+    def delay(self, provider: str, media_seconds: float) -> float | None:
+        """Seconds to wait before hedging a request for `media_seconds` of audio, or None to not hedge."""
+        if not self.enabled or media_seconds <= 0:
+            return None
+        with self._lock:
+            ordered = sorted(self._samples.get(provider, ()))
+        if len(ordered) < self.MIN_SAMPLES:
+            return max(self.MIN_DELAY, self.fallback_delay) if self.fallback_delay > 0 else None
+        ratio = ordered[min(len(ordered) - 1, int(self.percentile / 100 * len(ordered)))]
+        return max(self.MIN_DELAY, ratio * media_seconds)
+
+
+class AsyncLoopThread:
+    """One background event loop shared by all async AI calls.
+
+    Synchronous code (the GUI, the task scheduler) can hand coroutines to
+    the loop with `submit` and keep many AI requests in flight without a
+    thread per request.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="ai-event-loop", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def get(cls) -> "AsyncLoopThread":
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def submit(self, coro):
+        """Schedule `coro` on the shared loop and return a concurrent Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, cancel_event: threading.Event | None = None):
+        """Run `coro` on the shared loop and block until it finishes.
+
+        If `cancel_event` is set meanwhile, `coro` is cancelled (so an
+        in-flight request is abandoned) and PipelineCancelled is raised.
+        """
+        future = self.submit(coro)
+        if cancel_event is None:
+            return future.result()
+        while True:
+            if cancel_event.is_set():
+                future.cancel()
+                raise PipelineCancelled()
+            try:
+                return future.result(timeout=0.25)
+            except FutureTimeoutError:
+                continue
 
 
 class AIHelper:
     """Wrapper around Google Gemini API for AI-powered features."""
 
+    GEMINI_MODEL = "gemini-3-flash-preview"  # Gemini 3.0 Flash
+
+    # Create simplified prompt for transcription
+    TRANSCRIPTION_PROMPT = (
+        "Transcribe this audio file completely. "
+        "Include all spoken words. "
+        "Return ONLY the transcription text, nothing else."
+    )
+    GEMINI_MAX_PROCESSING_WAIT = 300  # 5 minutes max
+
+    # One guard for the whole process, so every AIHelper (and the AI
+    # thumbnail generator) shares the same rate limits and breakers.
+    call_guard = AICallGuard()
+
+    # Start Whisper next to a Gemini transcription that is slower than this
+    # percentile of past ones (CLIPS_HEDGE_PERCENTILE or --hedge-percentile,
+    # e.g. 90; 0 = off), or than CLIPS_HEDGE_FALLBACK seconds (--hedge-fallback)
+    # while there are too few past ones. Hedges and Whisper wins are counted
+    # in stats()["gemini"].
+    hedge_policy = HedgePolicy(
+        float(os.getenv("CLIPS_HEDGE_PERCENTILE") or 0), float(os.getenv("CLIPS_HEDGE_FALLBACK") or 300)
+    )
+
     def __init__(self) -> None:
         # Try Gemini first, fallback to OpenAI
         gemini_key = os.getenv("GEMINI_API_KEY")
         openai_key = os.getenv("OPENAI_API_KEY")
         
         self.use_gemini = False
-        self.gemini_model = None
+        self._gemini_model = None
         self.openai_client = None
+        self.async_openai_client = None
         
-        if genai is not None and gemini_key:
+        # The SDKs are only imported when the first request needs them
+        if gemini_key and module_available("google.generativeai"):
             # Use Gemini 3 (latest model)
-            genai.configure(api_key=gemini_key)
-            self.gemini_model = genai.GenerativeModel('gemini-3-flash-preview')  # Gemini 3.0 Flash
             self.use_gemini = True
-        elif OpenAI is not None and openai_key:
-            # Fallback to OpenAI
-            self.openai_client = OpenAI(api_key=openai_key)
-            self.use_gemini = False
+        # Otherwise fall back to OpenAI (see _has_openai)
+
+    @property
+    def gemini_model(self):
+        """The Gemini model; the first use imports and configures the SDK."""
+        if self._gemini_model is None and self.use_gemini and load_genai():
+            genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+            self._gemini_model = genai.GenerativeModel(self.GEMINI_MODEL)
+        return self._gemini_model
 
     def is_available(self) -> bool:
-        return self.use_gemini or (self.openai_client is not None)
+        return self.use_gemini or self._has_openai()
+
+    def returns_segments(self) -> bool:
+        """Whether transcribe_audio can return timestamped 'segments'.
+
+        Whisper's transcripts have them; Gemini's are plain text, so with
+        Gemini only a hedged Whisper request that wins brings segments.
+        """
+        if self.use_gemini:
+            return self.hedge_policy.enabled and self._has_openai()
+        return self._has_openai()
+
+    def stats(self) -> dict[str, dict]:
+        """Per-provider call counters (calls, retries, errors, breaker state...)."""
+        return self.call_guard.stats()
+
+    def _has_openai(self) -> bool:
+        return self.openai_client is not None or (bool(os.getenv("OPENAI_API_KEY")) and module_available("openai"))
+
+    def _ensure_openai_client(self):
+        if self.openai_client is None:
+            openai_key = os.getenv("OPENAI_API_KEY")
+            if not openai_key or not load_openai():
+                raise RuntimeError(
+                    "Neither Gemini nor OpenAI is configured for transcription."
+                )
+            self.openai_client = OpenAI(api_key=openai_key)
+        return self.openai_client
+
+    def _generate_text(
+        self,
+        prompt: str,
+        system: str,
+        openai_model: str = "gpt-4o-mini",
+        temperature: float | None = None,
+    ) -> str:
+        """Run a text prompt on the primary provider through the call guard.
+
+        When Gemini is primary and keeps failing (retries exhausted or its
+        circuit is open), the request moves to OpenAI if a key is set.
+        """
+        def call_gemini() -> str:
+            response = self.call_guard.call(
+                "gemini", self.GEMINI_MODEL, self.gemini_model.generate_content, prompt
+            )
+            return response.text
+
+        def call_openai() -> str:
+            client = self._ensure_openai_client()
+            kwargs = {}
+            if temperature is not None:
+                kwargs["temperature"] = temperature
+            response = self.call_guard.call(
+                "openai",
+                openai_model,
+                client.chat.completions.create,
+                model=openai_model,
+                messages=[
+                    {"role": "system", "content": system},
+                    {"role": "user", "content": prompt},
+                ],
+                **kwargs,
+            )
+            return response.choices[0].message.content
 
-    def transcribe_audio(self, audio_path: str) -> dict:
-        """Transcribe an audio file and return text + word-level timestamps.
+        if not self.use_gemini:
+            return call_openai()
+
+        try:
+            return call_gemini()
+        except Exception as exc:
+            if not self._has_openai() or not (isinstance(exc, CircuitOpenError) or is_transient_error(exc)):
+                raise
+            print(f"Gemini unavailable ({exc}). Falling back to OpenAI...")
+            self.call_guard.count("gemini", "failovers")
+            return call_openai()
+
+    @traced
+    def transcribe_audio(self, audio: "AudioBuffer | str") -> dict:
+        """Transcribe audio and return text + word-level timestamps.
         
         Now uses Google Gemini for audio transcription.
         Gemini supports files up to 2GB, so no need to split!
 
+        `audio` is an AudioBuffer, as produced by
+        VideoProcessor.extract_audio_buffer, or the path of an audio file.
+
         Returns a dict with:
           - 'text': full transcription
           - 'segments': list of dicts with 'start', 'end', 'text'
@@ -400,53 +3301,70 @@ class AIHelper:
             raise RuntimeError(
                 "AI is not configured. Set GEMINI_API_KEY in your .env file."
             )
+        if isinstance(audio, str):
+            with AudioBuffer.from_file(audio) as buffer:
+                return self.transcribe_audio(buffer)
 
         # Transcribe with Gemini (no file size limit needed - Gemini supports up to 2GB)
+        if self.use_gemini and self.hedge_policy.enabled and self._has_openai():
+            # Hedging races two requests, which the event loop does for us
+            return AsyncLoopThread.get().run(self._transcribe_with_gemini_async(audio))
         if self.use_gemini:
-            return self._transcribe_with_gemini(audio_path)
+            return self._transcribe_with_gemini(audio)
         else:
             # Fallback to OpenAI if Gemini not available
-            file_size = os.path.getsize(audio_path)
-            max_size = 25 * 1024 * 1024  # OpenAI Whisper limit
-            if file_size > max_size:
-                return self._transcribe_large_audio(audio_path, file_size)
-            return self._transcribe_with_openai(audio_path)
+            return self._transcribe_with_openai_any_size(audio)
+
+    @traced
+    def _transcribe_with_openai_any_size(self, audio: AudioBuffer) -> dict:
+        """Transcribe with Whisper, splitting audio above its 25 MB limit."""
+        max_size = 25 * 1024 * 1024  # OpenAI Whisper limit
+        if audio.size > max_size:
+            return self._transcribe_large_audio(audio)
+        return self._transcribe_with_openai(audio)
+
+    @staticmethod
+    def _upload_to_gemini(audio: AudioBuffer):
+        """Upload the buffer to the Gemini Files API straight from memory."""
+        with audio.reader() as reader:
+            return genai.upload_file(reader, mime_type=audio.mime_type, display_name=audio.name)
 
-    def _transcribe_with_gemini(self, audio_path: str) -> dict:
+    @traced
+    def _transcribe_with_gemini(self, audio: AudioBuffer) -> dict:
         """Transcribe audio using Gemini API."""
         try:
-            # Upload audio file to Gemini
-            print(f"Uploading audio file to Gemini: {audio_path}")
-            audio_file = genai.upload_file(audio_path)
+            model = self.gemini_model  # configures the SDK for the upload
+            # Upload audio to Gemini
+            print(f"Uploading audio to Gemini: {audio.name} ({audio.size / 2**20:.1f} MB)")
+            with metrics.timed("upload", provider="gemini", bytes=audio.size):
+                audio_file = self.call_guard.call("gemini", "files", self._upload_to_gemini, audio)
             print(f"File uploaded: {audio_file.name}, State: {audio_file.state.name}")
             
             # Wait for file to be processed
-            import time
-            max_wait = 300  # 5 minutes max
+            max_wait = self.GEMINI_MAX_PROCESSING_WAIT
             waited = 0
-            while audio_file.state.name == "PROCESSING":
-                if waited >= max_wait:
-                    raise RuntimeError(f"Gemini is taking too long to process the audio (>{max_wait}s). Try a shorter video.")
-                time.sleep(2)
-                waited += 2
-                audio_file = genai.get_file(audio_file.name)
-                print(f"Still processing... ({waited}s elapsed)")
+            with tracer.span("gemini processing wait"):
+                while audio_file.state.name == "PROCESSING":
+                    if waited >= max_wait:
+                        raise RuntimeError(f"Gemini is taking too long to process the audio (>{max_wait}s). Try a shorter video.")
+                    time.sleep(2)
+                    waited += 2
+                    audio_file = self.call_guard.call("gemini", "files", genai.get_file, audio_file.name)
+                    print(f"Still processing... ({waited}s elapsed)")
             
             if audio_file.state.name == "FAILED":
                 raise RuntimeError(f"Gemini failed to process audio file: {audio_file.state}")
             
             print(f"File ready! State: {audio_file.state.name}")
             
-            # Create simplified prompt for transcription
-            prompt = (
-                "Transcribe this audio file completely. "
-                "Include all spoken words. "
-                "Return ONLY the transcription text, nothing else."
-            )
-            
             # Generate transcription
             print("Requesting transcription from Gemini...")
-            response = self.gemini_model.generate_content([prompt, audio_file])
+            response = self.call_guard.call(
+                "gemini",
+                self.GEMINI_MODEL,
+                model.generate_content,
+                [self.TRANSCRIPTION_PROMPT, audio_file],
+            )
             
             # Check if response is valid
             if not response or not response.text:
@@ -459,51 +3377,82 @@ class AIHelper:
             return {"text": content, "segments": []}
                 
         except Exception as e:
-            error_msg = str(e).lower()
             print(f"Gemini transcription error: {str(e)}")
             
+            # Provider keeps failing: move the request to Whisper if we can
+            if (isinstance(e, CircuitOpenError) or is_transient_error(e)) and self._has_openai():
+                print("Gemini is unavailable. Falling back to OpenAI Whisper...")
+                self.call_guard.count("gemini", "failovers")
+                try:
+                    return self._transcribe_with_openai_any_size(audio)
+                except Exception as whisper_error:
+                    raise self._gemini_transcription_failure(e, whisper_error)
+
             # Check if it's a copyright/safety issue
-            if "copyright" in error_msg or "candidate" in error_msg or "safety" in error_msg:
+            if self._is_blocked_content(e) and self._has_openai():
                 # Try to fall back to OpenAI Whisper if available
-                if self.openai_client or os.getenv("OPENAI_API_KEY"):
-                    print("Gemini detected copyrighted content. Falling back to OpenAI Whisper...")
-                    try:
-                        return self._transcribe_with_openai(audio_path)
-                    except Exception as whisper_error:
-                        raise RuntimeError(
-                            f"Gemini blocked transcription (copyrighted content detected).\n"
-                            f"OpenAI Whisper fallback also failed: {str(whisper_error)}\n\n"
-                            f"Try using a different video without copyrighted content."
-                        )
-                else:
-                    raise RuntimeError(
-                        f"Gemini transcription failed: Copyrighted content detected.\n\n"
-                        f"Gemini's safety filters blocked the transcription.\n"
-                        f"To bypass this, add your OPENAI_API_KEY to .env file for Whisper fallback.\n\n"
-                        f"Or use a video without copyrighted content."
-                    )
-            else:
-                raise RuntimeError(f"Gemini transcription failed: {str(e)}")
+                print("Gemini detected copyrighted content. Falling back to OpenAI Whisper...")
+                try:
+                    return self._transcribe_with_openai_any_size(audio)
+                except Exception as whisper_error:
+                    raise self._gemini_transcription_failure(e, whisper_error)
+            raise self._gemini_transcription_failure(e)
 
-    def _transcribe_with_openai(self, audio_path: str) -> dict:
-        """Fallback: Transcribe using OpenAI Whisper."""
-        if self.openai_client is None:
-            openai_key = os.getenv("OPENAI_API_KEY")
-            if OpenAI is None or not openai_key:
-                raise RuntimeError(
-                    "Neither Gemini nor OpenAI is configured for transcription."
+    @staticmethod
+    def _is_blocked_content(exc: BaseException) -> bool:
+        error_msg = str(exc).lower()
+        return "copyright" in error_msg or "candidate" in error_msg or "safety" in error_msg
+
+    @staticmethod
+    def _gemini_transcription_failure(exc: BaseException, whisper_error: BaseException | None = None) -> RuntimeError:
+        """Build the user-facing error for a failed Gemini transcription.
+
+        `whisper_error` is the failure of the Whisper request that stood in
+        for (or raced) Gemini, if there was one; both errors are reported.
+        """
+        if not AIHelper._is_blocked_content(exc):
+            if whisper_error is not None:
+                return RuntimeError(
+                    f"Gemini transcription failed: {str(exc)}\n"
+                    f"OpenAI Whisper also failed: {str(whisper_error)}"
                 )
-            self.openai_client = OpenAI(api_key=openai_key)
+            return RuntimeError(f"Gemini transcription failed: {str(exc)}")
+        if whisper_error is not None:
+            return RuntimeError(
+                f"Gemini blocked transcription (copyrighted content detected).\n"
+                f"OpenAI Whisper fallback also failed: {str(whisper_error)}\n\n"
+                f"Try using a different video without copyrighted content."
+            )
+        return RuntimeError(
+            f"Gemini transcription failed: Copyrighted content detected.\n\n"
+            f"Gemini's safety filters blocked the transcription.\n"
+            f"To bypass this, add your OPENAI_API_KEY to .env file for Whisper fallback.\n\n"
+            f"Or use a video without copyrighted content."
+        )
 
-        # File is small enough - transcribe directly
-        with open(audio_path, "rb") as audio_file:
+    @traced
+    def _transcribe_with_openai(self, audio: AudioBuffer) -> dict:
+        """Fallback: Transcribe using OpenAI Whisper."""
+        client = self._ensure_openai_client()
+
+        # Audio is small enough - transcribe directly
+        with audio.reader() as audio_file:
             # Use whisper-1 model with verbose_json to get timestamps
-            response = self.openai_client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file,
-                response_format="verbose_json",
-            )
+            def request():
+                audio_file.seek(0)  # rewind in case this is a retry
+                return client.audio.transcriptions.create(
+                    model="whisper-1",
+                    file=(audio.name, audio_file),
+                    response_format="verbose_json",
+                )
 
+            response = self.call_guard.call("openai", "whisper-1", request)
+
+        return self._whisper_result(response)
+
+    @staticmethod
+    def _whisper_result(response) -> dict:
+        """Convert a verbose_json Whisper response into our transcript dict."""
         # response is an object with .text and .segments (if verbose_json)
         full_text = response.text or ""
         segments = []
@@ -518,120 +3467,64 @@ class AIHelper:
 
         return {"text": full_text, "segments": segments}
 
-    def _transcribe_large_audio_gemini(self, audio_path: str, file_size: int) -> dict:
-        """Split large audio into chunks and transcribe each with Gemini."""
-        if VideoFileClip is None:
-            raise RuntimeError("MoviePy is required to split large audio files.")
-
-        # Calculate number of chunks needed (aim for ~20 MB per chunk)
+    @staticmethod
+    def _audio_chunks(audio: AudioBuffer):
+        """Yield (start_seconds, chunk) pieces of ~20 MB, each closed once the caller moves on."""
         max_chunk_size = 20 * 1024 * 1024  # 20 MB to be safe
-        num_chunks = int((file_size / max_chunk_size) + 1)
-
-        # Load the audio to split it by time
-        from moviepy.editor import AudioFileClip
-        with AudioFileClip(audio_path) as audio:
-            duration = audio.duration
-            chunk_duration = duration / num_chunks
-
-            all_segments = []
-            full_text_parts = []
-
-            for i in range(num_chunks):
-                start_time = i * chunk_duration
-                end_time = min((i + 1) * chunk_duration, duration)
-
-                # Create temp chunk file
-                chunk_path = audio_path.replace(".mp3", f"_chunk_{i}.mp3")
-                try:
-                    chunk_audio = audio.subclip(start_time, end_time)
-                    chunk_audio.write_audiofile(
-                        chunk_path,
-                        bitrate="32k",
-                        verbose=False,
-                        logger=None
-                    )
-
-                    # Transcribe this chunk with Gemini
-                    chunk_result = self._transcribe_with_gemini(chunk_path)
-                    chunk_text = chunk_result.get("text", "")
-                    full_text_parts.append(chunk_text)
-
-                    # Adjust segment timestamps to account for chunk offset
-                    chunk_segments = chunk_result.get("segments", [])
-                    for seg in chunk_segments:
-                        all_segments.append({
-                            "start": seg["start"] + start_time,
-                            "end": seg["end"] + start_time,
-                            "text": seg["text"],
-                        })
-
-                finally:
-                    # Clean up chunk file
-                    if os.path.isfile(chunk_path):
-                        os.remove(chunk_path)
+        num_chunks = int((audio.size / max_chunk_size) + 1)
+        chunk_duration = audio.duration / num_chunks
+        for i in range(num_chunks):
+            start_time = i * chunk_duration
+            end_time = min((i + 1) * chunk_duration, audio.duration)
+            # Cut in memory; nothing is written next to the output
+            with audio.slice(start_time, end_time) as chunk:
+                yield start_time, chunk
+
+    @traced
+    def _transcribe_large_audio_gemini(self, audio: AudioBuffer) -> dict:
+        """Split large audio into chunks and transcribe each with Gemini."""
+        all_segments = []
+        full_text_parts = []
+
+        for start_time, chunk in self._audio_chunks(audio):
+            # Transcribe this chunk with Gemini
+            chunk_result = self._transcribe_with_gemini(chunk)
+            chunk_text = chunk_result.get("text", "")
+            full_text_parts.append(chunk_text)
+
+            # Adjust segment timestamps to account for chunk offset
+            chunk_segments = chunk_result.get("segments", [])
+            for seg in chunk_segments:
+                all_segments.append({
+                    "start": seg["start"] + start_time,
+                    "end": seg["end"] + start_time,
+                    "text": seg["text"],
+                })
 
         return {"text": " ".join(full_text_parts), "segments": all_segments}
 
-    def _transcribe_large_audio(self, audio_path: str, file_size: int) -> dict:
+    @traced
+    def _transcribe_large_audio(self, audio: AudioBuffer) -> dict:
         """Legacy method: Split large audio into chunks and transcribe with OpenAI Whisper."""
-        if VideoFileClip is None:
-            raise RuntimeError("MoviePy is required to split large audio files.")
-
-        # Calculate number of chunks needed (aim for ~20 MB per chunk)
-        max_chunk_size = 20 * 1024 * 1024  # 20 MB to be safe
-        num_chunks = int((file_size / max_chunk_size) + 1)
-
-        # Load the audio to split it by time
-        from moviepy.editor import AudioFileClip
-        with AudioFileClip(audio_path) as audio:
-            duration = audio.duration
-            chunk_duration = duration / num_chunks
-
-            all_segments = []
-            full_text_parts = []
-
-            for i in range(num_chunks):
-                start_time = i * chunk_duration
-                end_time = min((i + 1) * chunk_duration, duration)
-
-                # Create temp chunk file
-                chunk_path = audio_path.replace(".mp3", f"_chunk_{i}.mp3")
-                try:
-                    chunk_audio = audio.subclip(start_time, end_time)
-                    chunk_audio.write_audiofile(
-                        chunk_path,
-                        bitrate="32k",
-                        verbose=False,
-                        logger=None
-                    )
-
-                    # Transcribe this chunk
-                    with open(chunk_path, "rb") as chunk_file:
-                        response = self.openai_client.audio.transcriptions.create(
-                            model="whisper-1",
-                            file=chunk_file,
-                            response_format="verbose_json",
-                        )
-
-                    chunk_text = response.text or ""
-                    full_text_parts.append(chunk_text)
-
-                    # Adjust segment timestamps to account for chunk offset
-                    if hasattr(response, "segments") and response.segments:
-                        for seg in response.segments:
-                            all_segments.append({
-                                "start": getattr(seg, "start", 0.0) + start_time,
-                                "end": getattr(seg, "end", 0.0) + start_time,
-                                "text": getattr(seg, "text", "").strip(),
-                            })
-
-                finally:
-                    # Clean up chunk file
-                    if os.path.isfile(chunk_path):
-                        os.remove(chunk_path)
+        all_segments = []
+        full_text_parts = []
+
+        for start_time, chunk in self._audio_chunks(audio):
+            # Transcribe this chunk
+            chunk_result = self._transcribe_with_openai(chunk)
+            full_text_parts.append(chunk_result["text"])
+
+            # Adjust segment timestamps to account for chunk offset
+            for seg in chunk_result["segments"]:
+                all_segments.append({
+                    "start": seg["start"] + start_time,
+                    "end": seg["end"] + start_time,
+                    "text": seg["text"],
+                })
 
         return {"text": " ".join(full_text_parts), "segments": all_segments}
 
+    @traced
     def generate_video_metadata(self, context: str) -> dict:
         """Use an AI model to suggest title, description, and thumbnail idea.
 
@@ -643,7 +3536,14 @@ class AIHelper:
                 "AI is not configured. Set GEMINI_API_KEY or OPENAI_API_KEY in your .env file."
             )
 
-        prompt = (
+        content = self._generate_text(
+            self._metadata_prompt(context), system="You are a YouTube content expert."
+        )
+        return self._parse_metadata(content)
+
+    @staticmethod
+    def _metadata_prompt(context: str) -> str:
+        return (
             "You are a YouTube and TikTok content expert. "
             "Given information about a stand-up comedy video, you create "
             "an engaging YouTube-style title, a detailed description with "
@@ -654,20 +3554,8 @@ class AIHelper:
             "JSON:"
         )
 
-        if self.use_gemini:
-            # Use Gemini
-            response = self.gemini_model.generate_content(prompt)
-            content = response.text
-        else:
-            # Use OpenAI
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "You are a YouTube content expert."},
-                    {"role": "user", "content": prompt},
-                ],
-            )
-            content = response.choices[0].message.content
+    @staticmethod
+    def _parse_metadata(content: str) -> dict:
         try:
             data = json.loads(content)
         except Exception:
@@ -689,12 +3577,37 @@ class AIHelper:
             "thumbnail_idea": thumbnail_idea,
         }
 
+    # Used when no AI is configured or every provider failed
+    GENERIC_HASHTAGS = [
+        "#comedy", "#standup", "#funny", "#comedian", 
+        "#standupcomedy", "#humor", "#lol", "#laughs"
+    ]
+
+    @traced
     def generate_hashtags(self, title: str, description: str) -> list[str]:
         """Generate relevant hashtags for YouTube/TikTok based on clip content."""
         if not self.is_available():
             return ["#comedy", "#standup", "#funny"]
 
-        prompt = (
+        try:
+            content = self._generate_text(
+                self._hashtags_prompt(title, description),
+                system="You are a social media expert.",
+                temperature=0.5,
+            )
+            hashtags = self._parse_hashtags(content)
+            if hashtags is not None:
+                return hashtags
+        except Exception as e:
+            print(f"Hashtag generation failed, using generic hashtags: {str(e)}")
+
+        # Fallback hashtags if AI fails
+        self.call_guard.count("fallbacks", "generic_hashtags")
+        return list(self.GENERIC_HASHTAGS)
+
+    @staticmethod
+    def _hashtags_prompt(title: str, description: str) -> str:
+        return (
             "You are a social media expert specializing in YouTube and TikTok. "
             "Generate 10-15 relevant, trending hashtags for a comedy clip.\n\n"
             f"Title: {title}\n"
@@ -705,39 +3618,19 @@ class AIHelper:
             "JSON array:"
         )
 
-        try:
-            if self.use_gemini:
-                # Use Gemini
-                response = self.gemini_model.generate_content(prompt)
-                content = response.text
-            else:
-                # Use OpenAI
-                response = self.openai_client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {"role": "system", "content": "You are a social media expert."},
-                        {"role": "user", "content": prompt},
-                    ],
-                    temperature=0.5,
-                )
-                content = response.choices[0].message.content
-
-            # Try to parse as JSON array
-            start = content.find("[")
-            end = content.rfind("]")
-            if start != -1 and end != -1:
-                hashtags = json.loads(content[start : end + 1])
-                if isinstance(hashtags, list):
-                    return [str(h).strip() for h in hashtags if h]
-        except Exception:
-            pass
-
-        # Fallback hashtags if AI fails
-        return [
-            "#comedy", "#standup", "#funny", "#comedian", 
-            "#standupcomedy", "#humor", "#lol", "#laughs"
-        ]
-
+    @staticmethod
+    def _parse_hashtags(content: str) -> list[str] | None:
+        """Return the hashtags in an AI reply, or None if it has no JSON array."""
+        # Try to parse as JSON array
+        start = content.find("[")
+        end = content.rfind("]")
+        if start != -1 and end != -1:
+            hashtags = json.loads(content[start : end + 1])
+            if isinstance(hashtags, list):
+                return [str(h).strip() for h in hashtags if h]
+        return None
+
+    @traced
     def identify_story_clips(self, transcript: str, min_duration: int = 30, max_duration: int = 300) -> list[dict]:
         """Analyze a transcript and identify natural story/joke boundaries.
 
@@ -757,6 +3650,17 @@ class AIHelper:
         if not transcript or not transcript.strip():
             raise ValueError("Transcript is empty. Cannot identify clips without transcription.")
 
+        full_prompt = self._story_clips_prompt(transcript, min_duration, max_duration)
+        content = self._generate_text(
+            full_prompt,
+            system="You are an expert comedy video editor.",
+            openai_model="gpt-4o",
+            temperature=0.7,
+        )
+        return self._parse_story_clips(content, min_duration, max_duration)
+
+    @staticmethod
+    def _story_clips_prompt(transcript: str, min_duration: int, max_duration: int) -> str:
         # Check if transcript has timestamps
         if "[" not in transcript or "s" not in transcript:
             # Transcript doesn't have timestamps, add a note
@@ -824,22 +3728,10 @@ class AIHelper:
             '"thumbnail_idea": "Shocked comedian with hands up"}]\n\n'
             "JSON array:"
         )
+        return full_prompt
 
-        if self.use_gemini:
-            # Use Gemini
-            response = self.gemini_model.generate_content(full_prompt)
-            content = response.text
-        else:
-            # Use OpenAI (gpt-4o)
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "You are an expert comedy video editor."},
-                    {"role": "user", "content": full_prompt},
-                ],
-                temperature=0.7,
-            )
-            content = response.choices[0].message.content
+    @staticmethod
+    def _parse_story_clips(content: str, min_duration: int, max_duration: int) -> list[dict]:
         try:
             clips = json.loads(content)
         except Exception:
@@ -880,15 +3772,679 @@ class AIHelper:
         return validated
 
 
-class ThumbnailGenerator:
-    """Generate YouTube-style thumbnails for video clips."""
-    
+    # ------------- Async API -------------
+    # Coroutine versions of the public methods, built on the providers' async
+    # clients. They share AIHelper.call_guard (rate limits, breakers,
+    # per-provider semaphores) and are meant to run on one event loop, e.g.
+    # AsyncLoopThread.get().
+
+    def _ensure_async_openai_client(self):
+        if self.async_openai_client is None:
+            openai_key = os.getenv("OPENAI_API_KEY")
+            if not openai_key or not load_openai():
+                raise RuntimeError(
+                    "Neither Gemini nor OpenAI is configured for transcription."
+                )
+            self.async_openai_client = AsyncOpenAI(api_key=openai_key)
+        return self.async_openai_client
+
+    async def _generate_text_async(
+        self,
+        prompt: str,
+        system: str,
+        openai_model: str = "gpt-4o-mini",
+        temperature: float | None = None,
+    ) -> str:
+        """Async version of `_generate_text`, with the same failover rules."""
+        async def call_gemini() -> str:
+            response = await self.call_guard.call_async(
+                "gemini", self.GEMINI_MODEL, self.gemini_model.generate_content_async, prompt
+            )
+            return response.text
+
+        async def call_openai() -> str:
+            client = self._ensure_async_openai_client()
+            kwargs = {}
+            if temperature is not None:
+                kwargs["temperature"] = temperature
+            response = await self.call_guard.call_async(
+                "openai",
+                openai_model,
+                client.chat.completions.create,
+                model=openai_model,
+                messages=[
+                    {"role": "system", "content": system},
+                    {"role": "user", "content": prompt},
+                ],
+                **kwargs,
+            )
+            return response.choices[0].message.content
+
+        if not self.use_gemini:
+            return await call_openai()
+
+        try:
+            return await call_gemini()
+        except Exception as exc:
+            if not self._has_openai() or not (isinstance(exc, CircuitOpenError) or is_transient_error(exc)):
+                raise
+            print(f"Gemini unavailable ({exc}). Falling back to OpenAI...")
+            self.call_guard.count("gemini", "failovers")
+            return await call_openai()
+
+    @traced
+    async def transcribe_audio_async(self, audio: "AudioBuffer | str") -> dict:
+        """Async version of `transcribe_audio`."""
+        if not self.is_available():
+            raise RuntimeError(
+                "AI is not configured. Set GEMINI_API_KEY in your .env file."
+            )
+        if isinstance(audio, str):
+            with await asyncio.to_thread(AudioBuffer.from_file, audio) as buffer:
+                return await self.transcribe_audio_async(buffer)
+
+        if self.use_gemini:
+            return await self._transcribe_with_gemini_async(audio)
+        return await self._transcribe_with_openai_async(audio)
+
+    @traced
+    async def _transcribe_with_gemini_async(self, audio: AudioBuffer) -> dict:
+        hedge = None
+        started = time.perf_counter()
+        transcription = asyncio.ensure_future(self._gemini_transcription_async(audio))
+        try:
+            delay = self.hedge_policy.delay("gemini", audio.duration) if self._has_openai() else None
+            if delay is not None:
+                done, _ = await asyncio.wait({transcription}, timeout=delay)
+                if not done:
+                    # Slower than usual: race Whisper against it
+                    print(f"Gemini is slower than usual (>{delay:.0f}s). Starting OpenAI Whisper alongside...")
+                    self.call_guard.count("gemini", "hedges")
+                    hedge = asyncio.ensure_future(self._transcribe_with_openai_async(audio))
+                    return await self._first_transcription(transcription, hedge, started, audio.duration)
+            result = await transcription
+            self.hedge_policy.record("gemini", time.perf_counter() - started, audio.duration)
+            return result
+
+        except Exception as e:
+            if hedge is not None:
+                raise  # Whisper already had its go
+            print(f"Gemini transcription error: {str(e)}")
+
+            if (isinstance(e, CircuitOpenError) or is_transient_error(e)) and self._has_openai():
+                print("Gemini is unavailable. Falling back to OpenAI Whisper...")
+                self.call_guard.count("gemini", "failovers")
+                try:
+                    return await self._transcribe_with_openai_async(audio)
+                except Exception as whisper_error:
+                    raise self._gemini_transcription_failure(e, whisper_error)
+
+            if self._is_blocked_content(e) and self._has_openai():
+                print("Gemini detected copyrighted content. Falling back to OpenAI Whisper...")
+                try:
+                    return await self._transcribe_with_openai_async(audio)
+                except Exception as whisper_error:
+                    raise self._gemini_transcription_failure(e, whisper_error)
+            raise self._gemini_transcription_failure(e)
+        finally:
+            transcription.cancel()  # only matters if this call itself was cancelled
+
+    async def _first_transcription(self, transcription, hedge, started: float, media_seconds: float) -> dict:
+        """Result of whichever of the Gemini task and its Whisper hedge succeeds first; the other is cancelled."""
+        errors = {}
+        pending = {transcription, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        errors[task] = task.exception()
+                        print(f"{'Whisper' if task is hedge else 'Gemini'} transcription error: {errors[task]}")
+                        continue
+                    if task is hedge:
+                        print("OpenAI Whisper finished first; cancelling the Gemini request.")
+                        self.call_guard.count("gemini", "hedge_wins")
+                    # Gemini's time so far when it lost: a lower bound, still worth keeping
+                    self.hedge_policy.record("gemini", time.perf_counter() - started, media_seconds)
+                    return task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+        raise self._gemini_transcription_failure(errors[transcription], errors[hedge])
+
+    async def _gemini_transcription_async(self, audio: AudioBuffer) -> dict:
+        """Upload, wait for processing and transcribe with Gemini, leaving errors to the caller."""
+        model = self.gemini_model  # configures the SDK for the upload
+        # The Files API has no async client; the upload and status polls
+        # are a handful of short calls, so they run in the default executor.
+        print(f"Uploading audio to Gemini: {audio.name} ({audio.size / 2**20:.1f} MB)")
+        with metrics.timed("upload", provider="gemini", bytes=audio.size):
+            audio_file = await self.call_guard.call_async(
+                "gemini", "files", asyncio.to_thread, self._upload_to_gemini, audio
+            )
+
+        waited = 0
+        with tracer.async_span("gemini processing wait"):
+            while audio_file.state.name == "PROCESSING":
+                if waited >= self.GEMINI_MAX_PROCESSING_WAIT:
+                    raise RuntimeError(
+                        f"Gemini is taking too long to process the audio "
+                        f"(>{self.GEMINI_MAX_PROCESSING_WAIT}s). Try a shorter video."
+                    )
+                await asyncio.sleep(2)
+                waited += 2
+                audio_file = await self.call_guard.call_async(
+                    "gemini", "files", asyncio.to_thread, genai.get_file, audio_file.name
+                )
+
+        if audio_file.state.name == "FAILED":
+            raise RuntimeError(f"Gemini failed to process audio file: {audio_file.state}")
+
+        response = await self.call_guard.call_async(
+            "gemini",
+            self.GEMINI_MODEL,
+            model.generate_content_async,
+            [self.TRANSCRIPTION_PROMPT, audio_file],
+        )
+        if not response or not response.text:
+            raise RuntimeError("Gemini returned empty response for transcription")
+
+        return {"text": response.text.strip(), "segments": []}
+
+    @traced
+    async def _transcribe_with_openai_async(self, audio: AudioBuffer) -> dict:
+        max_size = 25 * 1024 * 1024  # OpenAI Whisper limit
+        if audio.size > max_size:
+            # Chunks are cut by ffmpeg between the uploads, so the split
+            # path runs in a worker thread.
+            return await asyncio.to_thread(self._transcribe_large_audio, audio)
+
+        client = self._ensure_async_openai_client()
+        with audio.reader() as audio_file:
+            async def request():
+                audio_file.seek(0)  # rewind in case this is a retry
+                return await client.audio.transcriptions.create(
+                    model="whisper-1",
+                    file=(audio.name, audio_file),
+                    response_format="verbose_json",
+                )
+
+            response = await self.call_guard.call_async("openai", "whisper-1", request)
+
+        return self._whisper_result(response)
+
+    @traced
+    async def generate_video_metadata_async(self, context: str) -> dict:
+        """Async version of `generate_video_metadata`."""
+        if not self.is_available():
+            raise RuntimeError(
+                "AI is not configured. Set GEMINI_API_KEY or OPENAI_API_KEY in your .env file."
+            )
+
+        content = await self._generate_text_async(
+            self._metadata_prompt(context), system="You are a YouTube content expert."
+        )
+        return self._parse_metadata(content)
+
+    @traced
+    async def generate_hashtags_async(self, title: str, description: str) -> list[str]:
+        """Async version of `generate_hashtags`."""
+        if not self.is_available():
+            return ["#comedy", "#standup", "#funny"]
+
+        try:
+            content = await self._generate_text_async(
+                self._hashtags_prompt(title, description),
+                system="You are a social media expert.",
+                temperature=0.5,
+            )
+            hashtags = self._parse_hashtags(content)
+            if hashtags is not None:
+                return hashtags
+        except Exception as e:
+            print(f"Hashtag generation failed, using generic hashtags: {str(e)}")
+
+        self.call_guard.count("fallbacks", "generic_hashtags")
+        return list(self.GENERIC_HASHTAGS)
+
+    @traced
+    async def identify_story_clips_async(
+        self, transcript: str, min_duration: int = 30, max_duration: int = 300
+    ) -> list[dict]:
+        """Async version of `identify_story_clips`."""
+        if not self.is_available():
+            raise RuntimeError(
+                "AI is not configured. Set GEMINI_API_KEY or OPENAI_API_KEY in your .env file."
+            )
+
+        if not transcript or not transcript.strip():
+            raise ValueError("Transcript is empty. Cannot identify clips without transcription.")
+
+        content = await self._generate_text_async(
+            self._story_clips_prompt(transcript, min_duration, max_duration),
+            system="You are an expert comedy video editor.",
+            openai_model="gpt-4o",
+            temperature=0.7,
+        )
+        return self._parse_story_clips(content, min_duration, max_duration)
+
+
+class ThumbnailRenderer:
+    """Fonts and backgrounds shared by every thumbnail the process draws.
+
+    Fonts are loaded once per thread (FreeType faces are not safe to share
+    between the composition workers); backgrounds are built once per size
+    and color and must be copied before drawing on them.
+    """
+
+    TITLE_FONTS = (
+        "C:/Windows/Fonts/arialbd.ttf",  # Windows
+        "/System/Library/Fonts/Helvetica.ttc",  # macOS
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",  # Linux
+    )
+    AI_FONTS = ("C:/Windows/Fonts/impact.ttf",) + TITLE_FONTS
+    EMOJI_FONTS = ("C:/Windows/Fonts/seguiemj.ttf",)
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+
+    def font(self, paths: tuple[str, ...], size: int, fallback: bool = True):
+        """Return the first of `paths` that loads at `size`.
+
+        Falls back to Pillow's default font, or None with fallback=False.
+        """
+        fonts = self._local.__dict__.setdefault("fonts", {})
+        key = (paths, size, fallback)
+        if key not in fonts:
+            font = None
+            for path in paths:
+                if os.path.exists(path):
+                    try:
+                        font = ImageFont.truetype(path, size)
+                        break
+                    except OSError:
+                        continue
+            if font is None and fallback:
+                font = ImageFont.load_default()
+            fonts[key] = font
+        return fonts[key]
+
+    @staticmethod
+    @functools.lru_cache(maxsize=16)
+    def bar(size: tuple[int, int], color: tuple[int, int, int, int]):
+        """A translucent RGBA bar, pasted with itself as the mask."""
+        return Image.new("RGBA", size, color)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=32)
+    def gradient(size: tuple[int, int], color: str):
+        """`color` darkened by black fading from 1/3 opacity at the top to none at the bottom."""
+        width, height = size
+        rgb = np.array(ImageColor.getrgb(color)[:3], dtype=np.float32)
+        alpha = (255 * (1 - np.arange(height) / height)).astype(np.int32) // 3 / 255
+        rows = np.rint(rgb * (1 - alpha[:, None])).astype(np.uint8)
+        return Image.fromarray(np.ascontiguousarray(np.broadcast_to(rows[:, None, :], (height, width, 3))), "RGB")
+
+
+thumbnail_renderer = ThumbnailRenderer()
+
+
+class ThumbnailGenerator:
+    """Generate YouTube-style thumbnails for video clips."""
+
+    # Candidate frames scored per clip by create_thumbnails, and the height
+    # of the low-res copy they are decoded at
+    CANDIDATES = 32
+    CANDIDATE_HEIGHT = 144
+
+    # Output variants, by name. `suffix` is appended to the thumbnail's base
+    # name; `crop` is "center" (crop to the aspect ratio) or "stretch".
+    VARIANTS = {
+        "youtube": {"size": (1280, 720), "crop": "center", "format": "JPEG", "quality": 95, "suffix": ""},
+        "shorts": {"size": (1080, 1920), "crop": "center", "format": "JPEG", "quality": 90, "suffix": "_9x16"},
+        "preview": {"size": (320, 180), "crop": "center", "format": "WEBP", "quality": 80, "suffix": "_preview"},
+    }
+    DEFAULT_VARIANTS = ("youtube",)
+    FORMAT_EXTENSIONS = {"JPEG": ".jpg", "WEBP": ".webp", "PNG": ".png"}
+
+    @staticmethod
+    def variant_path(output_path: str, variant: dict) -> str:
+        """Where `variant` of the thumbnail at `output_path` is written."""
+        extension = ThumbnailGenerator.FORMAT_EXTENSIONS[variant["format"]]
+        return os.path.splitext(output_path)[0] + variant.get("suffix", "") + extension
+
+    @staticmethod
+    def _fit(img, size: tuple[int, int], crop: str):
+        """Resize `img` to `size`, cropping around the center to keep its aspect ratio."""
+        if crop == "center":
+            width, height = img.size
+            target = size[0] / size[1]
+            if width / height > target:
+                crop_width = round(height * target)
+                left = (width - crop_width) // 2
+                img = img.crop((left, 0, left + crop_width, height))
+            else:
+                crop_height = round(width / target)
+                top = (height - crop_height) // 2
+                img = img.crop((0, top, width, top + crop_height))
+        return img.resize(size, Image.Resampling.LANCZOS)
+
+    @staticmethod
+    def _title_overlay(title: str, width: int):
+        """The title bar with the title on it, as an RGBA layer `width` wide.
+
+        Laid out for 1280 wide and scaled with the width, so the text wraps
+        the same way at every size.
+        """
+        scale = width / 1280
+        bar_height = round(180 * scale)
+        overlay = thumbnail_renderer.bar((width, bar_height), (0, 0, 0, 200)).copy()
+        draw = ImageDraw.Draw(overlay)
+        font = thumbnail_renderer.font(ThumbnailRenderer.TITLE_FONTS, round(60 * scale))
+        
+        # Prepare text - split into lines if too long
+        max_chars = 40
+        if len(title) > max_chars:
+            words = title.split()
+            lines = []
+            current_line = []
+            for word in words:
+                current_line.append(word)
+                if len(' '.join(current_line)) > max_chars:
+                    current_line.pop()
+                    lines.append(' '.join(current_line))
+                    current_line = [word]
+            if current_line:
+                lines.append(' '.join(current_line))
+            title_text = '\n'.join(lines[:3])  # Max 3 lines
+        else:
+            title_text = title
+        
+        # Draw yellowish white text with a black outline for readability
+        draw.text(
+            (round(40 * scale), round(30 * scale)),
+            title_text,
+            font=font,
+            fill=(255, 255, 100, 255),
+            stroke_width=max(1, round(2 * scale)),
+            stroke_fill=(0, 0, 0, 255),
+        )
+        return overlay
+
+    @staticmethod
+    def compose_thumbnail(
+        frame,
+        output_path: str,
+        title: str,
+        logo=None,
+        logo_position: str = "bottom-right",
+        variants: list[dict] | None = None,
+    ) -> list[str]:
+        """Turn a video frame (RGB array) into thumbnails with the title on a bar.
+
+        Writes one image per entry of `variants` (see VARIANTS; default
+        the 1280x720 JPEG) at variant_path(output_path, variant). The title
+        is laid out and drawn once, at the widest variant, and scaled for
+        the others. `logo` is an optional RGBA Pillow image pasted onto the
+        frame first, the way the render overlays it. Returns the paths
+        written; raises on failure.
+        """
+        if not load_pil():
+            raise RuntimeError("Pillow (PIL) is not installed")
+        variants = variants or [ThumbnailGenerator.VARIANTS[name] for name in ThumbnailGenerator.DEFAULT_VARIANTS]
+
+        # Convert frame to PIL Image
+        img = Image.fromarray(frame)
+        if logo is not None:
+            # Same placement as the logo ImageClip in the rendered clip
+            horizontal, vertical = VideoProcessor._get_logo_position(logo_position)
+            x = img.width - logo.width if horizontal == "right" else 0
+            y = img.height - logo.height if vertical == "bottom" else 0
+            img.paste(logo, (x, y), logo)
+
+        overlay = ThumbnailGenerator._title_overlay(title, max(variant["size"][0] for variant in variants))
+        paths = []
+        for variant in variants:
+            width, height = variant["size"]
+            canvas = ThumbnailGenerator._fit(img, (width, height), variant.get("crop", "center"))
+            layer = overlay
+            if layer.width != width:
+                layer = layer.resize((width, round(layer.height * width / layer.width)), Image.Resampling.LANCZOS)
+            canvas.paste(layer, (0, height - layer.height), layer)
+
+            path = ThumbnailGenerator.variant_path(output_path, variant)
+            canvas.save(path, variant["format"], quality=variant.get("quality", 95))
+            print(f"Thumbnail saved: {path}")
+            paths.append(path)
+        return paths
+
+    @staticmethod
+    def thumbnail_time(
+        start_time: float,
+        end_time: float,
+        intro_duration: float = 0.0,
+        outro_duration: float = 0.0,
+        fraction: float = 1 / 3,
+    ) -> tuple[str, float]:
+        """Locate the frame `fraction` of the way into the rendered clip.
+
+        The rendered clip is intro + [start_time, end_time] + outro; the
+        default is the frame create_thumbnail would pick, 1/3 into it.
+        Returns ("intro" | "main" | "outro", time within that video).
+        """
+        length = end_time - start_time
+        timestamp = (intro_duration + length + outro_duration) * fraction
+        if timestamp < intro_duration:
+            return "intro", timestamp
+        timestamp -= intro_duration
+        if timestamp < length:
+            return "main", start_time + timestamp
+        return "outro", min(timestamp - length, outro_duration)
+
+    @staticmethod
+    def score_frames(frames, next_frames):
+        """Score a batch of candidate frames for use as a thumbnail.
+
+        `frames` and `next_frames` are uint8 arrays of shape (n, h, w, 3);
+        `next_frames` holds the frame right after each candidate. Rewards
+        sharpness (variance of the Laplacian), exposure near mid-grey and
+        contrast, and penalizes motion between a frame and the next one
+        (motion blur, blinks). Returns one score per frame.
+        """
+        weights = np.array([0.299, 0.587, 0.114], dtype=np.float32) / 255
+        luma = frames.astype(np.float32) @ weights
+        next_luma = next_frames.astype(np.float32) @ weights
+
+        laplacian = (
+            luma[:, :-2, 1:-1] + luma[:, 2:, 1:-1] + luma[:, 1:-1, :-2] + luma[:, 1:-1, 2:]
+            - 4 * luma[:, 1:-1, 1:-1]
+        )
+        sharpness = laplacian.var(axis=(1, 2))
+        mean = luma.mean(axis=(1, 2))
+        clipped = ((luma < 0.02) | (luma > 0.98)).mean(axis=(1, 2))
+        exposure = np.clip(1 - np.abs(mean - 0.45) / 0.45, 0, 1) - clipped
+        contrast = luma.std(axis=(1, 2))
+        motion = np.abs(luma - next_luma).mean(axis=(1, 2))
+
+        def relative(values):
+            peak = values.max()
+            return values / peak if peak > 0 else values
+
+        return (
+            0.4 * relative(sharpness)
+            + 0.25 * exposure
+            + 0.2 * relative(contrast)
+            - 0.15 * relative(motion)
+        )
+
+    @staticmethod
+    @traced
+    def best_frame_times(
+        input_path: str,
+        ranges: list[tuple[float, float]],
+        candidates: int | None = None,
+        intro_path: str | None = None,
+        outro_path: str | None = None,
+    ) -> list[tuple[str, float]]:
+        """Pick the best thumbnail frame of each clip cut at (start, end).
+
+        Candidates are spread evenly over every rendered clip, intro and
+        outro included (placed as by thumbnail_time), and decoded from
+        low-res copies of the videos in one sorted pass; a frame several
+        clips share is decoded once. They are then scored as one batch per
+        clip with score_frames. Returns (source, time) per range, like
+        thumbnail_time.
+        """
+        if not load_moviepy():
+            raise RuntimeError(f"MoviePy could not be imported. Details: {moviepy_import_error!r}")
+        candidates = candidates or ThumbnailGenerator.CANDIDATES
+        frames = [[] for _ in ranges]
+        with ExitStack() as stack:
+            readers = {
+                name: keyframe_index.attach(stack.enter_context(VideoFileClip(
+                    path, audio=False, target_resolution=(ThumbnailGenerator.CANDIDATE_HEIGHT, None)
+                )))
+                for name, path in (("main", input_path), ("intro", intro_path), ("outro", outro_path))
+                if path
+            }
+            intro = readers["intro"].duration if "intro" in readers else 0.0
+            outro = readers["outro"].duration if "outro" in readers else 0.0
+            samples = sorted(
+                ThumbnailGenerator.thumbnail_time(float(start), float(end), intro, outro, fraction) + (r,)
+                for r, (start, end) in enumerate(ranges)
+                # Skip the very edges, where cuts and fades sit
+                for fraction in np.linspace(0, 1, candidates + 2)[1:-1]
+            )
+            last = None
+            for source, timestamp, r in samples:
+                reader = readers[source]
+                step = 1.0 / (reader.fps or 25)
+                timestamp = max(0.0, min(timestamp, reader.duration - 2 * step))
+                # Sorted, so clips sharing a frame ask for it one after another
+                if last is None or last[0] != (source, timestamp):
+                    last = (source, timestamp), reader.get_frame(timestamp), reader.get_frame(timestamp + step)
+                frames[r].append(last)
+
+        best = []
+        for r, (start, end) in enumerate(ranges):
+            if not frames[r]:
+                best.append(ThumbnailGenerator.thumbnail_time(float(start), float(end), intro, outro))
+                continue
+            times, current, following = zip(*frames[r])
+            scores = ThumbnailGenerator.score_frames(np.stack(current), np.stack(following))
+            best.append(times[int(scores.argmax())])
+        return best
+
+    @staticmethod
+    @traced
+    def create_thumbnails(
+        input_path: str,
+        items: list[dict],
+        intro_path: str | None = None,
+        outro_path: str | None = None,
+        logo_path: str | None = None,
+        logo_position: str = "bottom-right",
+        max_workers: int | None = None,
+        candidates: int | None = None,
+        variants: list[dict] | None = None,
+    ) -> list[bool]:
+        """Create the frame thumbnails of many clips cut from one source.
+
+        `items` are dicts with 'start_time', 'end_time' (in the source),
+        'output_path' and 'title'. Instead of opening every rendered clip,
+        the frames are read from the source in one sorted pass, so each
+        file is opened once and decoded forward, and the logo is pasted
+        where the render puts it. The text overlays are composed on a
+        thread pool while the next frames decode.
+
+        Each clip's frame is the best of `candidates` (default CANDIDATES)
+        from the whole rendered clip, scored by best_frame_times; only the
+        winners are decoded at full resolution, once each. With
+        candidates=1 it is the frame create_thumbnail would pick, 1/3 into
+        the rendered clip. Either may fall in the intro or outro. Every
+        clip gets each of `variants` (see compose_thumbnail).
+
+        Returns a success flag per item.
+        """
+        results = [False] * len(items)
+        if not load_pil():
+            print("Pillow (PIL) not installed. Skipping thumbnail generation.")
+            return results
+        if not load_moviepy():
+            print("MoviePy not available. Skipping thumbnail generation.")
+            return results
+
+        readers = {}
+        try:
+            if candidates == 1:
+                for name, path in (("intro", intro_path), ("outro", outro_path)):
+                    if path:
+                        readers[name] = VideoFileClip(path, audio=False)
+                requests = sorted(
+                    ThumbnailGenerator.thumbnail_time(
+                        float(item["start_time"]),
+                        float(item["end_time"]),
+                        readers["intro"].duration if "intro" in readers else 0.0,
+                        readers["outro"].duration if "outro" in readers else 0.0,
+                    ) + (i,)
+                    for i, item in enumerate(items)
+                )
+            else:
+                best = ThumbnailGenerator.best_frame_times(
+                    input_path,
+                    [(float(item["start_time"]), float(item["end_time"])) for item in items],
+                    candidates,
+                    intro_path,
+                    outro_path,
+                )
+                requests = sorted(winner + (i,) for i, winner in enumerate(best))
+            logo = None
+            if logo_path and os.path.isfile(logo_path):
+                logo = Image.open(logo_path).convert("RGBA")
+            paths = {"main": input_path, "intro": intro_path, "outro": outro_path}
+            for source in sorted({source for source, _, _ in requests} - set(readers)):
+                readers[source] = keyframe_index.attach(VideoFileClip(paths[source], audio=False))
+
+            workers = max_workers or min(4, os.cpu_count() or 1)
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumbnail") as pool:
+                futures = {}
+                frame_key, frame = None, None
+                for source, timestamp, i in requests:
+                    reader = readers[source]
+                    # Stay a frame clear of the end, where MoviePy can't read
+                    timestamp = max(0.0, min(timestamp, reader.duration - 1.0 / (reader.fps or 25)))
+                    if frame_key != (source, timestamp):
+                        frame_key, frame = (source, timestamp), reader.get_frame(timestamp)
+                    futures[i] = pool.submit(
+                        ThumbnailGenerator.compose_thumbnail,
+                        frame,
+                        items[i]["output_path"],
+                        items[i]["title"],
+                        logo,
+                        logo_position,
+                        variants,
+                    )
+                for i, future in futures.items():
+                    try:
+                        future.result()
+                        results[i] = True
+                    except Exception as e:
+                        print(f"Error creating thumbnail {items[i]['output_path']}: {str(e)}")
+        except Exception as e:
+            print(f"Error extracting thumbnail frames from {input_path}: {str(e)}")
+        finally:
+            for reader in readers.values():
+                reader.close()
+        return results
+
     @staticmethod
+    @traced
     def create_thumbnail(
         video_path: str,
         output_path: str,
         title: str,
-        thumbnail_idea: str = ""
+        thumbnail_idea: str = "",
+        variants: list[dict] | None = None
     ) -> bool:
         """Create a YouTube thumbnail from a video frame with text overlay.
         
@@ -897,15 +4453,16 @@ class ThumbnailGenerator:
             output_path: Where to save the thumbnail (e.g., 'clip_1_thumbnail.jpg')
             title: Title text to overlay on thumbnail
             thumbnail_idea: AI-generated idea for what to capture (optional)
+            variants: Sizes/formats to write (see VARIANTS), default 1280x720 JPEG
         
         Returns:
             True if successful, False otherwise
         """
-        if not PIL_AVAILABLE:
+        if not load_pil():
             print("Pillow (PIL) not installed. Skipping thumbnail generation.")
             return False
         
-        if VideoFileClip is None:
+        if not load_moviepy():
             print("MoviePy not available. Skipping thumbnail generation.")
             return False
         
@@ -916,90 +4473,7 @@ class ThumbnailGenerator:
                 timestamp = video.duration / 3
                 frame = video.get_frame(timestamp)
             
-            # Convert frame to PIL Image
-            img = Image.fromarray(frame)
-            
-            # Resize to YouTube thumbnail size (1280x720)
-            img = img.resize((1280, 720), Image.Resampling.LANCZOS)
-            
-            # Create a semi-transparent overlay for text
-            overlay = Image.new('RGBA', img.size, (0, 0, 0, 0))
-            draw = ImageDraw.Draw(overlay)
-            
-            # Draw semi-transparent black bar at bottom for text
-            bar_height = 180
-            draw.rectangle(
-                [(0, 720 - bar_height), (1280, 720)],
-                fill=(0, 0, 0, 200)  # Black with 200/255 opacity
-            )
-            
-            # Try to load a bold font, fallback to default if not available
-            try:
-                # Try common font paths (works on Windows, Mac, Linux)
-                font_size = 60
-                font_paths = [
-                    "C:/Windows/Fonts/arialbd.ttf",  # Windows
-                    "/System/Library/Fonts/Helvetica.ttc",  # macOS
-                    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",  # Linux
-                ]
-                font = None
-                for font_path in font_paths:
-                    if os.path.exists(font_path):
-                        font = ImageFont.truetype(font_path, font_size)
-                        break
-                if font is None:
-                    font = ImageFont.load_default()
-            except Exception:
-                font = ImageFont.load_default()
-            
-            # Prepare text - split into lines if too long
-            max_chars = 40
-            if len(title) > max_chars:
-                words = title.split()
-                lines = []
-                current_line = []
-                for word in words:
-                    current_line.append(word)
-                    if len(' '.join(current_line)) > max_chars:
-                        current_line.pop()
-                        lines.append(' '.join(current_line))
-                        current_line = [word]
-                if current_line:
-                    lines.append(' '.join(current_line))
-                title_text = '\n'.join(lines[:3])  # Max 3 lines
-            else:
-                title_text = title
-            
-            # Draw text with outline for better readability
-            text_y = 720 - bar_height + 30
-            text_x = 40
-            
-            # Draw outline (black)
-            for offset_x in [-2, -1, 0, 1, 2]:
-                for offset_y in [-2, -1, 0, 1, 2]:
-                    draw.text(
-                        (text_x + offset_x, text_y + offset_y),
-                        title_text,
-                        font=font,
-                        fill=(0, 0, 0, 255)
-                    )
-            
-            # Draw main text (white/yellow)
-            draw.text(
-                (text_x, text_y),
-                title_text,
-                font=font,
-                fill=(255, 255, 100, 255)  # Yellowish white
-            )
-            
-            # Convert back to RGB and composite
-            img = img.convert('RGBA')
-            img = Image.alpha_composite(img, overlay)
-            img = img.convert('RGB')
-            
-            # Save as JPEG
-            img.save(output_path, 'JPEG', quality=95)
-            print(f"Thumbnail saved: {output_path}")
+            ThumbnailGenerator.compose_thumbnail(frame, output_path, title, variants=variants)
             return True
             
         except Exception as e:
@@ -1007,6 +4481,7 @@ class ThumbnailGenerator:
             return False
     
     @staticmethod
+    @traced
     def create_ai_thumbnail(
         output_path: str,
         title: str,
@@ -1024,7 +4499,7 @@ class ThumbnailGenerator:
         Returns:
             True if successful, False otherwise
         """
-        if genai is None:
+        if not load_genai():
             print("Google Generative AI not available. Skipping AI thumbnail generation.")
             return False
         
@@ -1071,7 +4546,9 @@ class ThumbnailGenerator:
                 "Return as JSON: {\"bg_color\": \"#...\", \"text_color\": \"#...\", \"emoji\": \"...\", \"text\": \"...\"}"
             )
             
-            response = model.generate_content(design_prompt)
+            response = AIHelper.call_guard.call(
+                "gemini", "gemini-2.0-flash-exp", model.generate_content, design_prompt
+            )
             content = response.text.strip()
             
             # Parse JSON response
@@ -1090,45 +4567,20 @@ class ThumbnailGenerator:
                 }
             
             # Create thumbnail using PIL with AI-suggested design
-            if not PIL_AVAILABLE:
+            if not load_pil():
                 print("Pillow not available for AI thumbnail rendering.")
                 return False
             
-            # Create base image
-            img = Image.new('RGB', (1280, 720), color=design.get('bg_color', '#FF6B35'))
+            # Base image: AI background color with a dark gradient at the top
+            img = thumbnail_renderer.gradient((1280, 720), design.get('bg_color', '#FF6B35')).copy()
             draw = ImageDraw.Draw(img)
-            
-            # Add gradient effect
-            for i in range(720):
-                alpha = int(255 * (1 - i / 720))
-                draw.rectangle([(0, i), (1280, i+1)], fill=(0, 0, 0, alpha // 3))
-            
-            # Load font
-            try:
-                font_size = 80
-                font_paths = [
-                    "C:/Windows/Fonts/impact.ttf",
-                    "C:/Windows/Fonts/arialbd.ttf",
-                    "/System/Library/Fonts/Helvetica.ttc",
-                    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
-                ]
-                font = None
-                for font_path in font_paths:
-                    if os.path.exists(font_path):
-                        font = ImageFont.truetype(font_path, font_size)
-                        break
-                if font is None:
-                    font = ImageFont.load_default()
-            except Exception:
-                font = ImageFont.load_default()
+            font = thumbnail_renderer.font(ThumbnailRenderer.AI_FONTS, 80)
             
             # Draw emoji at top
             emoji = design.get('emoji', '😂')
-            try:
-                emoji_font = ImageFont.truetype("C:/Windows/Fonts/seguiemj.ttf", 120)
+            emoji_font = thumbnail_renderer.font(ThumbnailRenderer.EMOJI_FONTS, 120, fallback=False)
+            if emoji_font is not None:  # Skip emoji if font not available
                 draw.text((1280//2, 100), emoji, font=emoji_font, fill='white', anchor='mm')
-            except:
-                pass  # Skip emoji if font not available
             
             # Draw text with outline
             text = design.get('text', title)[:80]
@@ -1155,23 +4607,15 @@ class ThumbnailGenerator:
             # Draw text lines
             y_offset = 350
             for line in lines[:3]:
-                # Draw outline
-                for offset_x in [-3, -2, -1, 0, 1, 2, 3]:
-                    for offset_y in [-3, -2, -1, 0, 1, 2, 3]:
-                        draw.text(
-                            (1280//2 + offset_x, y_offset + offset_y),
-                            line,
-                            font=font,
-                            fill='black',
-                            anchor='mm'
-                        )
-                # Draw main text
+                # Draw text with a black outline
                 draw.text(
                     (1280//2, y_offset),
                     line,
                     font=font,
                     fill=text_color,
-                    anchor='mm'
+                    anchor='mm',
+                    stroke_width=3,
+                    stroke_fill='black'
                 )
                 y_offset += 90
             
@@ -1185,6 +4629,731 @@ class ThumbnailGenerator:
             return False
 
 
+class PipelineError(RuntimeError):
+    """A Smart Clips stage failed. `title` names the stage for display."""
+
+    def __init__(self, title: str, message: str) -> None:
+        super().__init__(message)
+        self.title = title
+
+
+class NoClipsFoundError(PipelineError):
+    """The AI did not find any usable clip in the transcript."""
+
+
+class PipelineCancelled(PipelineError):
+    """The pipeline's cancel event was set before it finished."""
+
+    def __init__(self, message: str = "The job was cancelled.") -> None:
+        super().__init__("Cancelled", message)
+
+
+class SmartClipsPipeline:
+    """The Smart Clips workflow, independent of any user interface.
+
+    Extracts audio, transcribes it, asks the AI for complete jokes/stories,
+    then renders every clip with its subtitles, hashtags, .txt file and
+    thumbnail on a TaskScheduler. Progress is reported through the optional
+    `progress` callback as dicts with a `stage` and `message`; per-clip task
+    events also carry `task`, `done`, `total`, `error` and `eta_seconds`.
+    Those are invoked from the thread that called `run`. While clips
+    encode, "encode" events with `clip`, `clips`, `index`, `total` (frames)
+    and `bytes` arrive from the render worker threads, so the callback must
+    be thread-safe.
+
+    `shared_limits` optionally maps a pool name ("render", "ai") to a
+    semaphore shared by several pipelines, so a batch of videos running in
+    parallel stays within one global render/AI budget. Setting
+    `cancel_event` aborts running encodes and in-flight AI calls and stops
+    the run with PipelineCancelled. With a `render_queue`, clip renders (including their
+    subtitles) are handed to remote render workers instead of running here;
+    `render_workers` then caps how many are outstanding at once.
+    """
+
+    # Concurrency limits for the task scheduler. Renders are CPU-bound
+    # (x264 already uses several cores per encode), AI calls are
+    # network-bound and mostly wait on the provider.
+    RENDER_WORKERS = max(1, (os.cpu_count() or 2) // 4)
+    AI_WORKERS = 4
+    IO_WORKERS = 2
+
+    # With at least MIN_REACTIONS audience reactions found, the AI only sees
+    # the transcript leading up to the strongest REACTION_PEAKS of them
+    MIN_REACTIONS = 3
+    REACTION_PEAKS = 12
+    REACTION_LEAD_SECONDS = 180  # transcript kept before a reaction (at most the max clip length)
+    REACTION_TAIL_SECONDS = 5
+
+    def __init__(
+        self,
+        ai_helper: "AIHelper",
+        progress=None,
+        render_workers: int | None = None,
+        ai_workers: int | None = None,
+        shared_limits: dict | None = None,
+        cancel_event: threading.Event | None = None,
+        render_queue: "SharedRenderQueue | None" = None,
+    ) -> None:
+        self.ai_helper = ai_helper
+        self.progress = progress
+        self.render_workers = render_workers or self.RENDER_WORKERS
+        self.ai_workers = ai_workers or self.AI_WORKERS
+        self.shared_limits = shared_limits or {}
+        self.cancel_event = cancel_event
+        self.render_queue = render_queue
+
+    def _report(self, stage: str, message: str, **info) -> None:
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise PipelineCancelled()
+        if self.progress is not None:
+            self.progress({"stage": stage, "message": message, **info})
+
+    def _encode_progress(self, idx: int, clips: int, step: str):
+        """Progress callback for one clip's encode, or None without a listener."""
+        if self.progress is None:
+            return None
+
+        def report(info: dict) -> None:
+            percent = 100 * info["index"] // info["total"] if info["total"] else 0
+            self.progress(
+                {
+                    "stage": "encode",
+                    "message": f"{step} clip {idx}/{clips}: {percent}%",
+                    "clip": idx,
+                    "clips": clips,
+                    **info,
+                }
+            )
+        return report
+
+    def _ai_call(self, method: str, *args, **kwargs):
+        """Call AIHelper.`method`, abandoning the request if the job is cancelled.
+
+        With a cancel event the `<method>_async` variant runs on the shared
+        event loop so the in-flight request can be cancelled; the blocking
+        call is used otherwise.
+        """
+        async_method = getattr(self.ai_helper, f"{method}_async", None)
+        if self.cancel_event is None or async_method is None:
+            return getattr(self.ai_helper, method)(*args, **kwargs)
+        with tracer.span(f"await {method}"):
+            return AsyncLoopThread.get().run(async_method(*args, **kwargs), self.cancel_event)
+
+    def _limited(self, pool: str, func, *args, **kwargs):
+        """Call `func` while holding the shared slot for `pool`, if any."""
+        limit = self.shared_limits.get(pool)
+        if limit is None:
+            return func(*args, **kwargs)
+        with limit:
+            return func(*args, **kwargs)
+
+    @staticmethod
+    def clip_duration_range(clip_length: int) -> tuple[int, int]:
+        """Map a clip length preset (0 = Auto) to the (min, max) hint for the AI."""
+        if clip_length == 0:
+            # Auto mode - let AI decide best length with no constraints
+            return 15, 600  # any joke needs 15s; at most 10 minutes per clip
+        # Use selected preset as a hint
+        return max(10, clip_length - 30), clip_length + 60
+
+    @staticmethod
+    def format_transcript(full_text: str, segments: list[dict]) -> str:
+        """Format a transcript as "[start - end] text" lines for the AI."""
+        formatted_transcript = ""
+        if segments:
+            # We have timestamped segments
+            for seg in segments:
+                start = seg.get("start", 0.0)
+                end = seg.get("end", 0.0)
+                text = seg.get("text", "").strip()
+                if text:
+                    formatted_transcript += f"[{start:.1f}s - {end:.1f}s] {text}\n"
+        else:
+            # No segments, use full text with estimated timestamps
+            # Split by sentences and estimate timing
+            sentences = full_text.split(". ")
+            duration_per_sentence = 5.0  # Rough estimate
+            current_time = 0.0
+            for sentence in sentences:
+                if sentence.strip():
+                    sentence = sentence.strip() + "."
+                    end_time = current_time + duration_per_sentence
+                    formatted_transcript += f"[{current_time:.1f}s - {end_time:.1f}s] {sentence}\n"
+                    current_time = end_time
+        return formatted_transcript
+
+    @staticmethod
+    def reaction_transcript(segments: list[dict], reactions: list[dict], lead: float) -> str:
+        """Format only the transcript leading up to the strongest `reactions`.
+
+        Each reaction keeps `lead` seconds of transcript before it and
+        REACTION_TAIL_SECONDS after; overlapping windows are merged and
+        skipped parts are marked with "...". The reactions themselves
+        appear as "(AUDIENCE REACTION)" lines so the AI can end clips there.
+        """
+        top = sorted(reactions[:SmartClipsPipeline.REACTION_PEAKS], key=lambda reaction: reaction["start"])
+        windows: list[list[float]] = []
+        for reaction in top:
+            start = max(0.0, reaction["start"] - lead)
+            end = reaction["end"] + SmartClipsPipeline.REACTION_TAIL_SECONDS
+            if windows and start <= windows[-1][1]:
+                windows[-1][1] = max(windows[-1][1], end)
+            else:
+                windows.append([start, end])
+
+        blocks = []
+        shown = set()
+        for start, end in windows:
+            lines = []
+            for i, seg in enumerate(segments):
+                text = seg.get("text", "").strip()
+                if i in shown or not text or seg.get("end", 0.0) <= start or seg.get("start", 0.0) >= end:
+                    continue
+                shown.add(i)
+                lines.append((seg.get("start", 0.0), f"[{seg.get('start', 0.0):.1f}s - {seg.get('end', 0.0):.1f}s] {text}"))
+            lines += [
+                (reaction["start"], f"[{reaction['start']:.1f}s - {reaction['end']:.1f}s] (AUDIENCE REACTION)")
+                for reaction in top
+                if start <= reaction["start"] < end
+            ]
+            blocks.append("\n".join(line for _, line in sorted(lines, key=lambda item: item[0])))
+        return (
+            "(Excerpts leading up to the strongest audience reactions; \"...\" marks skipped parts)\n"
+            + "\n...\n".join(blocks) + "\n"
+        )
+
+    @traced
+    def run(
+        self,
+        input_path: str,
+        output_dir: str,
+        clip_length: int = 0,
+        intro_path: str | None = None,
+        outro_path: str | None = None,
+        logo_path: str | None = None,
+        logo_position: str = "bottom-right",
+        add_subtitles: bool = False,
+        generate_thumbnails: bool = True,
+        thumbnail_method: str = "video_frame",
+        thumbnail_variants: list[str] | None = None,
+        output_targets: list[str] | None = None,
+    ) -> dict:
+        """Run Smart Clips for one video.
+
+        `thumbnail_variants` names the ThumbnailGenerator.VARIANTS written
+        for frame thumbnails (default: DEFAULT_VARIANTS). `output_targets`
+        names the VideoProcessor.OUTPUT_TARGETS each clip is rendered as
+        (default: DEFAULT_TARGETS), all in one pass per clip.
+
+        Returns a dict with:
+          - 'clips': info dicts of the clips created (see create_smart_clips)
+          - 'failed': names of render tasks that failed
+          - 'errors': task name -> error message for every failed task
+          - 'metadata_path': path of the clips_metadata.json written
+          - 'timings': seconds spent per stage
+
+        Raises PipelineError (or NoClipsFoundError) if a stage before
+        rendering fails.
+        """
+        if not self.ai_helper.is_available():
+            raise PipelineError(
+                "AI not configured",
+                "AI is not configured. Set GEMINI_API_KEY or OPENAI_API_KEY in your .env file."
+            )
+
+        os.makedirs(output_dir, exist_ok=True)
+        timings: dict[str, float] = {}
+
+        # Step 1: Extract audio (into memory; nothing lands in output_dir)
+        self._report(
+            "extract_audio",
+            "Step 1/3: Extracting audio from video...\nThis may take a moment."
+        )
+        started = time.perf_counter()
+        try:
+            with profiler.stage("extract_audio", output_dir):
+                audio = self._limited("render", VideoProcessor.extract_audio_buffer, input_path, self.cancel_event)
+        except Exception as exc:
+            if isinstance(exc, RenderCancelled):
+                raise PipelineCancelled() from exc
+            raise PipelineError("Audio extraction failed", str(exc)) from exc
+        timings["extract_audio"] = time.perf_counter() - started
+
+        # Look for audience reactions locally while the AI transcribes. Only
+        # a transcript with timestamped segments can be cut around them.
+        reactions_future = None
+        stop_reactions = threading.Event()
+        # The transcription and the detector both read the audio: whichever
+        # of them finishes last closes it
+        audio_users = [2 if self.ai_helper.returns_segments() else 1]
+        audio_lock = threading.Lock()
+
+        def release_audio(_=None) -> None:
+            with audio_lock:
+                audio_users[0] -= 1
+                last = audio_users[0] == 0
+            if last:
+                audio.close()
+
+        if self.ai_helper.returns_segments():
+            reaction_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reactions")
+            reactions_future = reaction_pool.submit(self._detect_reactions, audio, output_dir, stop_reactions)
+            reaction_pool.shutdown(wait=False)
+            reactions_future.add_done_callback(release_audio)
+
+        # Step 2: Transcribe with timestamps
+        self._report(
+            "transcribe",
+            "Step 2/3: Transcribing audio with Gemini...\nThis may take several minutes for long videos."
+        )
+        started = time.perf_counter()
+        try:
+            with (
+                metrics.timed("transcribe", bytes=audio.size),
+                profiler.stage("transcribe", output_dir),
+            ):
+                transcription = self._limited("ai", self._ai_call, "transcribe_audio", audio)
+        except BaseException as exc:
+            # Don't wait for the detector: it stops at its next block of audio
+            stop_reactions.set()
+            if reactions_future is not None:
+                reactions_future.cancel()
+            if isinstance(exc, PipelineCancelled) or not isinstance(exc, Exception):
+                raise
+            raise PipelineError("Transcription failed", str(exc)) from exc
+        finally:
+            release_audio()
+        reactions = [] if reactions_future is None else reactions_future.result()
+        timings["transcribe"] = time.perf_counter() - started
+
+        full_text = transcription.get("text", "")
+        segments = transcription.get("segments", [])
+
+        # Validate transcription result
+        if not full_text or not full_text.strip():
+            raise PipelineError(
+                "Transcription failed",
+                "Transcription returned empty text. Possible issues:\n"
+                "1. Audio file has no speech\n"
+                "2. Gemini API error\n"
+                "3. Audio quality too poor\n\n"
+                "Try with a different video or check your Gemini API key."
+            )
+
+        # Format transcript with timestamps for AI
+        formatted_transcript = self.format_transcript(full_text, segments)
+        if not formatted_transcript.strip():
+            raise PipelineError(
+                "Transcription Error",
+                "Could not format transcript properly. The transcription text was:\n\n" +
+                full_text[:200] + "...\n\n" +
+                "Please try again or use a different video."
+            )
+
+        # Step 3: Ask AI to identify story clips
+        self._report(
+            "identify",
+            "Step 3/3: Identifying complete stories/jokes with AI...\nAlmost done!"
+        )
+        if clip_length == 0:
+            self._report(
+                "identify",
+                "AI will find complete jokes with NO time constraints.\n"
+                "Clips can be anywhere from 15 seconds to 10 minutes,\n"
+                "based purely on joke structure and completeness."
+            )
+        min_dur, max_dur = self.clip_duration_range(clip_length)
+        if len(reactions) >= self.MIN_REACTIONS and segments:
+            # Only the build-up to the biggest laughs: a smaller prompt, and
+            # clip ends anchored at real reactions
+            excerpts = self.reaction_transcript(segments, reactions, min(max_dur, self.REACTION_LEAD_SECONDS))
+            if len(excerpts) < len(formatted_transcript):
+                formatted_transcript = excerpts
+
+        started = time.perf_counter()
+        try:
+            with (
+                metrics.timed("identify", bytes=len(formatted_transcript.encode("utf-8"))) as sample,
+                profiler.stage("identify", output_dir),
+            ):
+                clip_specs = self._limited(
+                    "ai",
+                    self._ai_call,
+                    "identify_story_clips",
+                    formatted_transcript,
+                    min_duration=min_dur,
+                    max_duration=max_dur,
+                )
+                sample["clips"] = len(clip_specs)
+        except PipelineCancelled:
+            raise
+        except Exception as exc:
+            raise PipelineError("AI analysis failed", str(exc)) from exc
+        timings["identify"] = time.perf_counter() - started
+
+        if not clip_specs:
+            raise NoClipsFoundError(
+                "No clips found",
+                "AI could not identify any suitable clips from the transcript.\n"
+                "Try a different video or use fixed-length mode."
+            )
+
+        # Step 4: Create the clips
+        self._report(
+            "render",
+            "Rendering clips, subtitles, hashtags and thumbnails...\n"
+            "This may take a few minutes."
+        )
+        started = time.perf_counter()
+        scheduler, render_tasks = self._build_clip_tasks(
+            input_path,
+            output_dir,
+            clip_specs,
+            segments if add_subtitles else [],
+            intro_path=intro_path,
+            outro_path=outro_path,
+            logo_path=logo_path,
+            logo_position=logo_position,
+            thumbnail_method=thumbnail_method if generate_thumbnails else None,
+            thumbnail_variants=[
+                ThumbnailGenerator.VARIANTS[name]
+                for name in thumbnail_variants or ThumbnailGenerator.DEFAULT_VARIANTS
+            ],
+            output_targets=[
+                VideoProcessor.OUTPUT_TARGETS[name]
+                for name in output_targets or VideoProcessor.DEFAULT_TARGETS
+            ],
+        )
+        scheduler.run()
+        timings["clips"] = time.perf_counter() - started
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise PipelineCancelled()
+
+        created_clips = [scheduler.results[name] for name in render_tasks if name in scheduler.results]
+        for clip in created_clips:
+            # Only needed by the subtitle pass
+            clip.pop("crop_track", None)
+        failed_renders = [name for name in render_tasks if name in scheduler.errors]
+        for name, thumbnail_paths in scheduler.results.get("thumbnails", {}).items():
+            if name in scheduler.results:
+                scheduler.results[name]["thumbnail_path"] = thumbnail_paths[0]
+                scheduler.results[name]["thumbnail_paths"] = thumbnail_paths
+                continue
+            # The clip itself failed to render
+            for path in thumbnail_paths:
+                if os.path.isfile(path):
+                    os.remove(path)
+        for name, exc in scheduler.errors.items():
+            print(f"Smart clip task {name} failed: {exc}")
+        print(f"AI call stats: {self.ai_helper.stats()}")
+
+        if not created_clips:
+            first_error = scheduler.errors[failed_renders[0]] if failed_renders else None
+            raise PipelineError("Error while creating clips", str(first_error))
+
+        # Write metadata to a JSON file
+        metadata_path = os.path.join(output_dir, "clips_metadata.json")
+        with open(metadata_path, "w", encoding="utf-8") as f:
+            json.dump(created_clips, f, indent=2, ensure_ascii=False)
+
+        return {
+            "clips": created_clips,
+            "failed": failed_renders,
+            "errors": {name: str(exc) for name, exc in scheduler.errors.items()},
+            "metadata_path": metadata_path,
+            "timings": timings,
+        }
+
+    def _build_clip_tasks(
+        self,
+        input_path: str,
+        output_dir: str,
+        clip_specs: list[dict],
+        segments: list[dict],
+        intro_path: str | None,
+        outro_path: str | None,
+        logo_path: str | None,
+        logo_position: str,
+        thumbnail_method: str | None,
+        thumbnail_variants: list[dict],
+        output_targets: list[dict],
+    ) -> tuple[TaskScheduler, list[str]]:
+        """Register the per-clip task chains. Returns the scheduler and render task names."""
+        total_tasks = [0]
+        done_tasks = [0]
+        started = time.monotonic()
+
+        def on_task_done(name: str, error: BaseException | None) -> None:
+            done_tasks[0] += 1
+            if self.progress is None:
+                return
+            # Naive ETA: assume the remaining tasks take as long as the finished ones
+            elapsed = time.monotonic() - started
+            eta = elapsed / done_tasks[0] * (total_tasks[0] - done_tasks[0])
+            self.progress(
+                {
+                    "stage": "clip",
+                    "message": f"{name} {'failed' if error else 'done'}",
+                    "task": name,
+                    "done": done_tasks[0],
+                    "total": total_tasks[0],
+                    "error": str(error) if error else None,
+                    "eta_seconds": round(eta, 1),
+                }
+            )
+
+        # Every clip gets its own chain of tasks. Renders and subtitle burns
+        # share the render pool, AI calls use the AI pool, so clip N's
+        # hashtags and thumbnail are produced while clip N+1 renders.
+        scheduler = TaskScheduler(
+            {"render": self.render_workers, "ai": self.ai_workers, "io": self.IO_WORKERS},
+            shared_limits=self.shared_limits,
+            on_task_done=on_task_done,
+            cancel_event=self.cancel_event,
+        )
+
+        def add(name: str, func, deps=(), pool: str = "io") -> str:
+            return scheduler.add(name, profiler.wrap(name, output_dir, func), deps=deps, pool=pool)
+
+        render_tasks = []
+        thumbnail_items = {}
+        tracked = any(target.get("crop") == "track" for target in output_targets)
+        for idx, spec in enumerate(clip_specs, start=1):
+            if float(spec.get("end_time", 0)) <= float(spec.get("start_time", 0)):
+                continue
+
+            if self.render_queue is not None:
+                # Remote workers render and burn subtitles in one task
+                render = add(
+                    f"render_{idx}",
+                    lambda idx=idx, spec=spec: self.render_queue.render_clip(
+                        input_path=input_path,
+                        output_dir=output_dir,
+                        spec=spec,
+                        idx=idx,
+                        intro_path=intro_path,
+                        outro_path=outro_path,
+                        logo_path=logo_path,
+                        logo_position=logo_position,
+                        subtitle_segments=[
+                            seg for seg in segments
+                            if seg.get("end", 0.0) > float(spec["start_time"])
+                            and seg.get("start", 0.0) < float(spec["end_time"])
+                        ],
+                        output_targets=output_targets,
+                        cancel_event=self.cancel_event,
+                    ),
+                    pool="render",
+                )
+            else:
+                # With subtitles the render writes a source-sized master and
+                # the subtitle pass fans it out to the targets
+                render = add(
+                    f"render_{idx}",
+                    lambda idx=idx, spec=spec: VideoProcessor.create_smart_clip(
+                        input_path=input_path,
+                        output_dir=output_dir,
+                        spec=spec,
+                        idx=idx,
+                        intro_path=intro_path,
+                        outro_path=outro_path,
+                        logo_path=logo_path,
+                        logo_position=logo_position,
+                        progress=self._encode_progress(idx, len(clip_specs), "Rendering"),
+                        cancel_event=self.cancel_event,
+                        targets=None if segments else output_targets,
+                        track_crop=bool(segments) and tracked,
+                    ),
+                    pool="render",
+                )
+            render_tasks.append(render)
+
+            # The clip dict is final once its subtitles are burned in
+            final = render
+            if segments and self.render_queue is None:
+                final = add(
+                    f"subtitles_{idx}",
+                    lambda clip, idx=idx: VideoProcessor.burn_clip_subtitles(
+                        clip,
+                        segments,
+                        progress=self._encode_progress(idx, len(clip_specs), "Subtitling"),
+                        cancel_event=self.cancel_event,
+                        targets=output_targets,
+                    ),
+                    deps=[render],
+                    pool="render",
+                )
+
+            hashtags = add(
+                f"hashtags_{idx}",
+                lambda idx=idx, spec=spec: self._hashtags(idx, spec),
+                pool="ai",
+            )
+            add(
+                f"txt_{idx}",
+                self._write_clip_txt,
+                deps=[final, hashtags],
+                pool="io",
+            )
+
+            if thumbnail_method == "ai_generated":
+                # AI thumbnails only need the metadata
+                add(
+                    f"thumbnail_{idx}",
+                    lambda clip: self._make_clip_thumbnail(clip, thumbnail_method),
+                    deps=[render],
+                    pool="ai",
+                )
+            elif thumbnail_method:
+                # Frame thumbnails are batched below, straight from the source
+                thumbnail_items[render] = {
+                    "start_time": float(spec["start_time"]),
+                    "end_time": float(spec["end_time"]),
+                    "output_path": VideoProcessor.smart_clip_path(output_dir, idx, spec).replace(
+                        ".mp4", "_thumbnail.jpg"
+                    ),
+                    "title": spec.get("title", ""),
+                }
+
+        if thumbnail_items:
+            # No deps: the thumbnails are ready long before the renders are
+            add(
+                "thumbnails",
+                lambda: self._make_frame_thumbnails(
+                    input_path, thumbnail_items, intro_path, outro_path, logo_path, logo_position, thumbnail_variants
+                ),
+                pool="io",
+            )
+
+        total_tasks[0] = len(scheduler)
+        return scheduler, render_tasks
+
+    @staticmethod
+    def _detect_reactions(audio: AudioBuffer, output_dir: str, cancel_event: threading.Event) -> list[dict]:
+        """ReactionDetector.detect, or no reactions if the detector fails or is stopped.
+
+        A failure is recorded as an error of the "reactions" stage in
+        `metrics`; the AI then gets the whole transcript.
+        """
+        try:
+            with (
+                metrics.timed("reactions") as sample,
+                profiler.stage("reactions", output_dir),
+            ):
+                reactions = ReactionDetector.detect(audio, cancel_event)
+                sample["reactions"] = len(reactions)
+            return reactions
+        except Exception:
+            return []
+
+    @staticmethod
+    def _write_clip_txt(clip: dict, hashtags: list[str]) -> dict:
+        """Write the upload .txt next to the clip and record its hashtags."""
+        # Create .txt file with same name as video
+        video_path = clip["path"]
+        txt_path = video_path.replace(".mp4", ".txt")
+
+        txt_content = f"""TITLE:
+{clip['title']}
+
+DESCRIPTION:
+{clip['description']}
+
+THUMBNAIL IDEA:
+{clip['thumbnail_idea']}
+
+HASHTAGS:
+{' '.join(hashtags)}
+
+---
+YOUTUBE UPLOAD TEXT (copy everything below):
+---
+
+{clip['title']}
+
+{clip['description']}
+
+{' '.join(hashtags)}
+"""
+
+        with open(txt_path, "w", encoding="utf-8") as f:
+            f.write(txt_content)
+
+        # Add hashtags to clip metadata
+        clip["hashtags"] = hashtags
+        return clip
+
+    def _hashtags(self, idx: int, spec: dict) -> list[str]:
+        with metrics.timed("hashtags", clip=idx) as sample:
+            hashtags = self._ai_call(
+                "generate_hashtags",
+                spec.get("title", ""),
+                spec.get("description", ""),
+            )
+            sample["count"] = len(hashtags)
+        return hashtags
+
+    @staticmethod
+    def _make_frame_thumbnails(
+        input_path: str,
+        items: dict[str, dict],
+        intro_path: str | None,
+        outro_path: str | None,
+        logo_path: str | None,
+        logo_position: str,
+        variants: list[dict],
+    ) -> dict[str, list[str]]:
+        """Create all frame thumbnails in one pass. Returns render task -> thumbnail paths."""
+        with metrics.timed("thumbnail", method="video_frame", count=len(items)) as sample:
+            created = ThumbnailGenerator.create_thumbnails(
+                input_path,
+                list(items.values()),
+                intro_path=intro_path,
+                outro_path=outro_path,
+                logo_path=logo_path,
+                logo_position=logo_position,
+                variants=variants,
+            )
+            paths = {
+                render: [ThumbnailGenerator.variant_path(item["output_path"], variant) for variant in variants]
+                for (render, item), ok in zip(items.items(), created)
+                if ok
+            }
+            sample["error"] = len(paths) < len(items)
+            sample["bytes"] = sum(os.path.getsize(path) for clip_paths in paths.values() for path in clip_paths)
+        return paths
+
+    @staticmethod
+    def _make_clip_thumbnail(clip: dict, method: str) -> dict:
+        """Create the thumbnail for a finished clip with the chosen method."""
+        video_path = clip["path"]
+        thumbnail_path = video_path.replace(".mp4", "_thumbnail.jpg")
+
+        with metrics.timed("thumbnail", method=method, file=os.path.basename(thumbnail_path)) as sample:
+            if method == "ai_generated":
+                # Use AI-generated thumbnail
+                created = ThumbnailGenerator.create_ai_thumbnail(
+                    thumbnail_path,
+                    clip["title"],
+                    clip["description"],
+                    clip.get("thumbnail_idea", "")
+                )
+            else:
+                # Use video frame thumbnail (default)
+                created = ThumbnailGenerator.create_thumbnail(
+                    video_path,
+                    thumbnail_path,
+                    clip["title"],
+                    clip.get("thumbnail_idea", "")
+                )
+            # The generators report failure by returning False
+            sample["error"] = not created
+            sample["bytes"] = os.path.getsize(thumbnail_path) if created else 0
+
+        clip["thumbnail_path"] = thumbnail_path
+        return clip
+
+
 class ClipsApp:
     def __init__(self, root: Tk) -> None:
         self.root = root
@@ -1212,7 +5381,22 @@ class ClipsApp:
 
         self.ai_helper = AIHelper()
 
+        # Long jobs run on one worker thread and report through a queue the
+        # Tk loop drains; Tk widgets must only be touched from this thread.
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="clips-job")
+        self.events = Queue()
+        self.cancel_event = None
+        self.on_job_done = None
+        self.job_started = 0.0
+        self.job_has_tasks = False
+        self.action_buttons = []
+        self.progress_stage = StringVar(value="Idle")
+        self.progress_detail = StringVar(value="")
+        self.progress_bar = None
+        self.cancel_button = None
+
         self._build_ui()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
     # ---------------- GUI helpers -----------------
     def _build_ui(self) -> None:
@@ -1252,8 +5436,19 @@ class ClipsApp:
         Entry(self.root, textvariable=self.logo_image, width=60).grid(row=row, column=1, padx=5, pady=5)
         row += 1
 
-        Button(self.root, text="Generate clips (fixed length)", command=self.on_generate_clips).grid(row=row, column=0, padx=10, pady=10)
-        Button(self.root, text="Generate Smart Clips (AI)", command=self.on_generate_smart_clips).grid(row=row, column=1, padx=10, pady=10)
+        generate = Button(self.root, text="Generate clips (fixed length)", command=self.on_generate_clips)
+        generate.grid(row=row, column=0, padx=10, pady=10)
+        smart = Button(self.root, text="Generate Smart Clips (AI)", command=self.on_generate_smart_clips)
+        smart.grid(row=row, column=1, padx=10, pady=10)
+        self.action_buttons += [generate, smart]
+        row += 1
+
+        # Progress panel
+        Label(self.root, textvariable=self.progress_stage).grid(row=row, column=0, columnspan=2, sticky="w", padx=10)
+        self.cancel_button = Button(self.root, text="Cancel", command=self.on_cancel, state=DISABLED)
+        self.cancel_button.grid(row=row, column=2, padx=5)
+        row += 1
+        Label(self.root, textvariable=self.progress_detail).grid(row=row, column=0, columnspan=3, sticky="w", padx=10)
 
         # AI section
         row += 1
@@ -1262,9 +5457,9 @@ class ClipsApp:
         self.ai_input.grid(row=row, column=1, columnspan=2, padx=5, pady=5, sticky="nsew")
         row += 1
 
-        Button(self.root, text="Suggest title/description/thumbnail", command=self.on_generate_metadata).grid(
-            row=row, column=0, padx=10, pady=10
-        )
+        suggest = Button(self.root, text="Suggest title/description/thumbnail", command=self.on_generate_metadata)
+        suggest.grid(row=row, column=0, padx=10, pady=10)
+        self.action_buttons.append(suggest)
 
         self.ai_output = Text(self.root, height=8, width=60, state=DISABLED)
         self.ai_output.grid(row=row, column=1, columnspan=2, padx=5, pady=5, sticky="nsew")
@@ -1392,12 +5587,23 @@ class ClipsApp:
         ).grid(row=row, column=0, columnspan=2, sticky="w", **padding)
         row += 1
 
-        ttk.Button(self.root, text="Generate clips (fixed length)", command=self.on_generate_clips).grid(
-            row=row, column=0, **padding
-        )
-        ttk.Button(self.root, text="Generate Smart Clips (AI)", command=self.on_generate_smart_clips).grid(
-            row=row, column=1, sticky="w", **padding
-        )
+        generate = ttk.Button(self.root, text="Generate clips (fixed length)", command=self.on_generate_clips)
+        generate.grid(row=row, column=0, **padding)
+        smart = ttk.Button(self.root, text="Generate Smart Clips (AI)", command=self.on_generate_smart_clips)
+        smart.grid(row=row, column=1, sticky="w", **padding)
+        self.action_buttons += [generate, smart]
+        row += 1
+
+        # Progress panel
+        progress_frame = ttk.LabelFrame(self.root, text="Progress")
+        progress_frame.grid(row=row, column=0, columnspan=3, sticky="ew", **padding)
+        progress_frame.grid_columnconfigure(0, weight=1)
+        ttk.Label(progress_frame, textvariable=self.progress_stage).grid(row=0, column=0, sticky="w", **padding)
+        self.cancel_button = ttk.Button(progress_frame, text="Cancel", command=self.on_cancel, state=DISABLED)
+        self.cancel_button.grid(row=0, column=1, rowspan=2, **padding)
+        self.progress_bar = ttk.Progressbar(progress_frame, mode="determinate", maximum=100)
+        self.progress_bar.grid(row=1, column=0, sticky="ew", **padding)
+        ttk.Label(progress_frame, textvariable=self.progress_detail).grid(row=2, column=0, columnspan=2, sticky="w", **padding)
 
         # AI section
         row += 1
@@ -1408,11 +5614,13 @@ class ClipsApp:
         self.ai_input.grid(row=row, column=1, columnspan=2, sticky="nsew", **padding)
         row += 1
 
-        ttk.Button(
+        suggest = ttk.Button(
             self.root,
             text="Suggest title / description / thumbnail",
             command=self.on_generate_metadata,
-        ).grid(row=row, column=0, **padding)
+        )
+        suggest.grid(row=row, column=0, **padding)
+        self.action_buttons.append(suggest)
 
         self.ai_output = Text(self.root, height=10, width=70, state=DISABLED)
         self.ai_output.grid(row=row, column=1, columnspan=2, sticky="nsew", **padding)
@@ -1453,14 +5661,131 @@ class ClipsApp:
             self.outro_video.set(path)
             self.use_outro.set(True)
 
-    def browse_logo(self) -> None:
-        path = filedialog.askopenfilename(
-            title="Select logo image",
-            filetypes=[("Image files", "*.png;*.jpg;*.jpeg"), ("All files", "*.*")],
-        )
-        if path:
-            self.logo_image.set(path)
-            self.use_logo.set(True)
+    def browse_logo(self) -> None:
+        path = filedialog.askopenfilename(
+            title="Select logo image",
+            filetypes=[("Image files", "*.png;*.jpg;*.jpeg"), ("All files", "*.*")],
+        )
+        if path:
+            self.logo_image.set(path)
+            self.use_logo.set(True)
+
+    # ------------- Background jobs -------------
+    def _start_job(self, work, on_done) -> None:
+        """Run `work(progress, cancel_event)` on the worker thread.
+
+        `progress` posts event dicts to the queue drained by _poll_events.
+        `on_done(result, error)` is called on the Tk thread when it returns.
+        """
+        self.cancel_event = threading.Event()
+        self.on_job_done = on_done
+        self.job_started = time.monotonic()
+        self.job_has_tasks = False
+        for button in self.action_buttons:
+            button.configure(state=DISABLED)
+        self.cancel_button.configure(state=NORMAL)
+        self.progress_stage.set("Starting...")
+        self.progress_detail.set("")
+        self._set_progress(None)
+
+        events = self.events
+        cancel_event = self.cancel_event
+
+        def run() -> None:
+            try:
+                result = work(events.put, cancel_event)
+            except Exception as exc:
+                events.put({"stage": "finished", "result": None, "error": exc})
+            else:
+                events.put({"stage": "finished", "result": result, "error": None})
+
+        self.executor.submit(run)
+        self.root.after(100, self._poll_events)
+
+    def _poll_events(self) -> None:
+        while True:
+            try:
+                event = self.events.get_nowait()
+            except Empty:
+                break
+            if event["stage"] == "finished":
+                self._finish_job(event["result"], event["error"])
+                return
+            self._show_progress(event)
+        self.root.after(100, self._poll_events)
+
+    def _finish_job(self, result, error) -> None:
+        cancelled = self.cancel_event.is_set()
+        on_done = self.on_job_done
+        self.cancel_event = None
+        self.on_job_done = None
+        for button in self.action_buttons:
+            button.configure(state=NORMAL)
+        self.cancel_button.configure(state=DISABLED)
+        self.progress_stage.set("Cancelled" if cancelled else ("Failed" if error else "Done"))
+        self.progress_detail.set(f"Finished in {self._format_seconds(time.monotonic() - self.job_started)}")
+        tracer.export(f"gui-{time.strftime('%Y%m%d-%H%M%S')}")
+        self._set_progress(0 if (cancelled or error) else 100)
+
+        if cancelled and (error is None or isinstance(error, (PipelineCancelled, RenderCancelled))):
+            messagebox.showinfo("Cancelled", "The job was cancelled.")
+            return
+        on_done(result, error)
+
+    def _set_progress(self, percent: float | None) -> None:
+        """Show `percent` on the bar, or animate it when progress is unknown."""
+        if self.progress_bar is None:
+            return
+        if percent is None:
+            if str(self.progress_bar.cget("mode")) != "indeterminate":
+                self.progress_bar.configure(mode="indeterminate")
+                self.progress_bar.start(15)
+            return
+        self.progress_bar.stop()
+        self.progress_bar.configure(mode="determinate", value=percent)
+
+    @staticmethod
+    def _format_seconds(seconds: float) -> str:
+        minutes, seconds = divmod(int(seconds), 60)
+        return f"{minutes}:{seconds:02d}"
+
+    def _show_progress(self, event: dict) -> None:
+        stage = event["stage"]
+        if stage == "encode":
+            detail = f"{event['message']} • {event['bytes'] / 1e6:.1f} MB encoded"
+            if not self.job_has_tasks and event.get("clips") and event["total"]:
+                # Fixed-length split: the clips are the whole job
+                fraction = (event["clip"] - 1 + event["index"] / event["total"]) / event["clips"]
+                self._set_progress(100 * fraction)
+                if fraction > 0:
+                    elapsed = time.monotonic() - self.job_started
+                    detail += f" • ETA {self._format_seconds(elapsed * (1 - fraction) / fraction)}"
+            self.progress_detail.set(detail)
+        elif "done" in event:
+            self.job_has_tasks = True
+            self._set_progress(100 * event["done"] / max(1, event["total"]))
+            self.progress_stage.set(
+                f"Clip tasks {event['done']}/{event['total']} • "
+                f"ETA {self._format_seconds(event['eta_seconds'])}"
+            )
+            if event["error"]:
+                self.progress_detail.set(f"{event['task']} failed: {event['error']}")
+        else:
+            self.progress_stage.set(event["message"].splitlines()[0])
+            self._set_progress(None)
+
+    def on_cancel(self) -> None:
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+            self.cancel_button.configure(state=DISABLED)
+            self.progress_stage.set("Cancelling...")
+
+    def on_close(self) -> None:
+        # Stop a running job so its worker thread doesn't keep the process alive
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+        self.executor.shutdown(wait=False)
+        self.root.destroy()
 
     # ------------- Actions -------------
     def on_generate_clips(self) -> None:
@@ -1483,8 +5808,9 @@ class ClipsApp:
         logo = self.logo_image.get().strip() if self.use_logo.get() else None
         logo_pos = self.logo_position.get().strip() or "bottom-right"
 
-        try:
-            clips = VideoProcessor.split_video(
+        def work(progress, cancel_event):
+            progress({"stage": "split", "message": "Splitting video..."})
+            return VideoProcessor.split_video(
                 input_path=input_path,
                 output_dir=output_dir,
                 clip_length_seconds=clip_length,
@@ -1493,15 +5819,20 @@ class ClipsApp:
                 logo_path=logo or None,
                 logo_position=logo_pos,
                 output_prefix="clip",
+                progress=_split_progress(progress),
+                cancel_event=cancel_event,
             )
-        except Exception as exc:
-            messagebox.showerror("Error while generating clips", str(exc))
-            return
 
-        messagebox.showinfo(
-            "Done",
-            f"Created {len(clips)} clip(s) in:\n{output_dir}",
-        )
+        def done(clips, error) -> None:
+            if error is not None:
+                messagebox.showerror("Error while generating clips", str(error))
+                return
+            messagebox.showinfo(
+                "Done",
+                f"Created {len(clips)} clip(s) in:\n{output_dir}",
+            )
+
+        self._start_job(work, done)
 
     def on_generate_smart_clips(self) -> None:
         """AI-powered clip generation: transcribe, identify stories, then cut."""
@@ -1523,265 +5854,49 @@ class ClipsApp:
             )
             return
 
-        # Step 1: Extract audio
-        audio_path = os.path.join(output_dir, "temp_audio.mp3")
-        try:
-            messagebox.showinfo(
-                "Processing",
-                "Step 1/3: Extracting audio from video...\nThis may take a moment."
-            )
-            VideoProcessor.extract_audio(input_path, audio_path)
-        except Exception as exc:
-            messagebox.showerror("Audio extraction failed", str(exc))
-            return
-
-        # Step 2: Transcribe with timestamps
-        try:
-            messagebox.showinfo(
-                "Processing",
-                "Step 2/3: Transcribing audio with Gemini...\nThis may take several minutes for long videos."
-            )
-            transcription = self.ai_helper.transcribe_audio(audio_path)
-            full_text = transcription.get("text", "")
-            segments = transcription.get("segments", [])
-            
-            # Validate transcription result
-            if not full_text or not full_text.strip():
-                raise RuntimeError(
-                    "Transcription returned empty text. Possible issues:\n"
-                    "1. Audio file has no speech\n"
-                    "2. Gemini API error\n"
-                    "3. Audio quality too poor\n\n"
-                    "Try with a different video or check your Gemini API key."
-                )
-                
-        except Exception as exc:
-            messagebox.showerror("Transcription failed", str(exc))
-            # Clean up temp audio before returning
-            if os.path.isfile(audio_path):
-                os.remove(audio_path)
-            return
-        finally:
-            # Clean up temp audio
-            if os.path.isfile(audio_path):
-                os.remove(audio_path)
-
-        # Format transcript with timestamps for AI
-        formatted_transcript = ""
-        if segments:
-            # We have timestamped segments
-            for seg in segments:
-                start = seg.get("start", 0.0)
-                end = seg.get("end", 0.0)
-                text = seg.get("text", "").strip()
-                if text:
-                    formatted_transcript += f"[{start:.1f}s - {end:.1f}s] {text}\n"
-        else:
-            # No segments, use full text with estimated timestamps
-            # Split by sentences and estimate timing
-            sentences = full_text.split(". ")
-            duration_per_sentence = 5.0  # Rough estimate
-            current_time = 0.0
-            for sentence in sentences:
-                if sentence.strip():
-                    sentence = sentence.strip() + "."
-                    end_time = current_time + duration_per_sentence
-                    formatted_transcript += f"[{current_time:.1f}s - {end_time:.1f}s] {sentence}\n"
-                    current_time = end_time
-        
-        # Final check
-        if not formatted_transcript.strip():
-            messagebox.showerror(
-                "Transcription Error",
-                "Could not format transcript properly. The transcription text was:\n\n" +
-                full_text[:200] + "...\n\n" +
-                "Please try again or use a different video."
-            )
-            return
-
-        # Step 3: Ask AI to identify story clips
-        try:
-            messagebox.showinfo(
-                "Processing",
-                "Step 3/3: Identifying complete stories/jokes with AI...\nAlmost done!"
-            )
-            # Use clip length presets as min/max hints
-            clip_length = int(self.clip_length.get() or 0)
-            
-            if clip_length == 0:
-                # Auto mode - let AI decide best length with no constraints
-                min_dur = 15  # Minimum for any joke to make sense
-                max_dur = 600  # Maximum 10 minutes for single clip
-                messagebox.showinfo(
-                    "Auto Mode",
-                    "AI will find complete jokes with NO time constraints.\n"
-                    "Clips can be anywhere from 15 seconds to 10 minutes,\n"
-                    "based purely on joke structure and completeness."
-                )
-            else:
-                # Use selected preset as a hint
-                min_dur = max(10, clip_length - 30)
-                max_dur = clip_length + 60
-
-            clip_specs = self.ai_helper.identify_story_clips(
-                formatted_transcript,
-                min_duration=min_dur,
-                max_duration=max_dur,
-            )
-
-            if not clip_specs:
-                messagebox.showwarning(
-                    "No clips found",
-                    "AI could not identify any suitable clips from the transcript.\n"
-                    "Try a different video or use fixed-length mode."
-                )
-                return
-
-        except Exception as exc:
-            messagebox.showerror("AI analysis failed", str(exc))
-            return
-
-        # Step 4: Create the clips
         intro = self.intro_video.get().strip() if self.use_intro.get() else None
         outro = self.outro_video.get().strip() if self.use_outro.get() else None
         logo = self.logo_image.get().strip() if self.use_logo.get() else None
         logo_pos = self.logo_position.get().strip() or "bottom-right"
-
-        try:
-            created_clips = VideoProcessor.create_smart_clips(
-                input_path=input_path,
-                output_dir=output_dir,
-                clip_specs=clip_specs,
+        # Read every Tk variable here; the worker thread must not touch them
+        clip_length = int(self.clip_length.get() or 0)
+        add_subtitles = self.add_subtitles.get()
+        generate_thumbnails = self.generate_thumbnails.get()
+        thumbnail_method = self.thumbnail_method.get()
+
+        def work(progress, cancel_event):
+            pipeline = SmartClipsPipeline(self.ai_helper, progress=progress, cancel_event=cancel_event)
+            return pipeline.run(
+                input_path,
+                output_dir,
+                clip_length=clip_length,
                 intro_path=intro or None,
                 outro_path=outro or None,
                 logo_path=logo or None,
                 logo_position=logo_pos,
+                add_subtitles=add_subtitles,
+                generate_thumbnails=generate_thumbnails,
+                thumbnail_method=thumbnail_method,
             )
-        except Exception as exc:
-            messagebox.showerror("Error while creating clips", str(exc))
-            return
-
-        # Add subtitles if enabled
-        if self.add_subtitles.get() and segments:
-            messagebox.showinfo(
-                "Processing",
-                "Adding subtitles to video clips...\nThis may take a few minutes."
-            )
-            for clip in created_clips:
-                video_path = clip["path"]
-                start_time = clip["start_time"]
-                end_time = clip["end_time"]
-                
-                # Filter segments that fall within this clip's timeframe
-                clip_segments = []
-                for seg in segments:
-                    seg_start = seg.get("start", 0.0)
-                    seg_end = seg.get("end", 0.0)
-                    
-                    # Check if segment overlaps with clip
-                    if seg_end > start_time and seg_start < end_time:
-                        # Adjust timestamps relative to clip start
-                        adjusted_seg = {
-                            "start": max(0, seg_start - start_time),
-                            "end": min(end_time - start_time, seg_end - start_time),
-                            "text": seg.get("text", "")
-                        }
-                        clip_segments.append(adjusted_seg)
-                
-                # If we have segments, add subtitles
-                if clip_segments:
-                    temp_path = video_path.replace(".mp4", "_temp.mp4")
-                    try:
-                        # Rename original to temp
-                        import shutil
-                        shutil.move(video_path, temp_path)
-                        
-                        # Add subtitles (temp -> final)
-                        VideoProcessor.add_subtitles_to_video(
-                            temp_path,
-                            video_path,
-                            clip_segments
-                        )
-                        
-                        # Remove temp file
-                        if os.path.isfile(temp_path):
-                            os.remove(temp_path)
-                    except Exception as e:
-                        print(f"Error adding subtitles to {video_path}: {str(e)}")
-                        # Restore original if subtitle failed
-                        if os.path.isfile(temp_path):
-                            shutil.move(temp_path, video_path)
-
-        # Generate hashtags and create .txt files for each clip
-        messagebox.showinfo(
-            "Processing",
-            "Generating hashtags and creating description files..."
-        )
-
-        for clip in created_clips:
-            # Generate hashtags for this clip
-            hashtags = self.ai_helper.generate_hashtags(
-                clip["title"],
-                clip["description"]
-            )
-
-            # Create .txt file with same name as video
-            video_path = clip["path"]
-            txt_path = video_path.replace(".mp4", ".txt")
-
-            txt_content = f"""TITLE:
-{clip['title']}
-
-DESCRIPTION:
-{clip['description']}
-
-THUMBNAIL IDEA:
-{clip['thumbnail_idea']}
-
-HASHTAGS:
-{' '.join(hashtags)}
-
----
-YOUTUBE UPLOAD TEXT (copy everything below):
----
-
-{clip['title']}
 
-{clip['description']}
-
-{' '.join(hashtags)}
-"""
+        def done(result, error) -> None:
+            if isinstance(error, NoClipsFoundError):
+                messagebox.showwarning(error.title, str(error))
+            elif isinstance(error, PipelineError):
+                messagebox.showerror(error.title, str(error))
+            elif error is not None:
+                messagebox.showerror("Error while creating clips", str(error))
+            else:
+                self._show_smart_clips_summary(result, output_dir, add_subtitles, generate_thumbnails)
 
-            with open(txt_path, "w", encoding="utf-8") as f:
-                f.write(txt_content)
+        self._start_job(work, done)
 
-            # Add hashtags to clip metadata
-            clip["hashtags"] = hashtags
-            
-            # Generate thumbnail if enabled
-            if self.generate_thumbnails.get():
-                thumbnail_path = video_path.replace(".mp4", "_thumbnail.jpg")
-                
-                # Choose thumbnail generation method
-                method = self.thumbnail_method.get()
-                if method == "ai_generated":
-                    # Use AI-generated thumbnail
-                    ThumbnailGenerator.create_ai_thumbnail(
-                        thumbnail_path,
-                        clip["title"],
-                        clip["description"],
-                        clip.get("thumbnail_idea", "")
-                    )
-                else:
-                    # Use video frame thumbnail (default)
-                    ThumbnailGenerator.create_thumbnail(
-                        video_path,
-                        thumbnail_path,
-                        clip["title"],
-                        clip.get("thumbnail_idea", "")
-                    )
-                
-                clip["thumbnail_path"] = thumbnail_path
+    @staticmethod
+    def _show_smart_clips_summary(
+        result: dict, output_dir: str, add_subtitles: bool, generate_thumbnails: bool
+    ) -> None:
+        created_clips = result["clips"]
+        failed_renders = result["failed"]
 
         # Show results with metadata
         summary = f"Created {len(created_clips)} smart clip(s) in:\n{output_dir}\n\n"
@@ -1794,23 +5909,20 @@ YOUTUBE UPLOAD TEXT (copy everything below):
         # Build feature list
         features = []
         features.append(".txt file with metadata")
-        if self.generate_thumbnails.get():
+        if generate_thumbnails:
             features.append("YouTube thumbnail")
-        if self.add_subtitles.get():
+        if add_subtitles:
             features.append("burned-in subtitles")
         
         summary += f"\n✅ Each clip has: {', '.join(features)}!"
+        if failed_renders:
+            summary += f"\n\n⚠️ {len(failed_renders)} clip(s) failed to render (see console)."
 
         messagebox.showinfo("Smart Clips Done!", summary)
 
-        # Optionally write metadata to a JSON file
-        metadata_path = os.path.join(output_dir, "clips_metadata.json")
-        with open(metadata_path, "w", encoding="utf-8") as f:
-            json.dump(created_clips, f, indent=2, ensure_ascii=False)
-
         messagebox.showinfo(
             "Metadata saved",
-            f"Clip metadata (titles, descriptions, etc.) saved to:\n{metadata_path}"
+            f"Clip metadata (titles, descriptions, etc.) saved to:\n{result['metadata_path']}"
         )
 
     def on_generate_metadata(self) -> None:
@@ -1833,28 +5945,1214 @@ YOUTUBE UPLOAD TEXT (copy everything below):
             )
             return
 
+        def work(progress, cancel_event):
+            progress({"stage": "metadata", "message": "Asking the AI for a title and description..."})
+            # On the shared loop, so Cancel abandons the request itself
+            return AsyncLoopThread.get().run(self.ai_helper.generate_video_metadata_async(context), cancel_event)
+
+        def done(metadata, error) -> None:
+            if error is not None:
+                messagebox.showerror("AI error", str(error))
+                return
+
+            output_text = (
+                "Suggested title:\n" + metadata.get("title", "") + "\n\n"
+                "Suggested description:\n" + metadata.get("description", "") + "\n\n"
+                "Thumbnail idea:\n" + metadata.get("thumbnail_idea", "")
+            )
+
+            self.ai_output.configure(state=NORMAL)
+            self.ai_output.delete("1.0", END)
+            self.ai_output.insert("1.0", output_text)
+            self.ai_output.configure(state=DISABLED)
+
+        self._start_job(work, done)
+
+
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".mkv", ".avi", ".flv")
+
+
+def collect_videos(paths: list[str]) -> list[str]:
+    """Expand files and directories (non-recursive) into a sorted list of videos."""
+    videos = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                full_path = os.path.join(path, name)
+                if os.path.isfile(full_path) and name.lower().endswith(VIDEO_EXTENSIONS):
+                    videos.append(full_path)
+        elif os.path.isfile(path):
+            videos.append(path)
+        else:
+            raise FileNotFoundError(f"Input not found: {path}")
+    return videos
+
+
+# Parameters accepted by run_clip_job (and the job queue API), with defaults.
+# None means required.
+JOB_DEFAULTS = {
+    "input_path": None,
+    "output_dir": None,
+    "clip_length": 0,          # Smart Clips length hint, 0 = Auto
+    "clip_seconds": 0,         # > 0: fixed-length split instead of AI
+    "intro_path": "",
+    "outro_path": "",
+    "logo_path": "",
+    "logo_position": "bottom-right",
+    "add_subtitles": False,
+    "generate_thumbnails": True,
+    "thumbnail_method": "video_frame",
+    "thumbnail_variants": "youtube",  # comma-separated ThumbnailGenerator.VARIANTS
+    "output_targets": "source",  # comma-separated VideoProcessor.OUTPUT_TARGETS
+}
+
+
+def normalize_job_params(params: dict) -> dict:
+    """Validate a job description and fill in defaults. Raises ValueError."""
+    unknown = set(params) - set(JOB_DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown job parameter(s): {', '.join(sorted(unknown))}")
+
+    job = {}
+    for key, default in JOB_DEFAULTS.items():
+        value = params.get(key)
+        if value is None:
+            value = default
+        if value is None:
+            raise ValueError(f"Missing required job parameter: {key}")
+        if isinstance(default, bool):
+            value = bool(value)
+        elif isinstance(default, int):
+            value = int(value)
+        else:
+            value = str(value or "")
+        job[key] = value
+
+    if job["logo_position"] not in ("top-left", "top-right", "bottom-left", "bottom-right"):
+        raise ValueError(f"Invalid logo_position: {job['logo_position']}")
+    if job["thumbnail_method"] not in ("video_frame", "ai_generated"):
+        raise ValueError(f"Invalid thumbnail_method: {job['thumbnail_method']}")
+    variants = [name.strip() for name in job["thumbnail_variants"].split(",") if name.strip()]
+    unknown = [name for name in variants if name not in ThumbnailGenerator.VARIANTS]
+    if unknown or not variants:
+        raise ValueError(f"Invalid thumbnail_variants: {job['thumbnail_variants']}")
+    job["thumbnail_variants"] = ",".join(variants)
+    targets = [name.strip() for name in job["output_targets"].split(",") if name.strip()]
+    unknown = [name for name in targets if name not in VideoProcessor.OUTPUT_TARGETS]
+    if unknown or not targets:
+        raise ValueError(f"Invalid output_targets: {job['output_targets']}")
+    job["output_targets"] = ",".join(targets)
+    return job
+
+
+def _split_progress(progress):
+    """Adapt split_video's encode callback to pipeline-style "encode" events."""
+    if progress is None:
+        return None
+
+    def report(info: dict) -> None:
+        percent = 100 * info["index"] // info["total"] if info["total"] else 0
+        progress({"stage": "encode", "message": f"Rendering clip {info['clip']}/{info['clips']}: {percent}%", **info})
+    return report
+
+
+def run_clip_job(
+    params: dict,
+    ai_helper: "AIHelper | None" = None,
+    progress=None,
+    cancel_event: threading.Event | None = None,
+    shared_limits: dict | None = None,
+    render_workers: int | None = None,
+    ai_workers: int | None = None,
+    render_queue: "SharedRenderQueue | None" = None,
+) -> dict:
+    """Run one clip job described by a JSON-friendly dict (see JOB_DEFAULTS).
+
+    Used by the batch CLI and the job queue workers. Returns a
+    JSON-serialisable summary with 'clips' (output paths), 'failed',
+    'errors', 'metadata_path', 'timings' and 'source_duration'.
+    """
+    job = normalize_job_params(params)
+    if not os.path.isfile(job["input_path"]):
+        raise FileNotFoundError(f"Input video not found: {job['input_path']}")
+
+    shared_limits = shared_limits or {}
+    source_duration = VideoProcessor.get_duration(job["input_path"])
+
+    if job["clip_seconds"] > 0:
+        started = time.perf_counter()
+        render_limit = shared_limits.get("render")
+        if render_limit is not None:
+            render_limit.acquire()
+        try:
+            with profiler.stage("split_video", job["output_dir"]):
+                clips = VideoProcessor.split_video(
+                    input_path=job["input_path"],
+                    output_dir=job["output_dir"],
+                    clip_length_seconds=job["clip_seconds"],
+                    intro_path=job["intro_path"] or None,
+                    outro_path=job["outro_path"] or None,
+                    logo_path=job["logo_path"] or None,
+                    logo_position=job["logo_position"],
+                    output_prefix="clip",
+                    progress=_split_progress(progress),
+                    cancel_event=cancel_event,
+                )
+        except RenderCancelled as exc:
+            raise PipelineCancelled() from exc
+        finally:
+            if render_limit is not None:
+                render_limit.release()
+        return {
+            "clips": clips,
+            "failed": [],
+            "errors": {},
+            "metadata_path": None,
+            "timings": {"split": time.perf_counter() - started},
+            "source_duration": source_duration,
+        }
+
+    if ai_helper is None:
+        ai_helper = AIHelper()
+    pipeline = SmartClipsPipeline(
+        ai_helper,
+        progress=progress,
+        render_workers=render_workers,
+        ai_workers=ai_workers,
+        shared_limits=shared_limits,
+        cancel_event=cancel_event,
+        render_queue=render_queue,
+    )
+    result = pipeline.run(
+        job["input_path"],
+        job["output_dir"],
+        clip_length=job["clip_length"],
+        intro_path=job["intro_path"] or None,
+        outro_path=job["outro_path"] or None,
+        logo_path=job["logo_path"] or None,
+        logo_position=job["logo_position"],
+        add_subtitles=job["add_subtitles"],
+        generate_thumbnails=job["generate_thumbnails"],
+        thumbnail_method=job["thumbnail_method"],
+        thumbnail_variants=job["thumbnail_variants"].split(","),
+        output_targets=job["output_targets"].split(","),
+    )
+    return {
+        "clips": [clip["path"] for clip in result["clips"]],
+        "failed": result["failed"],
+        "errors": result["errors"],
+        "metadata_path": result["metadata_path"],
+        "timings": result["timings"],
+        "source_duration": source_duration,
+    }
+
+
+class JobQueue:
+    """SQLite-backed queue of clip jobs shared by the API and worker processes.
+
+    Every call opens its own connection, so one JobQueue can be used from
+    the HTTP server's threads and separate worker processes at once. Jobs
+    move queued -> running -> done/failed/cancelled; higher `priority` runs
+    first, ties in submission order.
+    """
+
+    STATUSES = ("queued", "running", "done", "failed", "cancelled")
+
+    def __init__(self, db_path: str) -> None:
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    priority INTEGER NOT NULL DEFAULT 0,
+                    params TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    worker TEXT,
+                    progress TEXT,
+                    result TEXT,
+                    error TEXT,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, priority DESC, id)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        import sqlite3
+
+        # sqlite3's own context manager only ends the transaction; the
+        # connection has to be closed explicitly.
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _row_to_job(row) -> dict:
+        job = dict(row)
+        for key in ("params", "result"):
+            if job[key]:
+                job[key] = json.loads(job[key])
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        if job["started_at"]:
+            job["wait_seconds"] = job["started_at"] - job["created_at"]
+        if job["started_at"] and job["finished_at"]:
+            job["run_seconds"] = job["finished_at"] - job["started_at"]
+        return job
+
+    def submit(self, params: dict, priority: int = 0) -> int:
+        params = normalize_job_params(params)
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO jobs (params, priority, created_at) VALUES (?, ?, ?)",
+                (json.dumps(params), int(priority), time.time()),
+            )
+            return cursor.lastrowid
+
+    def get(self, job_id: int) -> dict | None:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def list(self, status: str | None = None, limit: int = 100) -> list[dict]:
+        with self._connect() as conn:
+            if status:
+                rows = conn.execute(
+                    "SELECT * FROM jobs WHERE status = ? ORDER BY id DESC LIMIT ?", (status, limit)
+                ).fetchall()
+            else:
+                rows = conn.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def claim(self, worker: str) -> dict | None:
+        """Atomically take the next queued job for `worker`, or return None."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT id FROM jobs WHERE status = 'queued' ORDER BY priority DESC, id LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', worker = ?, started_at = ? WHERE id = ?",
+                    (worker, time.time(), row["id"]),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return self.get(row["id"])
+
+    def _finish(self, job_id: int, status: str, result: dict | None = None, error: str | None = None) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, result = ?, error = ? WHERE id = ?",
+                (status, time.time(), json.dumps(result) if result is not None else None, error, job_id),
+            )
+
+    def complete(self, job_id: int, result: dict) -> None:
+        self._finish(job_id, "done", result=result)
+
+    def fail(self, job_id: int, error: str) -> None:
+        self._finish(job_id, "failed", error=error)
+
+    def mark_cancelled(self, job_id: int) -> None:
+        self._finish(job_id, "cancelled", error="Cancelled")
+
+    def set_progress(self, job_id: int, progress: dict) -> None:
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET progress = ? WHERE id = ?", (json.dumps(progress), job_id))
+
+    def cancel(self, job_id: int) -> dict | None:
+        """Cancel a queued job now, or ask the worker to stop a running one."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ?, error = 'Cancelled' "
+                "WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id),
+            )
+            conn.execute(
+                "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'", (job_id,)
+            )
+        return self.get(job_id)
+
+    def is_cancel_requested(self, job_id: int) -> bool:
+        with self._connect() as conn:
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    def set_priority(self, job_id: int, priority: int) -> dict | None:
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET priority = ? WHERE id = ?", (int(priority), job_id))
+        return self.get(job_id)
+
+    def fail_running(self, worker: str | None = None, error: str = "Worker exited") -> int:
+        """Fail jobs left running by a dead worker (or by any worker if None)."""
+        with self._connect() as conn:
+            if worker is None:
+                cursor = conn.execute(
+                    "UPDATE jobs SET status = 'failed', finished_at = ?, error = ? WHERE status = 'running'",
+                    (time.time(), error),
+                )
+            else:
+                cursor = conn.execute(
+                    "UPDATE jobs SET status = 'failed', finished_at = ?, error = ? "
+                    "WHERE status = 'running' AND worker = ?",
+                    (time.time(), error, worker),
+                )
+            return cursor.rowcount
+
+    def stats(self) -> dict:
+        """Queue depth, counts per status and timing averages of finished jobs."""
+        with self._connect() as conn:
+            counts = dict.fromkeys(self.STATUSES, 0)
+            for row in conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status"):
+                counts[row["status"]] = row["n"]
+            timing = conn.execute(
+                "SELECT AVG(started_at - created_at) AS wait, AVG(finished_at - started_at) AS run, "
+                "MAX(finished_at - started_at) AS max_run "
+                "FROM jobs WHERE status = 'done'"
+            ).fetchone()
+            oldest = conn.execute(
+                "SELECT MIN(created_at) AS oldest FROM jobs WHERE status = 'queued'"
+            ).fetchone()
+        return {
+            "queue_depth": counts["queued"],
+            "running": counts["running"],
+            "counts": counts,
+            "avg_wait_seconds": timing["wait"],
+            "avg_run_seconds": timing["run"],
+            "max_run_seconds": timing["max_run"],
+            "oldest_queued_age_seconds": time.time() - oldest["oldest"] if oldest["oldest"] else None,
+        }
+
+
+def run_job_worker(
+    db_path: str,
+    worker_name: str,
+    poll_interval: float = 1.0,
+    render_queue_dir: str | None = None,
+    metrics_dir: str | None = None,
+    trace_dir: str | None = None,
+    profile: bool = False,
+    memory_limit_mb: int = 0,
+    loudness_target: float = VideoProcessor.loudness_target,
+    hedge_percentile: float = AIHelper.hedge_policy.percentile,
+    hedge_fallback: float = AIHelper.hedge_policy.fallback_delay,
+) -> None:
+    """Worker process loop: claim jobs from the queue and run them.
+
+    The process stays alive between jobs, so MoviePy/ffmpeg and the AI
+    clients (one AIHelper per worker) are initialised once instead of per
+    video.
+    """
+    metrics.configure(metrics_dir, worker_name)
+    tracer.configure(trace_dir, worker_name)
+    profiler.configure(profile or profiler.enabled)
+    VideoProcessor.memory_limit_mb = memory_limit_mb
+    VideoProcessor.loudness_target = loudness_target
+    AIHelper.hedge_policy.percentile = hedge_percentile
+    AIHelper.hedge_policy.fallback_delay = hedge_fallback
+    queue = JobQueue(db_path)
+    ai_helper = AIHelper()
+    render_queue = SharedRenderQueue(render_queue_dir) if render_queue_dir else None
+    print(f"[{worker_name}] ready (pid {os.getpid()})", flush=True)
+
+    while True:
+        job = queue.claim(worker_name)
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+
+        job_id = job["id"]
+        print(f"[{worker_name}] job {job_id}: {job['params']['input_path']}", flush=True)
+        cancel_event = threading.Event()
+        finished = threading.Event()
+
+        def watch_cancel() -> None:
+            while not finished.wait(poll_interval):
+                if queue.is_cancel_requested(job_id):
+                    cancel_event.set()
+                    return
+
+        watcher = threading.Thread(target=watch_cancel, name=f"cancel-watch-{job_id}", daemon=True)
+        watcher.start()
+
+        def progress(event: dict) -> None:
+            first_line = event["message"].splitlines()[0] if event["message"] else ""
+            queue.set_progress(job_id, {**event, "message": first_line})
+
         try:
-            metadata = self.ai_helper.generate_video_metadata(context)
+            result = run_clip_job(
+                job["params"],
+                ai_helper,
+                progress=progress,
+                cancel_event=cancel_event,
+                render_queue=render_queue,
+            )
+        except PipelineCancelled:
+            queue.mark_cancelled(job_id)
+            print(f"[{worker_name}] job {job_id} cancelled", flush=True)
         except Exception as exc:
-            messagebox.showerror("AI error", str(exc))
-            return
+            queue.fail(job_id, str(exc))
+            print(f"[{worker_name}] job {job_id} failed: {exc}", flush=True)
+        else:
+            queue.complete(job_id, result)
+            print(f"[{worker_name}] job {job_id} done: {len(result['clips'])} clip(s)", flush=True)
+        finally:
+            finished.set()
+            metrics.export()
+            tracer.export(f"job-{job_id}")
+
+
+def make_job_api_handler(queue: JobQueue):
+    """Build the request handler class for the local job API."""
+    from http.server import BaseHTTPRequestHandler
+
+    class JobAPIHandler(BaseHTTPRequestHandler):
+        """JSON API:
 
-        output_text = (
-            "Suggested title:\n" + metadata.get("title", "") + "\n\n"
-            "Suggested description:\n" + metadata.get("description", "") + "\n\n"
-            "Thumbnail idea:\n" + metadata.get("thumbnail_idea", "")
+        POST /jobs                 submit (job params + optional "priority")
+        GET  /jobs[?status=queued] list jobs
+        GET  /jobs/<id>            job status, progress, timings and result
+        POST /jobs/<id>/cancel     cancel a queued or running job
+        POST /jobs/<id>/priority   {"priority": N}
+        GET  /stats                queue depth and timing averages
+        """
+
+        def _send(self, status: int, payload) -> None:
+            body = json.dumps(payload, indent=2).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _read_json(self) -> dict:
+            length = int(self.headers.get("Content-Length") or 0)
+            data = json.loads(self.rfile.read(length) or b"{}") if length else {}
+            if not isinstance(data, dict):
+                raise ValueError("Request body must be a JSON object")
+            return data
+
+        def _job_or_404(self, job_id: str):
+            job = queue.get(int(job_id)) if job_id.isdigit() else None
+            if job is None:
+                self._send(404, {"error": f"No such job: {job_id}"})
+            return job
+
+        def do_GET(self) -> None:
+            from urllib.parse import urlparse, parse_qs
+
+            url = urlparse(self.path)
+            parts = [part for part in url.path.split("/") if part]
+            if parts == ["stats"]:
+                self._send(200, queue.stats())
+            elif parts == ["jobs"]:
+                status = parse_qs(url.query).get("status", [None])[0]
+                self._send(200, queue.list(status=status))
+            elif len(parts) == 2 and parts[0] == "jobs":
+                job = self._job_or_404(parts[1])
+                if job is not None:
+                    self._send(200, job)
+            else:
+                self._send(404, {"error": "Not found"})
+
+        def do_POST(self) -> None:
+            parts = [part for part in self.path.split("?")[0].split("/") if part]
+            try:
+                data = self._read_json()
+                if parts == ["jobs"]:
+                    priority = int(data.pop("priority", 0))
+                    if not os.path.isfile(str(data.get("input_path", ""))):
+                        raise ValueError(f"Input video not found: {data.get('input_path')}")
+                    job_id = queue.submit(data, priority=priority)
+                    self._send(201, queue.get(job_id))
+                elif len(parts) == 3 and parts[0] == "jobs" and parts[2] in ("cancel", "priority"):
+                    if self._job_or_404(parts[1]) is None:
+                        return
+                    if parts[2] == "cancel":
+                        self._send(200, queue.cancel(int(parts[1])))
+                    else:
+                        self._send(200, queue.set_priority(int(parts[1]), int(data["priority"])))
+                else:
+                    self._send(404, {"error": "Not found"})
+            except (ValueError, KeyError, TypeError) as exc:
+                self._send(400, {"error": str(exc)})
+
+        def log_message(self, format: str, *args) -> None:
+            print(f"[api] {self.address_string()} {format % args}", flush=True)
+
+    return JobAPIHandler
+
+
+def run_serve(args) -> int:
+    """`serve` subcommand: job queue daemon with warm workers and a local HTTP API."""
+    import multiprocessing
+    from http.server import ThreadingHTTPServer
+
+    queue = JobQueue(args.db)
+    stale = queue.fail_running(error="Daemon restarted while the job was running")
+    if stale:
+        print(f"Marked {stale} interrupted job(s) as failed")
+
+    def start_worker(name: str):
+        process = multiprocessing.Process(
+            target=run_job_worker,
+            args=(
+                args.db, name, 1.0, args.render_queue, args.metrics_dir, args.trace_dir, args.profile,
+                args.memory_limit, args.loudness_target, args.hedge_percentile, args.hedge_fallback,
+            ),
+            name=name,
+            daemon=True,
         )
+        process.start()
+        return process
+
+    workers = {f"worker-{i}": start_worker(f"worker-{i}") for i in range(1, args.workers + 1)}
+
+    server = ThreadingHTTPServer((args.host, args.port), make_job_api_handler(queue))
+    server_thread = threading.Thread(target=server.serve_forever, name="job-api", daemon=True)
+    server_thread.start()
+    print(f"Job API listening on http://{args.host}:{args.port} ({args.workers} worker(s), db {args.db})")
+
+    try:
+        # Supervise the workers: a worker that dies (crash, OOM kill) fails
+        # its current job and is replaced.
+        while True:
+            time.sleep(2)
+            for name, process in list(workers.items()):
+                if not process.is_alive():
+                    failed = queue.fail_running(name, error=f"Worker exited with code {process.exitcode}")
+                    print(f"{name} exited ({process.exitcode}); failed {failed} job(s), restarting")
+                    workers[name] = start_worker(name)
+    except KeyboardInterrupt:
+        print("Shutting down...")
+    finally:
+        server.shutdown()
+        for process in workers.values():
+            process.terminate()
+        for process in workers.values():
+            process.join(timeout=10)
+        queue.fail_running(error="Daemon stopped while the job was running")
+    return 0
+
+
+class SharedRenderQueue:
+    """Per-clip render tasks exchanged through a shared directory.
+
+    The coordinator (a Smart Clips pipeline) writes one JSON task per clip
+    into `<root>/tasks`. Render workers on any machine that mounts the same
+    directory claim a task by creating `<root>/leases/<id>.lease` with
+    O_EXCL, keep the lease fresh while rendering, and write
+    `<root>/results/<id>.json` when done. A lease that is not renewed
+    within `lease_seconds` (worker crashed or lost its mount) is reclaimed
+    by the next worker; after `max_attempts` claims the task fails.
+
+    Source, intro/outro, logo and output paths must be valid at the same
+    location on every node. A local directory works as a single-host
+    stand-in for the shared mount. Lease expiry compares wall clocks, so
+    keep the nodes NTP-synchronised. The coordinator gives up on a clip
+    that has no result after `task_timeout` seconds (CLIPS_RENDER_TIMEOUT).
+    """
+
+    task_timeout = float(os.getenv("CLIPS_RENDER_TIMEOUT") or 3600)
+
+    def __init__(self, root: str, lease_seconds: float = 120.0, max_attempts: int = 3) -> None:
+        self.root = root
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        for sub in ("tasks", "leases", "results"):
+            os.makedirs(os.path.join(root, sub), exist_ok=True)
+
+    def _path(self, kind: str, task_id: str) -> str:
+        suffix = {"tasks": ".json", "leases": ".lease", "results": ".json"}[kind]
+        return os.path.join(self.root, kind, task_id + suffix)
+
+    @staticmethod
+    def _write_json(path: str, data: dict) -> None:
+        # Write then rename, so readers never see a half-written file
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(temp_path, path)
+
+    @staticmethod
+    def _read_json(path: str) -> dict | None:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    # ------------- Coordinator side -------------
+    def submit(self, task: dict) -> str:
+        import uuid
+
+        task_id = uuid.uuid4().hex
+        self._write_json(self._path("tasks", task_id), {**task, "id": task_id, "created_at": time.time()})
+        return task_id
+
+    def wait(
+        self,
+        task_id: str,
+        poll_interval: float = 1.0,
+        timeout: float | None = None,
+        cancel_event: threading.Event | None = None,
+    ) -> dict:
+        """Block until the task has a result, then remove its files and return it."""
+        deadline = time.monotonic() + timeout if timeout else None
+        result_path = self._path("results", task_id)
+        while True:
+            result = self._read_json(result_path)
+            if result is not None:
+                self.remove(task_id)
+                return result
+            if cancel_event is not None and cancel_event.is_set():
+                self.remove(task_id)
+                raise PipelineCancelled()
+            if deadline is not None and time.monotonic() > deadline:
+                self.remove(task_id)
+                raise TimeoutError(f"Render task {task_id} did not finish in {timeout}s")
+            time.sleep(poll_interval)
+
+    def remove(self, task_id: str) -> None:
+        for kind in ("tasks", "leases", "results"):
+            try:
+                os.remove(self._path(kind, task_id))
+            except FileNotFoundError:
+                pass
+
+    def render_clip(
+        self,
+        input_path: str,
+        output_dir: str,
+        spec: dict,
+        idx: int,
+        intro_path: str | None = None,
+        outro_path: str | None = None,
+        logo_path: str | None = None,
+        logo_position: str = "bottom-right",
+        subtitle_segments: list[dict] | None = None,
+        output_targets: list[dict] | None = None,
+        cancel_event: threading.Event | None = None,
+    ) -> dict | None:
+        """Remote equivalent of VideoProcessor.create_smart_clip (plus subtitles).
+
+        `subtitle_segments` are transcript segments in source time, as for
+        VideoProcessor.burn_clip_subtitles; `output_targets` are as for
+        create_smart_clip's `targets`.
+        """
+        task_id = self.submit({
+            "input_path": os.path.abspath(input_path),
+            "output_dir": os.path.abspath(output_dir),
+            "spec": spec,
+            "idx": idx,
+            "intro_path": os.path.abspath(intro_path) if intro_path else None,
+            "outro_path": os.path.abspath(outro_path) if outro_path else None,
+            "logo_path": os.path.abspath(logo_path) if logo_path else None,
+            "logo_position": logo_position,
+            "subtitle_segments": subtitle_segments or [],
+            "output_targets": output_targets,
+        })
+        result = self.wait(task_id, timeout=self.task_timeout, cancel_event=cancel_event)
+        if result.get("error"):
+            raise RuntimeError(f"Remote render failed on {result.get('worker')}: {result['error']}")
+        return result.get("clip")
+
+    # ------------- Worker side -------------
+    @staticmethod
+    def _create_exclusive(path: str, data: bytes) -> bool:
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        return True
+
+    def _create_lease(self, task_id: str, worker: str, attempt: int) -> bool:
+        lease = {"worker": worker, "attempt": attempt, "expires_at": time.time() + self.lease_seconds}
+        return self._create_exclusive(self._path("leases", task_id), json.dumps(lease).encode("utf-8"))
+
+    @staticmethod
+    def _lease_snapshot(path: str) -> tuple[bytes, float] | None:
+        """Return the raw contents and mtime of a lease file, or None if there is none."""
+        try:
+            with open(path, "rb") as f:
+                return f.read(), os.fstat(f.fileno()).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def _sorted_tasks(self) -> list[str]:
+        """Task ids, oldest first. Tasks removed while listing are skipped."""
+        tasks = []
+        for entry in os.scandir(os.path.join(self.root, "tasks")):
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                tasks.append((entry.stat().st_mtime, entry.name[: -len(".json")]))
+            except FileNotFoundError:
+                continue
+        return [task_id for _, task_id in sorted(tasks)]
 
-        self.ai_output.configure(state=NORMAL)
-        self.ai_output.delete("1.0", END)
-        self.ai_output.insert("1.0", output_text)
-        self.ai_output.configure(state=DISABLED)
+    def claim(self, worker: str) -> dict | None:
+        """Lease the oldest unclaimed (or expired) task for `worker`."""
+        for task_id in self._sorted_tasks():
+            if os.path.exists(self._path("results", task_id)):
+                continue
+
+            lease_path = self._path("leases", task_id)
+            attempt = 1
+            snapshot = self._lease_snapshot(lease_path)
+            if snapshot is not None:
+                raw, mtime = snapshot
+                try:
+                    lease = json.loads(raw)
+                except ValueError:
+                    lease = None
+                if not isinstance(lease, dict):
+                    # Unreadable: it is being written right now, or its worker
+                    # died before finishing it (or the mount truncated it). Give
+                    # it until lease_seconds after it was written, like a real lease.
+                    lease = {"expires_at": mtime + self.lease_seconds}
+                if lease.get("expires_at", 0) > time.time():
+                    continue
+                # Expired: move it aside first. Only one worker's rename can
+                # succeed, so only one worker reclaims the task.
+                stale_path = f"{lease_path}.stale.{worker}.{os.getpid()}"
+                try:
+                    os.rename(lease_path, stale_path)
+                except FileNotFoundError:
+                    continue
+                # Another worker may have reclaimed the same lease between our
+                # read and the rename, in which case we just moved its fresh
+                # lease. Only go on if the file moved is the one judged expired.
+                moved = self._lease_snapshot(stale_path)
+                if moved != snapshot:
+                    if moved is not None:
+                        self._create_exclusive(lease_path, moved[0])
+                    os.remove(stale_path)
+                    continue
+                os.remove(stale_path)
+                attempt = int(lease.get("attempt", 1)) + 1
 
+            if not self._create_lease(task_id, worker, attempt):
+                continue
+            task = self._read_json(self._path("tasks", task_id))
+            if task is None:  # coordinator removed it meanwhile
+                self.release(task_id, worker)
+                continue
+            if attempt > self.max_attempts:
+                self.report(task_id, worker, {"error": f"Gave up after {self.max_attempts} attempts"})
+                continue
+            task["attempt"] = attempt
+            return task
+        return None
+
+    def renew(self, task_id: str, worker: str) -> bool:
+        """Extend the lease. Returns False if another worker took the task over."""
+        lease_path = self._path("leases", task_id)
+        lease = self._read_json(lease_path)
+        if lease is None or lease.get("worker") != worker:
+            return False
+        lease["expires_at"] = time.time() + self.lease_seconds
+        self._write_json(lease_path, lease)
+        return True
 
-def main() -> None:
+    def release(self, task_id: str, worker: str) -> None:
+        lease = self._read_json(self._path("leases", task_id))
+        if lease is not None and lease.get("worker") == worker:
+            try:
+                os.remove(self._path("leases", task_id))
+            except FileNotFoundError:
+                pass
+
+    def report(self, task_id: str, worker: str, result: dict) -> None:
+        self._write_json(self._path("results", task_id), {**result, "worker": worker})
+
+    def pending_count(self) -> int:
+        tasks_dir = os.path.join(self.root, "tasks")
+        return sum(1 for name in os.listdir(tasks_dir) if name.endswith(".json"))
+
+
+@traced
+def render_shared_task(task: dict, worker: str, cancel_event: threading.Event | None = None) -> dict:
+    """Render one SharedRenderQueue task and return its clip info.
+
+    The clip is rendered into a private folder and moved into place at the
+    end, so a second worker that took over an expired lease can never
+    leave a half-written file at the final path. Setting `cancel_event`
+    stops the render with RenderCancelled.
+    """
+    partial_dir = os.path.join(task["output_dir"], f".partial-{worker}-{os.getpid()}")
+    try:
+        with profiler.stage(f"render_{task['idx']}", task["output_dir"]):
+            clip = VideoProcessor.create_smart_clip(
+                input_path=task["input_path"],
+                output_dir=partial_dir,
+                spec=task["spec"],
+                idx=task["idx"],
+                intro_path=task.get("intro_path"),
+                outro_path=task.get("outro_path"),
+                logo_path=task.get("logo_path"),
+                logo_position=task.get("logo_position", "bottom-right"),
+                targets=None if task.get("subtitle_segments") else task.get("output_targets"),
+                track_crop=bool(task.get("subtitle_segments")) and any(
+                    target.get("crop") == "track" for target in task.get("output_targets") or ()
+                ),
+                cancel_event=cancel_event,
+            )
+            if clip is None:
+                return None
+            if task.get("subtitle_segments"):
+                VideoProcessor.burn_clip_subtitles(
+                    clip, task["subtitle_segments"], targets=task.get("output_targets"),
+                    cancel_event=cancel_event,
+                )
+        output_paths = []
+        for path in clip["output_paths"]:
+            final_path = os.path.join(task["output_dir"], os.path.basename(path))
+            os.replace(path, final_path)
+            output_paths.append(final_path)
+        clip["path"], clip["output_paths"] = output_paths[0], output_paths
+        clip.pop("crop_track", None)
+        return clip
+    finally:
+        import shutil
+        shutil.rmtree(partial_dir, ignore_errors=True)
+
+
+def run_render_worker(args) -> int:
+    """`render-worker` subcommand: render clips from a SharedRenderQueue until stopped."""
+    import socket
+
+    queue = SharedRenderQueue(args.queue, lease_seconds=args.lease_seconds)
+    worker = args.name or f"{socket.gethostname()}-{os.getpid()}"
+    metrics.configure(args.metrics_dir, worker)
+    tracer.configure(args.trace_dir, worker)
+    profiler.configure(args.profile)
+    VideoProcessor.memory_limit_mb = args.memory_limit
+    VideoProcessor.loudness_target = args.loudness_target
+    print(f"[{worker}] watching {args.queue}", flush=True)
+
+    while True:
+        task = queue.claim(worker)
+        if task is None:
+            time.sleep(args.poll)
+            continue
+
+        task_id = task["id"]
+        title = task["spec"].get("title", "")
+        print(f"[{worker}] rendering {task_id[:8]} #{task['idx']} {title!r} (attempt {task['attempt']})", flush=True)
+        done = threading.Event()
+        lost = threading.Event()
+
+        def heartbeat() -> None:
+            while not done.wait(queue.lease_seconds / 3):
+                if not queue.renew(task_id, worker):
+                    # Another worker owns the task now: stop rendering it
+                    print(f"[{worker}] lost lease on {task_id[:8]}", flush=True)
+                    lost.set()
+                    return
+
+        threading.Thread(target=heartbeat, name=f"lease-{task_id[:8]}", daemon=True).start()
+        started = time.perf_counter()
+        try:
+            clip = render_shared_task(task, worker, cancel_event=lost)
+        except Exception as exc:
+            result = {"error": str(exc) or type(exc).__name__}
+            print(f"[{worker}] {task_id[:8]} failed: {exc}", flush=True)
+        else:
+            result = {"clip": clip}
+            print(f"[{worker}] {task_id[:8]} done in {time.perf_counter() - started:.1f}s", flush=True)
+        finally:
+            done.set()
+        if lost.is_set():
+            # The new owner reports the task; a result from us could race it
+            print(f"[{worker}] {task_id[:8]} abandoned", flush=True)
+            continue
+        result["seconds"] = time.perf_counter() - started
+        queue.report(task_id, worker, result)
+        queue.release(task_id, worker)
+        metrics.export()
+        tracer.export(f"{worker}-{task_id[:8]}")
+
+
+def run_batch(args) -> int:
+    """`batch` subcommand: run Smart Clips (or fixed-length splits) for many videos.
+
+    Each video gets its own folder under --output named after the file.
+    Up to --videos run at once; renders and AI calls are capped across all
+    of them by --render-workers and --ai-workers.
+    """
+    videos = collect_videos(args.inputs)
+    if not videos:
+        print("No videos found.")
+        return 1
+
+    ai_helper = None
+    if not args.clip_seconds:
+        ai_helper = AIHelper()
+        if not ai_helper.is_available():
+            print("AI is not configured. Set GEMINI_API_KEY or OPENAI_API_KEY in your .env file.")
+            return 1
+
+    shared_limits = {
+        "render": threading.BoundedSemaphore(args.render_workers),
+        "ai": threading.BoundedSemaphore(args.ai_workers),
+    }
+    render_queue = SharedRenderQueue(args.render_queue) if args.render_queue else None
+    metrics.configure(args.metrics_dir, "batch")
+    tracer.configure(args.trace_dir, "batch")
+    profiler.configure(args.profile)
+    VideoProcessor.memory_limit_mb = args.memory_limit
+    VideoProcessor.loudness_target = args.loudness_target
+    AIHelper.hedge_policy.percentile = args.hedge_percentile
+    AIHelper.hedge_policy.fallback_delay = args.hedge_fallback
+    print_lock = threading.Lock()
+
+    def log(video: str, message: str) -> None:
+        with print_lock:
+            print(f"[{os.path.basename(video)}] {message}", flush=True)
+
+    def progress_logger(video: str):
+        def progress(event: dict) -> None:
+            if event["stage"] == "encode":
+                return
+            if "done" in event:
+                if event["error"] or event["task"].startswith("render_"):
+                    status = f"failed: {event['error']}" if event["error"] else "done"
+                    log(video, f"{event['task']} {status} ({event['done']}/{event['total']} tasks)")
+            else:
+                log(video, event["message"].splitlines()[0])
+        return progress
+
+    def process(video: str) -> dict:
+        name = os.path.splitext(os.path.basename(video))[0]
+        params = {
+            "input_path": video,
+            "output_dir": os.path.join(args.output, name),
+            "clip_length": args.clip_length,
+            "clip_seconds": args.clip_seconds,
+            "intro_path": args.intro,
+            "outro_path": args.outro,
+            "logo_path": args.logo,
+            "logo_position": args.logo_position,
+            "add_subtitles": args.subtitles,
+            "generate_thumbnails": not args.no_thumbnails,
+            "thumbnail_method": args.thumbnail_method,
+            "thumbnail_variants": args.thumbnail_variants,
+            "output_targets": args.output_targets,
+        }
+        started = time.perf_counter()
+        report = {"video": video, "clips": 0, "error": None}
+        try:
+            if args.clip_seconds:
+                log(video, f"splitting into {args.clip_seconds}s clips")
+            result = run_clip_job(
+                params,
+                ai_helper,
+                progress=progress_logger(video),
+                shared_limits=shared_limits,
+                render_workers=args.render_workers,
+                ai_workers=args.ai_workers,
+                render_queue=render_queue,
+            )
+            report["duration"] = result["source_duration"]
+            report["clips"] = len(result["clips"])
+        except Exception as exc:
+            report["error"] = str(exc)
+            log(video, f"FAILED: {str(exc).splitlines()[0] if str(exc) else type(exc).__name__}")
+        report["seconds"] = time.perf_counter() - started
+        if report["error"] is None:
+            log(video, f"finished: {report['clips']} clip(s) in {report['seconds']:.1f}s")
+        return report
+
+    print(f"Processing {len(videos)} video(s), {args.videos} at a time "
+          f"({args.render_workers} render / {args.ai_workers} AI workers)")
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.videos, thread_name_prefix="video") as executor:
+        reports = list(executor.map(process, videos))
+    elapsed = time.perf_counter() - started
+
+    succeeded = [r for r in reports if r["error"] is None]
+    source_seconds = sum(r.get("duration", 0.0) for r in succeeded)
+    total_clips = sum(r["clips"] for r in succeeded)
+    print()
+    print("Summary")
+    print(f"  videos:     {len(succeeded)}/{len(reports)} succeeded")
+    print(f"  clips:      {total_clips}")
+    print(f"  wall time:  {elapsed:.1f}s")
+    print(f"  source:     {source_seconds / 60:.1f} min "
+          f"({source_seconds / elapsed if elapsed else 0:.2f}x realtime)")
+    print(f"  throughput: {len(succeeded) / elapsed * 3600 if elapsed else 0:.1f} videos/h, "
+          f"{total_clips / elapsed * 60 if elapsed else 0:.1f} clips/min")
+    for report in reports:
+        if report["error"] is not None:
+            print(f"  FAILED {report['video']}: {report['error'].splitlines()[0]}")
+    snapshot = metrics.snapshot()
+    encode = snapshot["encode"]
+    if encode["frames"]:
+        print(f"  encoding:   {encode['fps']:.1f} fps, {encode['realtime_factor']:.2f}x realtime")
+    for provider, latency in snapshot["ai"].items():
+        print(f"  {provider + ':':<11} {latency['count']} requests, p50 {latency.get('p50', 0):.2f}s, "
+              f"p90 {latency.get('p90', 0):.2f}s, {latency['errors']} errors")
+    if ai_helper is not None:
+        print(f"  AI calls:   {ai_helper.stats()}")
+    metrics.export()
+    trace_path = tracer.export(f"batch-{time.strftime('%Y%m%d-%H%M%S')}")
+    if trace_path:
+        print(f"  trace:      {trace_path}")
+
+    return 0 if len(succeeded) == len(reports) else 1
+
+
+def build_arg_parser():
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="YouTube & TikTok Clips Manager. Run without a command to open the GUI."
+    )
+    subparsers = parser.add_subparsers(dest="command")
+
+    batch = subparsers.add_parser(
+        "batch",
+        help="Process videos headlessly (no GUI)",
+        description="Run Smart Clips on every video in the given files/directories.",
+    )
+    batch.add_argument("inputs", nargs="+", help="Video files and/or directories of videos")
+    batch.add_argument("-o", "--output", required=True, help="Output folder (one subfolder per video)")
+    batch.add_argument("--videos", type=int, default=2, help="Videos processed concurrently (default: 2)")
+    batch.add_argument("--render-workers", type=int, default=SmartClipsPipeline.RENDER_WORKERS,
+                       help="Concurrent renders across all videos (with --render-queue: "
+                            "render tasks outstanding at once)")
+    batch.add_argument("--ai-workers", type=int, default=SmartClipsPipeline.AI_WORKERS,
+                       help="Concurrent AI requests across all videos")
+    batch.add_argument("--clip-length", type=int, default=0,
+                       help="Smart Clips length hint in seconds (0 = Auto, AI decides)")
+    batch.add_argument("--clip-seconds", type=int, default=0,
+                       help="Use fixed-length splitting into N-second clips instead of AI")
+    batch.add_argument("--intro", help="Intro video to prepend")
+    batch.add_argument("--outro", help="Outro video to append")
+    batch.add_argument("--logo", help="Logo image to overlay")
+    batch.add_argument("--logo-position", default="bottom-right",
+                       choices=["top-left", "top-right", "bottom-left", "bottom-right"])
+    batch.add_argument("--subtitles", action="store_true", help="Burn in subtitles")
+    batch.add_argument("--no-thumbnails", action="store_true", help="Skip thumbnail generation")
+    batch.add_argument("--thumbnail-method", default="video_frame", choices=["video_frame", "ai_generated"])
+    batch.add_argument("--thumbnail-variants", default="youtube",
+                       help=f"Comma-separated frame thumbnail variants: {', '.join(ThumbnailGenerator.VARIANTS)}")
+    batch.add_argument("--output-targets", default="source",
+                       help=f"Comma-separated renditions per Smart Clip: {', '.join(VideoProcessor.OUTPUT_TARGETS)}")
+    batch.add_argument("--render-queue", help="Shared directory: hand Smart Clips renders to render-worker nodes")
+    batch.add_argument("--metrics-dir", default=os.getenv("CLIPS_METRICS_DIR"),
+                       help="Write JSON-lines metrics and a Prometheus textfile here (env: CLIPS_METRICS_DIR)")
+    batch.add_argument("--trace-dir", default=os.getenv("CLIPS_TRACE_DIR"),
+                       help="Write Chrome/Perfetto trace files here (env: CLIPS_TRACE_DIR)")
+    batch.add_argument("--profile", action="store_true", default=profiler.enabled,
+                       help="Write cProfile, allocation and peak RSS reports per stage to "
+                            "<output>/profile (env: CLIPS_PROFILE=1)")
+    batch.add_argument("--memory-limit", type=int, default=VideoProcessor.memory_limit_mb, metavar="MB",
+                       help="Render in bounded-memory mode, keeping each encode near MB megabytes "
+                            "(env: CLIPS_MEMORY_LIMIT_MB)")
+    batch.add_argument("--loudness-target", type=float, default=VideoProcessor.loudness_target, metavar="LUFS",
+                       help="Normalize Smart Clips (and intro/outro) to this loudness, e.g. -14 "
+                            "(env: CLIPS_LOUDNESS_TARGET; default 0 keeps the source levels)")
+    batch.add_argument("--hedge-percentile", type=float, default=AIHelper.hedge_policy.percentile, metavar="P",
+                       help="Start Whisper alongside a Gemini transcription slower than the P-th percentile "
+                            "of past ones in this process, keeping the first result; 0 = off (env: CLIPS_HEDGE_PERCENTILE)")
+    batch.add_argument("--hedge-fallback", type=float, default=AIHelper.hedge_policy.fallback_delay,
+                       metavar="SECONDS",
+                       help="With --hedge-percentile, hedge after SECONDS until 5 transcriptions have finished "
+                            "in this process; 0 = wait for them (env: CLIPS_HEDGE_FALLBACK, default 300)")
+    batch.set_defaults(func=run_batch)
+
+    serve = subparsers.add_parser(
+        "serve",
+        help="Run the job queue daemon with a local HTTP API",
+        description="Store jobs in SQLite and process them with long-lived worker processes.",
+    )
+    serve.add_argument("--db", default="clips_jobs.db", help="SQLite queue file (default: clips_jobs.db)")
+    serve.add_argument("--workers", type=int, default=2, help="Worker processes (default: 2)")
+    serve.add_argument("--host", default="127.0.0.1", help="API bind address (default: 127.0.0.1)")
+    serve.add_argument("--port", type=int, default=8765, help="API port (default: 8765)")
+    serve.add_argument("--render-queue", help="Shared directory: hand Smart Clips renders to render-worker nodes")
+    serve.add_argument("--metrics-dir", default=os.getenv("CLIPS_METRICS_DIR"),
+                       help="Write JSON-lines metrics and a Prometheus textfile here (env: CLIPS_METRICS_DIR)")
+    serve.add_argument("--trace-dir", default=os.getenv("CLIPS_TRACE_DIR"),
+                       help="Write Chrome/Perfetto trace files here (env: CLIPS_TRACE_DIR)")
+    serve.add_argument("--profile", action="store_true", default=profiler.enabled,
+                       help="Write cProfile, allocation and peak RSS reports per stage to "
+                            "<output>/profile (env: CLIPS_PROFILE=1)")
+    serve.add_argument("--memory-limit", type=int, default=VideoProcessor.memory_limit_mb, metavar="MB",
+                       help="Render in bounded-memory mode, keeping each encode near MB megabytes "
+                            "(env: CLIPS_MEMORY_LIMIT_MB)")
+    serve.add_argument("--loudness-target", type=float, default=VideoProcessor.loudness_target, metavar="LUFS",
+                       help="Normalize Smart Clips (and intro/outro) to this loudness, e.g. -14 "
+                            "(env: CLIPS_LOUDNESS_TARGET; default 0 keeps the source levels)")
+    serve.add_argument("--hedge-percentile", type=float, default=AIHelper.hedge_policy.percentile, metavar="P",
+                       help="Start Whisper alongside a Gemini transcription slower than the P-th percentile "
+                            "of past ones in this process, keeping the first result; 0 = off (env: CLIPS_HEDGE_PERCENTILE)")
+    serve.add_argument("--hedge-fallback", type=float, default=AIHelper.hedge_policy.fallback_delay,
+                       metavar="SECONDS",
+                       help="With --hedge-percentile, hedge after SECONDS until 5 transcriptions have finished "
+                            "in this process; 0 = wait for them (env: CLIPS_HEDGE_FALLBACK, default 300)")
+    serve.set_defaults(func=run_serve)
+
+    render_worker = subparsers.add_parser(
+        "render-worker",
+        help="Render clips from a shared-directory render queue",
+        description="Claim per-clip render tasks from a shared directory, render them and report back.",
+    )
+    render_worker.add_argument("queue", help="Shared queue directory (same path as the coordinator's --render-queue)")
+    render_worker.add_argument("--name", help="Worker name (default: hostname-pid)")
+    render_worker.add_argument("--lease-seconds", type=float, default=120.0,
+                               help="Lease length; renewed every third of it while rendering")
+    render_worker.add_argument("--poll", type=float, default=2.0, help="Seconds between queue scans when idle")
+    render_worker.add_argument("--metrics-dir", default=os.getenv("CLIPS_METRICS_DIR"),
+                               help="Write JSON-lines metrics and a Prometheus textfile here (env: CLIPS_METRICS_DIR)")
+    render_worker.add_argument("--trace-dir", default=os.getenv("CLIPS_TRACE_DIR"),
+                               help="Write Chrome/Perfetto trace files here (env: CLIPS_TRACE_DIR)")
+    render_worker.add_argument("--profile", action="store_true", default=profiler.enabled,
+                               help="Write cProfile, allocation and peak RSS reports per stage to "
+                                    "<output>/profile (env: CLIPS_PROFILE=1)")
+    render_worker.add_argument("--memory-limit", type=int, default=VideoProcessor.memory_limit_mb, metavar="MB",
+                               help="Render in bounded-memory mode, keeping each encode near MB megabytes "
+                                    "(env: CLIPS_MEMORY_LIMIT_MB)")
+    render_worker.add_argument("--loudness-target", type=float, default=VideoProcessor.loudness_target, metavar="LUFS",
+                               help="Normalize Smart Clips (and intro/outro) to this loudness, e.g. -14 "
+                                    "(env: CLIPS_LOUDNESS_TARGET; default 0 keeps the source levels)")
+    render_worker.set_defaults(func=run_render_worker)
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = build_arg_parser().parse_args(argv)
+    if args.command is not None:
+        raise SystemExit(args.func(args))
+
+    if Tk is None:
+        raise SystemExit("Tkinter is not available. Use `python app.py batch --help` for headless mode.")
+    metrics.configure(os.getenv("CLIPS_METRICS_DIR"), "gui")
+    tracer.configure(os.getenv("CLIPS_TRACE_DIR"), "gui")
     root = Tk()
     app = ClipsApp(root)
     root.mainloop()
+    metrics.export()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,492 @@
+"""Benchmarks for the rendering and thumbnail hot paths.
+
+Synthetic fixture videos (moving colour bars with a tone, speech-like
+noise or no audio track) are generated locally with ffmpeg at several
+resolutions and lengths and cached in benchmarks/fixtures/. Each case
+runs VideoProcessor / ThumbnailGenerator on them with the AI stubbed out,
+and the timings are written as JSON so runs on the same hardware can be
+compared over time:
+
+    python benchmarks/bench.py                      # default matrix
+    python benchmarks/bench.py --quick              # one small fixture, one run
+    python benchmarks/bench.py --full --repeat 5 -o results/m2.json
+    python benchmarks/bench.py --case split_video --case extract_audio
+    python benchmarks/bench.py --compare before.json after.json
+    python benchmarks/bench.py --check-bounded      # exit 1 if bounded RSS grows with length
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+# The stubbed AI answers instantly; don't let the rate limiter pace the runs.
+os.environ.setdefault("GEMINI_RPM", "1000000")
+
+import app  # noqa: E402
+
+FIXTURE_DIR = os.path.join(BENCH_DIR, "fixtures")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+RESOLUTIONS = {"360p": (640, 360), "720p": (1280, 720), "1080p": (1920, 1080)}
+FPS = 25
+
+# (resolution, seconds, audio) per matrix. audio is "tone", "speech" or "none".
+MATRICES = {
+    "quick": [("360p", 10, "tone")],
+    "default": [
+        ("360p", 10, "tone"),
+        ("360p", 30, "tone"),
+        ("720p", 10, "tone"),
+        ("720p", 30, "speech"),
+        ("720p", 10, "none"),
+    ],
+    "full": [
+        ("360p", 10, "tone"),
+        ("360p", 30, "tone"),
+        ("720p", 10, "tone"),
+        ("720p", 30, "speech"),
+        ("720p", 60, "speech"),
+        ("720p", 10, "none"),
+        ("1080p", 10, "tone"),
+        ("1080p", 30, "speech"),
+    ],
+}
+
+# Memory ceiling for the bounded_render case
+BOUNDED_LIMIT_MB = 256
+# bounded_render fails the run if a longer fixture peaks this much above the
+# shortest one at the same resolution
+BOUNDED_TOLERANCE_MB = 32
+# Fixtures for --check-bounded: one resolution, lengths far enough apart that
+# memory growing with the source would show
+BOUNDED_CHECK = [("360p", 10, "tone"), ("360p", 60, "tone")]
+
+AI_THUMBNAIL_DESIGN = json.dumps(
+    {"bg_color": "#FF6B00", "text_color": "#FFFFFF", "emoji": "😂", "text": "Benchmark clip title"}
+)
+
+
+def ffmpeg_binary() -> str:
+    from moviepy.config import get_setting
+
+    return get_setting("FFMPEG_BINARY")
+
+
+def run_ffmpeg(*args: str) -> None:
+    subprocess.run(
+        [ffmpeg_binary(), "-y", "-loglevel", "error", *args],
+        check=True,
+        stdin=subprocess.DEVNULL,
+    )
+
+
+def make_video(path: str, width: int, height: int, seconds: float, audio: str) -> None:
+    """Encode a synthetic clip: testsrc2 colour bars plus the requested audio."""
+    inputs = ["-f", "lavfi", "-i", f"testsrc2=size={width}x{height}:rate={FPS}:duration={seconds}"]
+    filters = []
+    if audio == "tone":
+        inputs += ["-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=44100:duration={seconds}"]
+    elif audio == "speech":
+        # Pink noise gated at a syllable-like rate is closer to speech than a tone
+        inputs += ["-f", "lavfi", "-i", f"anoisesrc=color=pink:amplitude=0.4:sample_rate=44100:duration={seconds}"]
+        filters = ["-af", "volume='0.2+0.8*abs(sin(2*PI*2.5*t))':eval=frame"]
+    codecs = ["-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p"]
+    if audio != "none":
+        codecs += ["-c:a", "aac", "-b:a", "128k", "-shortest"]
+    run_ffmpeg(*inputs, *filters, *codecs, path)
+
+
+def fixture(resolution: str, seconds: int, audio: str) -> dict:
+    """Return the fixture description, generating the video if it is not cached."""
+    width, height = RESOLUTIONS[resolution]
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    name = f"{resolution}_{seconds}s_{audio}"
+    path = os.path.join(FIXTURE_DIR, f"{name}.mp4")
+    if not os.path.isfile(path):
+        print(f"Generating fixture {name}...", flush=True)
+        make_video(path, width, height, seconds, audio)
+    return {
+        "name": name,
+        "path": path,
+        "width": width,
+        "height": height,
+        "seconds": seconds,
+        "audio": audio,
+    }
+
+
+def branding(resolution: str) -> dict:
+    """Intro/outro clips (2 s, tone) and a logo at `resolution`."""
+    width, height = RESOLUTIONS[resolution]
+    intro = os.path.join(FIXTURE_DIR, f"{resolution}_intro.mp4")
+    if not os.path.isfile(intro):
+        make_video(intro, width, height, 2, "tone")
+    logo = os.path.join(FIXTURE_DIR, "logo.png")
+    if not os.path.isfile(logo):
+        run_ffmpeg("-f", "lavfi", "-i", "color=c=0xFF6B00:size=160x90", "-frames:v", "1", logo)
+    return {"intro_path": intro, "outro_path": intro, "logo_path": logo}
+
+
+def clip_specs(seconds: float) -> list[dict]:
+    """Two clips covering the first and last third of the source."""
+    third = seconds / 3
+    return [
+        {"start_time": 0.0, "end_time": third, "title": "First bit", "description": "Opening joke"},
+        {"start_time": 2 * third, "end_time": seconds, "title": "Last bit", "description": "Closer"},
+    ]
+
+
+def subtitle_segments(seconds: float) -> list[dict]:
+    return [
+        {"start": float(t), "end": float(t) + 1.8, "text": f"Synthetic subtitle line {t // 2 + 1}"}
+        for t in range(0, int(seconds) - 1, 2)
+    ]
+
+
+class StubGenerativeModel:
+    """Stands in for genai.GenerativeModel: returns a fixed thumbnail design."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def generate_content(self, prompt):
+        return SimpleNamespace(text=AI_THUMBNAIL_DESIGN)
+
+
+# ------------- Cases -------------
+# Each case is called as case(fixture, workdir) and may return extra fields
+# for the result. Raise Skip when a case does not apply to a fixture.
+
+class Skip(Exception):
+    pass
+
+
+def bench_extract_audio(fx: dict, workdir: str) -> dict:
+    if fx["audio"] == "none":
+        raise Skip("fixture has no audio")
+    path = app.VideoProcessor.extract_audio(fx["path"], os.path.join(workdir, "audio.mp3"))
+    return {"output_bytes": os.path.getsize(path)}
+
+
+def bench_extract_audio_buffer(fx: dict, workdir: str) -> dict:
+    if fx["audio"] == "none":
+        raise Skip("fixture has no audio")
+    with app.VideoProcessor.extract_audio_buffer(fx["path"]) as audio:
+        return {"output_bytes": audio.size}
+
+
+def bench_split_video(fx: dict, workdir: str) -> dict:
+    clips = app.VideoProcessor.split_video(fx["path"], workdir, clip_length_seconds=max(1, fx["seconds"] // 3))
+    return {"clips": len(clips)}
+
+
+def bench_keyframe_index(fx: dict, workdir: str) -> dict:
+    app.keyframe_index = app.KeyframeIndex()  # don't time the cached copy
+    keyframes = app.keyframe_index.keyframes(fx["path"])
+    if keyframes is None:
+        raise RuntimeError("could not index the fixture")
+    return {"keyframes": len(keyframes)}
+
+
+def bench_create_smart_clips(fx: dict, workdir: str) -> dict:
+    clips = app.VideoProcessor.create_smart_clips(fx["path"], workdir, clip_specs(fx["seconds"]))
+    return {"clips": len(clips)}
+
+
+def branding_for(fx: dict) -> dict:
+    resolution = next(name for name, size in RESOLUTIONS.items() if size == (fx["width"], fx["height"]))
+    return branding(resolution)
+
+
+def bench_create_smart_clips_branded(fx: dict, workdir: str) -> dict:
+    clips = app.VideoProcessor.create_smart_clips(
+        fx["path"], workdir, clip_specs(fx["seconds"]), **branding_for(fx)
+    )
+    return {"clips": len(clips)}
+
+
+def bench_bounded_render(fx: dict, workdir: str) -> dict:
+    """Render the whole fixture as one clip in bounded-memory mode.
+
+    peak_rss_mb should stay flat across fixture lengths at one resolution.
+    """
+    app.VideoProcessor.memory_limit_mb = BOUNDED_LIMIT_MB
+    app.metrics.configure(workdir, "bench")
+    try:
+        app.VideoProcessor.create_smart_clip(
+            fx["path"], workdir, {"start_time": 0.0, "end_time": fx["seconds"], "title": "whole"}, 1
+        )
+        with open(os.path.join(workdir, "clips-bench.jsonl"), encoding="utf-8") as f:
+            sample = json.loads(f.read().splitlines()[-1])
+    finally:
+        app.metrics.configure(None)
+        app.VideoProcessor.memory_limit_mb = 0
+    return {
+        "peak_rss_mb": round(sample["peak_rss"] / 2**20, 1),
+        "encode_memory_mb": round(sample["encode_memory"] / 2**20, 1),
+    }
+
+
+def bench_add_subtitles(fx: dict, workdir: str) -> dict:
+    output = os.path.join(workdir, "subtitled.mp4")
+    try:
+        app.VideoProcessor.add_subtitles_to_video(fx["path"], output, subtitle_segments(fx["seconds"]))
+    except OSError as exc:
+        # MoviePy renders subtitle text through ImageMagick
+        if "ImageMagick" in str(exc):
+            raise Skip("ImageMagick is not installed") from exc
+        raise
+    return {"output_bytes": os.path.getsize(output)}
+
+
+def bench_thumbnail(fx: dict, workdir: str) -> dict:
+    output = os.path.join(workdir, "thumb.jpg")
+    if not app.ThumbnailGenerator.create_thumbnail(fx["path"], output, "Benchmark clip title", "big reaction"):
+        raise RuntimeError("create_thumbnail returned False")
+    return {"output_bytes": os.path.getsize(output)}
+
+
+def bench_thumbnails(fx: dict, workdir: str) -> dict:
+    items = [
+        {**spec, "output_path": os.path.join(workdir, f"thumb_{i}.jpg")}
+        for i, spec in enumerate(clip_specs(fx["seconds"]))
+    ]
+    created = app.ThumbnailGenerator.create_thumbnails(fx["path"], items, **branding_for(fx))
+    if not all(created):
+        raise RuntimeError("create_thumbnails failed for some clips")
+    return {"thumbnails": len(items)}
+
+
+def bench_ai_thumbnail(fx: dict, workdir: str) -> dict:
+    output = os.path.join(workdir, "ai_thumb.jpg")
+    if not app.ThumbnailGenerator.create_ai_thumbnail(output, "Benchmark clip title", "A description"):
+        raise RuntimeError("create_ai_thumbnail returned False")
+    return {"output_bytes": os.path.getsize(output)}
+
+
+def bench_startup(fx: dict, workdir: str) -> dict:
+    """Import app.py in a fresh interpreter under -X importtime, then run `app.py --help`."""
+    repo = os.path.dirname(BENCH_DIR)
+    imported = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=repo, capture_output=True, text=True, check=True,
+    )
+    # Lines look like "import time: self [us] | cumulative [us] | name", printed
+    # when each import finishes: a module's own imports come just before it,
+    # indented one level deeper
+    children, imports, total = {}, {}, 0
+    for line in imported.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name, depth = parts[2].strip(), (len(parts[2]) - len(parts[2].lstrip()) - 1) // 2
+        if depth == 1:
+            children[name] = int(parts[1])
+        elif depth == 0:
+            if name == "app":
+                imports, total = children, int(parts[1])
+            children = {}
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "app.py", "--help"], cwd=repo, capture_output=True, check=True)
+    heaviest = sorted(imports.items(), key=lambda item: -item[1])
+    return {
+        "import_ms": round(total / 1000, 1),
+        "help_seconds": round(time.perf_counter() - started, 3),
+        "heaviest_imports_ms": {name: round(us / 1000, 1) for name, us in heaviest[:5]},
+    }
+
+
+CASES = {
+    "extract_audio": bench_extract_audio,
+    "extract_audio_buffer": bench_extract_audio_buffer,
+    "split_video": bench_split_video,
+    "keyframe_index": bench_keyframe_index,
+    "create_smart_clips": bench_create_smart_clips,
+    "create_smart_clips_branded": bench_create_smart_clips_branded,
+    "bounded_render": bench_bounded_render,
+    "add_subtitles_to_video": bench_add_subtitles,
+    "create_thumbnail": bench_thumbnail,
+    "create_thumbnails": bench_thumbnails,
+    "create_ai_thumbnail": bench_ai_thumbnail,
+    "startup": bench_startup,
+}
+
+# Cases that don't depend on the fixture; run once instead of per video.
+FIXTURE_INDEPENDENT = {"create_ai_thumbnail", "startup"}
+
+
+def run_case(name: str, fx: dict, repeat: int) -> dict:
+    result = {"case": name, "fixture": fx["name"], "status": "ok", "runs": []}
+    for _ in range(repeat):
+        workdir = tempfile.mkdtemp(prefix="clips-bench-")
+        try:
+            started = time.perf_counter()
+            extra = CASES[name](fx, workdir) or {}
+            result["runs"].append(time.perf_counter() - started)
+            result.update(extra)
+        except Skip as exc:
+            result.update(status="skipped", reason=str(exc))
+            break
+        except Exception as exc:
+            result.update(status="error", reason=str(exc).splitlines()[0] if str(exc) else type(exc).__name__)
+            break
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if result["runs"]:
+        result["median"] = statistics.median(result["runs"])
+        result["min"] = min(result["runs"])
+        if name not in FIXTURE_INDEPENDENT:
+            result["realtime_factor"] = fx["seconds"] / result["median"]
+    return result
+
+
+def bounded_regressions(results: list[dict], fixtures: list[dict]) -> list[str]:
+    """Compare bounded_render peaks across fixture lengths at each resolution.
+
+    Returns a message for every fixture whose peak RSS is more than
+    BOUNDED_TOLERANCE_MB above the shortest fixture of its resolution.
+    """
+    by_name = {fx["name"]: fx for fx in fixtures}
+    groups = {}
+    for result in results:
+        if result["case"] == "bounded_render" and result["status"] == "ok":
+            fx = by_name[result["fixture"]]
+            groups.setdefault((fx["width"], fx["height"]), []).append((fx["seconds"], result))
+    failures = []
+    for runs in groups.values():
+        runs.sort(key=lambda run: run[0])
+        shortest_seconds, shortest = runs[0]
+        for seconds, result in runs[1:]:
+            growth = result["peak_rss_mb"] - shortest["peak_rss_mb"]
+            if growth > BOUNDED_TOLERANCE_MB:
+                failures.append(
+                    f"bounded_render: {result['fixture']} peaked {growth:.0f} MB above "
+                    f"{shortest['fixture']} ({seconds}s vs {shortest_seconds}s, "
+                    f"tolerance {BOUNDED_TOLERANCE_MB} MB)"
+                )
+    return failures
+
+
+def machine_info() -> dict:
+    try:
+        import moviepy
+        moviepy_version = moviepy.__version__
+    except Exception:
+        moviepy_version = None
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(BENCH_DIR),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "moviepy": moviepy_version,
+        "git_commit": commit,
+    }
+
+
+def compare(before_path: str, after_path: str) -> int:
+    """Print median timings of two result files side by side."""
+    with open(before_path, encoding="utf-8") as f:
+        before = {(r["case"], r["fixture"]): r for r in json.load(f)["results"]}
+    with open(after_path, encoding="utf-8") as f:
+        after = {(r["case"], r["fixture"]): r for r in json.load(f)["results"]}
+
+    print(f"{'case':<28} {'fixture':<18} {'before':>9} {'after':>9} {'change':>8}")
+    for key in sorted(before.keys() & after.keys()):
+        old, new = before[key].get("median"), after[key].get("median")
+        if old is None or new is None:
+            continue
+        print(f"{key[0]:<28} {key[1]:<18} {old:>8.2f}s {new:>8.2f}s {(new - old) / old:>+8.1%}")
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the clip rendering hot paths on synthetic media.")
+    size = parser.add_mutually_exclusive_group()
+    size.add_argument("--quick", action="store_true", help="One small fixture, one run per case")
+    size.add_argument("--full", action="store_true", help="Add 1080p and 60 s fixtures")
+    parser.add_argument("--repeat", type=int, help="Runs per case and fixture (default: 3, 1 with --quick)")
+    parser.add_argument("--case", action="append", choices=sorted(CASES), help="Only run this case (repeatable)")
+    parser.add_argument("-o", "--output", help="Result file (default: benchmarks/results/<host>-<time>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="Compare two result files")
+    parser.add_argument("--check-bounded", action="store_true",
+                        help="Only run bounded_render at two lengths and fail if peak RSS grows with length")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        return compare(*args.compare)
+
+    if not app.load_moviepy():
+        print(f"MoviePy could not be imported: {app.moviepy_import_error!r}")
+        return 1
+
+    matrix = MATRICES["quick" if args.quick else "full" if args.full else "default"]
+    repeat = args.repeat or (1 if args.quick else 3)
+    cases = args.case or list(CASES)
+    if args.check_bounded:
+        matrix, cases, repeat = BOUNDED_CHECK, ["bounded_render"], args.repeat or 1
+    fixtures = [fixture(*entry) for entry in matrix]
+
+    # Stub the AI: the thumbnail designer asks Gemini for colours and text
+    app.genai = SimpleNamespace(GenerativeModel=StubGenerativeModel)
+
+    results = []
+    for name in cases:
+        for fx in fixtures[:1] if name in FIXTURE_INDEPENDENT else fixtures:
+            result = run_case(name, fx, repeat)
+            results.append(result)
+            if result["status"] == "ok":
+                speed = f" ({result['realtime_factor']:.2f}x realtime)" if "realtime_factor" in result else ""
+                if "peak_rss_mb" in result:
+                    speed += f", peak {result['peak_rss_mb']:.0f} MB"
+                if "import_ms" in result:
+                    speed += f" (import app {result['import_ms']:.0f} ms)"
+                print(f"{name:<28} {fx['name']:<18} {result['median']:>7.2f}s{speed}", flush=True)
+            else:
+                print(f"{name:<28} {fx['name']:<18} {result['status']}: {result['reason']}", flush=True)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "machine": machine_info(),
+        "repeat": repeat,
+        "fixtures": fixtures,
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{platform.node() or 'host'}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Results written to {output}")
+    failures = bounded_regressions(results, fixtures)
+    for failure in failures:
+        print(failure)
+    return 0 if not failures and all(r["status"] != "error" for r in results) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+# app.py is a single module at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def make_video(tmp_path_factory):
+    """Return a function that encodes a small lavfi clip and returns its path.
+
+    Tests using it are skipped where MoviePy (and so its ffmpeg) is missing.
+    """
+    import app
+
+    if not app.load_moviepy():
+        pytest.skip("MoviePy is not installed")
+    from moviepy.config import get_setting
+
+    directory = tmp_path_factory.mktemp("videos")
+
+    def make(name, seconds, source="testsrc2", size="320x180", fps=25, gop=None, audio=False, extension="mp4"):
+        path = str(directory / f"{name}.{extension}")
+        if os.path.isfile(path):
+            return path
+        separator = ":" if "=" in source else "="
+        args = ["-f", "lavfi", "-i", f"{source}{separator}size={size}:rate={fps}:duration={seconds}"]
+        if audio:
+            args += ["-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=44100:duration={seconds}", "-shortest"]
+        args += ["-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p"]
+        if gop:
+            args += ["-g", str(gop), "-keyint_min", str(gop), "-sc_threshold", "0"]
+        subprocess.run(
+            [get_setting("FFMPEG_BINARY"), "-y", "-loglevel", "error", *args, path],
+            check=True, stdin=subprocess.DEVNULL,
+        )
+        return path
+
+    return make
@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+import app
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class Flaky:
+    """Raise the given errors in turn, then return "ok"."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+@pytest.fixture
+def guard(monkeypatch):
+    monkeypatch.setenv("TEST_RPM", "60000")
+    return app.AICallGuard(max_retries=3, base_delay=0, max_delay=0, breaker_threshold=3, breaker_cooldown=60)
+
+
+@pytest.mark.parametrize("status", [408, 429, 500, 503])
+def test_transient_status_codes(status):
+    assert app.is_transient_error(StatusError(status))
+
+
+@pytest.mark.parametrize("status", [400, 401, 404, 409])
+def test_client_errors_are_not_transient(status):
+    assert not app.is_transient_error(StatusError(status))
+
+
+def test_transient_by_type():
+    assert app.is_transient_error(TimeoutError())
+    assert app.is_transient_error(ConnectionResetError())
+    assert not app.is_transient_error(ValueError("bad"))
+    assert not app.is_transient_error(app.CircuitOpenError("open"))
+
+
+def test_call_retries_transient_errors(guard):
+    func = Flaky(StatusError(503), StatusError(429))
+    assert guard.call("test", "m", func) == "ok"
+    assert func.calls == 3
+    stats = guard.stats()["test"]
+    assert stats["retries"] == 2
+    assert stats["successes"] == 1
+    assert stats["breaker_state"] == "closed"
+
+
+def test_call_does_not_retry_conflicts(guard):
+    func = Flaky(StatusError(409))
+    with pytest.raises(StatusError):
+        guard.call("test", "m", func)
+    assert func.calls == 1
+    assert guard.stats()["test"]["errors"] == 1
+
+
+def test_call_gives_up_after_max_retries(monkeypatch):
+    monkeypatch.setenv("TEST_RPM", "60000")
+    guard = app.AICallGuard(max_retries=2, base_delay=0, max_delay=0, breaker_threshold=10)
+    func = Flaky(*[StatusError(503)] * 5)
+    with pytest.raises(StatusError):
+        guard.call("test", "m", func)
+    assert func.calls == 3
+
+
+def test_breaker_opens_after_threshold(guard):
+    func = Flaky(*[StatusError(503)] * 10)
+    with pytest.raises(StatusError):
+        guard.call("test", "m", func)
+    # The breaker opened on the third failure and stopped the retries
+    assert func.calls == 3
+    assert guard.breaker("test").state == "open"
+    with pytest.raises(app.CircuitOpenError):
+        guard.call("test", "m", func)
+    assert func.calls == 3
+    assert guard.stats()["test"]["rejected"] == 1
+    assert guard.stats()["test"]["breaker_trips"] == 1
+
+
+def test_breaker_half_open_closes_on_success():
+    breaker = app.CircuitBreaker(threshold=1, cooldown=0)
+    breaker.record_failure()
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_call_async_retries(guard):
+    func = Flaky(StatusError(502))
+
+    async def request():
+        return func()
+
+    assert asyncio.run(guard.call_async("test", "m", request)) == "ok"
+    assert func.calls == 2
+    assert guard.stats()["test"]["retries"] == 1
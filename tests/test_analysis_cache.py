@@ -0,0 +1,107 @@
+import threading
+import time
+
+import app
+
+
+def test_each_key_is_analysed_once():
+    cache = app.AnalysisCache(4)
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def analyse():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "result"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("a", analyse))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    started.wait(5)
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == ["result"] * 4
+    assert len(calls) == 1
+    assert cache.get("a", lambda: "again") == "result"
+
+
+def test_other_keys_do_not_wait():
+    cache = app.AnalysisCache(4)
+    release = threading.Event()
+    slow = threading.Thread(target=lambda: cache.get("slow", lambda: release.wait(5)))
+    slow.start()
+    try:
+        started = time.monotonic()
+        assert cache.get("fast", lambda: "fast") == "fast"
+        assert time.monotonic() - started < 1
+    finally:
+        release.set()
+        slow.join(5)
+
+
+def test_failure_reaches_waiters_and_is_not_cached():
+    cache = app.AnalysisCache(4)
+    started = threading.Event()
+    release = threading.Event()
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise RuntimeError("boom")
+
+    errors = []
+
+    def get(analyse):
+        try:
+            cache.get("a", analyse)
+        except RuntimeError as exc:
+            errors.append(str(exc))
+
+    owner = threading.Thread(target=get, args=(failing,))
+    owner.start()
+    started.wait(5)
+    waiter = threading.Thread(target=get, args=(lambda: "unused",))
+    waiter.start()
+    time.sleep(0.1)
+    release.set()
+    owner.join(5)
+    waiter.join(5)
+
+    assert errors == ["boom", "boom"]
+    assert cache.get("a", lambda: "retried") == "retried"
+
+
+def test_keeps_the_latest_keys():
+    cache = app.AnalysisCache(2)
+    for key in "abc":
+        cache.get(key, lambda key=key: key.upper())
+    assert cache.get("a", lambda: "recomputed") == "recomputed"
+    assert cache.get("c", lambda: "recomputed") == "C"
+
+
+def test_crop_track_failure_is_recorded(tmp_path, monkeypatch):
+    source = tmp_path / "broken.mp4"
+    source.write_bytes(b"not a video")
+    tracker = app.CropTracker()
+    records = []
+    monkeypatch.setattr(app.metrics, "record", lambda stage, seconds, **fields: records.append((stage, fields)))
+    monkeypatch.setattr(tracker, "_analyse", lambda path: (_ for _ in ()).throw(RuntimeError("bad input")))
+
+    assert tracker.track(str(source)) is None
+    assert records == [("crop_track", {"source": "broken.mp4", "error": True, "message": "bad input"})]
+    # The failure is cached like a result
+    assert tracker.track(str(source)) is None
+    assert len(records) == 1
+
+
+def test_crop_track_of_a_video(make_video):
+    path = make_video("track", 4)
+    track = app.crop_tracker.track(path)
+    assert len(track) == 4 * app.CropTracker.FPS
+    assert ((track >= 0) & (track <= 1)).all()
@@ -0,0 +1,61 @@
+import os
+
+import pytest
+
+import app
+
+VideoProcessor = app.VideoProcessor
+
+# A longer source may peak this much higher (same margin as bench.py --check-bounded)
+TOLERANCE_MB = 32
+
+
+def render_bounded(path, output_path, limit):
+    with app.VideoFileClip(path) as clip:
+        return VideoProcessor._write_video_frames(
+            clip,
+            [(output_path, VideoProcessor.OUTPUT_TARGETS["source"])],
+            os.path.splitext(output_path)[0] + "_audio.m4a",
+            None,
+            limit,
+        )
+
+
+def test_frames_in_flight_are_bounded(make_video, tmp_path, monkeypatch):
+    from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+
+    path = make_video("bounded_short", 4, size="320x180")
+    counts = {"produced": 0, "written": 0, "in_flight": 0}
+    get_frame = app.VideoFileClip.get_frame
+    write_frame = FFMPEG_VideoWriter.write_frame
+
+    def counting_get_frame(self, t):
+        frame = get_frame(self, t)
+        counts["produced"] += 1
+        counts["in_flight"] = max(counts["in_flight"], counts["produced"] - counts["written"])
+        return frame
+
+    def counting_write_frame(self, frame):
+        write_frame(self, frame)
+        counts["written"] += 1
+
+    monkeypatch.setattr(app.VideoFileClip, "get_frame", counting_get_frame)
+    monkeypatch.setattr(FFMPEG_VideoWriter, "write_frame", counting_write_frame)
+    # 1 MB leaves room for the smallest queue, two 320x180 frames
+    render_bounded(path, str(tmp_path / "out.mp4"), 2**20)
+
+    assert counts["written"] == 4 * 25
+    # The queue, plus the frame being offered and the one being written
+    assert counts["in_flight"] <= 2 + 2
+
+
+@pytest.mark.skipif(app.profiler.current_rss() is None, reason="RSS is not available here")
+def test_encode_memory_does_not_grow_with_length(make_video, tmp_path):
+    short = make_video("bounded_5s", 5, size="640x360", audio=True)
+    long = make_video("bounded_30s", 30, size="640x360", audio=True)
+    limit = 64 * 2**20
+
+    _, short_memory = render_bounded(short, str(tmp_path / "short.mp4"), limit)
+    _, long_memory = render_bounded(long, str(tmp_path / "long.mp4"), limit)
+
+    assert (long_memory - short_memory) / 2**20 <= TOLERANCE_MB
@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+import app
+
+HedgePolicy = app.HedgePolicy
+
+
+def test_disabled_policy_never_hedges():
+    policy = HedgePolicy(0, fallback_delay=30)
+    assert policy.delay("gemini", 60) is None
+
+
+def test_fallback_delay_until_there_is_a_history():
+    policy = HedgePolicy(95, fallback_delay=30)
+    for _ in range(HedgePolicy.MIN_SAMPLES - 1):
+        policy.record("gemini", 6, 60)
+    assert policy.delay("gemini", 60) == 30
+    assert HedgePolicy(95, fallback_delay=1).delay("gemini", 60) == HedgePolicy.MIN_DELAY
+    assert HedgePolicy(95).delay("gemini", 60) is None
+
+
+def test_percentile_of_the_history_scales_with_audio_length():
+    policy = HedgePolicy(50, fallback_delay=30)
+    # 0.1 .. 1.0 seconds of latency per second of audio
+    for tenth in range(1, 11):
+        policy.record("gemini", tenth * 60, 600)
+    assert policy.delay("gemini", 600) == pytest.approx(0.6 * 600)
+    assert policy.delay("gemini", 1200) == pytest.approx(0.6 * 1200)
+    # Never sooner than MIN_DELAY, and other providers have their own history
+    assert policy.delay("gemini", 1) == HedgePolicy.MIN_DELAY
+    assert policy.delay("openai", 600) == 30
+
+
+def test_history_ignores_empty_audio_and_is_bounded():
+    policy = HedgePolicy(50)
+    policy.record("gemini", 5, 0)
+    assert policy.delay("gemini", 60) is None
+    for _ in range(HedgePolicy.MAX_SAMPLES + 10):
+        policy.record("gemini", 1, 1)
+    assert len(policy._samples["gemini"]) == HedgePolicy.MAX_SAMPLES
+
+
+def make_helper(monkeypatch, gemini, whisper, hedge_after=0.05):
+    helper = app.AIHelper.__new__(app.AIHelper)
+    helper.use_gemini = True
+    helper.call_guard = app.AICallGuard()
+    helper.hedge_policy = HedgePolicy(95, fallback_delay=hedge_after)
+    helper.hedge_policy.MIN_DELAY = 0.0
+    monkeypatch.setattr(helper, "_has_openai", lambda: True)
+    monkeypatch.setattr(helper, "_gemini_transcription_async", gemini)
+    monkeypatch.setattr(helper, "_transcribe_with_openai_async", whisper)
+    return helper
+
+
+def transcribe(helper):
+    return asyncio.run(helper._transcribe_with_gemini_async(app.AudioBuffer(duration=60)))
+
+
+async def failing(message, after=0.0):
+    await asyncio.sleep(after)
+    raise RuntimeError(message)
+
+
+def test_hedge_that_finishes_first_wins(monkeypatch):
+    cancelled = []
+
+    async def slow_gemini(audio):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def whisper(audio):
+        return {"text": "from whisper", "segments": []}
+
+    helper = make_helper(monkeypatch, slow_gemini, whisper)
+    assert transcribe(helper)["text"] == "from whisper"
+    assert cancelled == [True]
+    assert helper.call_guard.stats()["gemini"]["hedge_wins"] == 1
+
+
+def test_both_errors_reported_when_gemini_and_hedge_fail(monkeypatch):
+    helper = make_helper(
+        monkeypatch,
+        lambda audio: failing("gemini internal error", after=0.2),
+        lambda audio: failing("whisper quota exceeded"),
+    )
+    with pytest.raises(RuntimeError) as error:
+        transcribe(helper)
+    assert "gemini internal error" in str(error.value)
+    assert "whisper quota exceeded" in str(error.value)
+
+
+def test_both_errors_reported_when_failover_fails(monkeypatch):
+    helper = make_helper(
+        monkeypatch,
+        lambda audio: failing("Gemini timed out", after=0.0),
+        lambda audio: failing("whisper quota exceeded"),
+        hedge_after=5,
+    )
+    monkeypatch.setattr(app, "is_transient_error", lambda exc: True)
+    with pytest.raises(RuntimeError) as error:
+        transcribe(helper)
+    assert "Gemini timed out" in str(error.value)
+    assert "whisper quota exceeded" in str(error.value)
+    assert helper.call_guard.stats()["gemini"]["failovers"] == 1
@@ -0,0 +1,159 @@
+import sqlite3
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return app.JobQueue(str(tmp_path / "jobs.db"))
+
+
+def params(**overrides):
+    return {"input_path": "in.mp4", "output_dir": "out", **overrides}
+
+
+def test_normalize_fills_defaults():
+    job = app.normalize_job_params(params())
+    assert job["input_path"] == "in.mp4"
+    assert job["clip_length"] == 0
+    assert job["add_subtitles"] is False
+    assert job["thumbnail_variants"] == "youtube"
+    assert set(job) == set(app.JOB_DEFAULTS)
+
+
+def test_normalize_coerces_types_and_lists():
+    job = app.normalize_job_params(
+        params(clip_seconds="30", add_subtitles=1, thumbnail_variants=" youtube, preview ,",
+               output_targets="source,vertical")
+    )
+    assert job["clip_seconds"] == 30
+    assert job["add_subtitles"] is True
+    assert job["thumbnail_variants"] == "youtube,preview"
+    assert job["output_targets"] == "source,vertical"
+
+
+@pytest.mark.parametrize(
+    "bad",
+    [
+        {"input_path": None},
+        {"colour": "red"},
+        {"logo_position": "middle"},
+        {"thumbnail_method": "magic"},
+        {"thumbnail_variants": "poster"},
+        {"thumbnail_variants": " , "},
+        {"output_targets": "8k"},
+        {"clip_seconds": "soon"},
+    ],
+)
+def test_normalize_rejects_invalid(bad):
+    with pytest.raises(ValueError):
+        app.normalize_job_params(params(**bad))
+
+
+def test_claim_takes_highest_priority_then_oldest(queue):
+    low = queue.submit(params(), priority=0)
+    high = queue.submit(params(), priority=5)
+    later_low = queue.submit(params(), priority=0)
+
+    claimed = [queue.claim("w1")["id"] for _ in range(3)]
+    assert claimed == [high, low, later_low]
+    assert queue.claim("w1") is None
+
+
+def test_job_lifecycle(queue):
+    job_id = queue.submit(params())
+    assert queue.get(job_id)["status"] == "queued"
+
+    job = queue.claim("w1")
+    assert job["id"] == job_id
+    assert job["status"] == "running"
+    assert job["worker"] == "w1"
+    assert job["wait_seconds"] >= 0
+
+    queue.set_progress(job_id, {"stage": "encode"})
+    queue.complete(job_id, {"clips": ["a.mp4"]})
+    job = queue.get(job_id)
+    assert job["status"] == "done"
+    assert job["progress"] == '{"stage": "encode"}'
+    assert job["result"] == {"clips": ["a.mp4"]}
+    assert job["run_seconds"] >= 0
+
+    stats = queue.stats()
+    assert stats["counts"]["done"] == 1
+    assert stats["queue_depth"] == 0
+
+
+def test_fail_records_error(queue):
+    job_id = queue.submit(params())
+    queue.claim("w1")
+    queue.fail(job_id, "boom")
+    job = queue.get(job_id)
+    assert job["status"] == "failed"
+    assert job["error"] == "boom"
+
+
+def test_cancel_queued_job_is_immediate(queue):
+    job_id = queue.submit(params())
+    job = queue.cancel(job_id)
+    assert job["status"] == "cancelled"
+    assert not job["cancel_requested"]
+    assert queue.claim("w1") is None
+
+
+def test_cancel_running_job_asks_the_worker(queue):
+    job_id = queue.submit(params())
+    queue.claim("w1")
+    assert not queue.is_cancel_requested(job_id)
+
+    job = queue.cancel(job_id)
+    assert job["status"] == "running"
+    assert queue.is_cancel_requested(job_id)
+
+    queue.mark_cancelled(job_id)
+    assert queue.get(job_id)["status"] == "cancelled"
+
+
+def test_fail_running_only_touches_that_worker(queue):
+    first = queue.submit(params())
+    second = queue.submit(params())
+    queue.claim("w1")
+    queue.claim("w2")
+
+    assert queue.fail_running("w1") == 1
+    assert queue.get(first)["status"] == "failed"
+    assert queue.get(first)["error"] == "Worker exited"
+    assert queue.get(second)["status"] == "running"
+
+    assert queue.fail_running() == 1
+    assert queue.get(second)["status"] == "failed"
+
+
+def test_set_priority_reorders(queue):
+    first = queue.submit(params())
+    second = queue.submit(params())
+    queue.set_priority(second, 10)
+    assert queue.claim("w1")["id"] == second
+    assert queue.get(first)["priority"] == 0
+
+
+def test_connections_are_closed(queue, monkeypatch):
+    opened = []
+    connect = sqlite3.connect
+
+    def tracking_connect(*args, **kwargs):
+        conn = connect(*args, **kwargs)
+        opened.append(conn)
+        return conn
+
+    monkeypatch.setattr(sqlite3, "connect", tracking_connect)
+    job_id = queue.submit(params())
+    queue.claim("w1")
+    queue.complete(job_id, {})
+    queue.stats()
+
+    assert opened
+    for conn in opened:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+
+import app
+
+KeyframeIndex = app.KeyframeIndex
+
+FFPROBE_OUTPUT = {
+    "packets": [
+        {"pts": 0, "dts": -1024, "size": "2900", "pos": "48", "flags": "K__"},
+        {"pts": 2048, "dts": -512, "size": "110", "pos": "2948", "flags": "___"},
+        {"pts": 1024, "dts": 0, "size": "95", "flags": "___"},
+        {"dts": 512, "size": "101", "pos": "3153", "flags": "__D"},
+        {"pts": 12800, "dts": 12288, "size": "2700", "pos": "3254", "flags": "K__"},
+    ],
+    "streams": [{"time_base": "1/12800"}],
+}
+
+
+def test_parse_ffprobe_packets():
+    index = KeyframeIndex.parse_ffprobe(FFPROBE_OUTPUT)
+    assert index["pts"].tolist() == [0.0, 0.16, 0.08, 0.04, 1.0]
+    assert index["dts"].tolist() == [-0.08, -0.04, 0.0, 0.04, 0.96]
+    assert index["size"].tolist() == [2900, 110, 95, 101, 2700]
+    assert index["key"].tolist() == [True, False, False, False, True]
+    # Missing positions are -1, a missing pts is taken from the dts
+    assert index["offset"].tolist() == [48, 2948, -1, 3153, 3254]
+
+
+def test_parse_ffprobe_rejects_packets_without_timestamps():
+    data = {"packets": [{"size": "10", "flags": "K__"}], "streams": [{"time_base": "1/25"}]}
+    with pytest.raises(ValueError):
+        KeyframeIndex.parse_ffprobe(data)
+    with pytest.raises(RuntimeError):
+        KeyframeIndex.parse_ffprobe({"packets": [], "streams": [{"time_base": "1/25"}]})
+
+
+@pytest.fixture
+def gop_video(make_video):
+    # A keyframe every second
+    return make_video("gop", 8, gop=25)
+
+
+def test_framecrc_index_without_ffprobe(gop_video, monkeypatch):
+    monkeypatch.setattr(KeyframeIndex, "_ffprobe", staticmethod(lambda: None))
+    index = KeyframeIndex()
+    assert index.keyframes(gop_video).tolist() == [float(second) for second in range(8)]
+    packets = index.index(gop_video)
+    assert len(packets["pts"]) == 8 * 25
+    assert (packets["offset"] == -1).all()
+
+
+def test_ffprobe_index_matches_framecrc(gop_video):
+    if KeyframeIndex._ffprobe() is None:
+        pytest.skip("ffprobe is not installed")
+    probed = KeyframeIndex._analyse(gop_video)
+    listed = KeyframeIndex._analyse_framecrc(gop_video)
+    for field in ("pts", "dts", "size", "key"):
+        assert np.array_equal(probed[field], listed[field]), field
+    assert (probed["offset"] > 0).all()
+
+
+def test_disabled_index_and_failures(tmp_path, monkeypatch):
+    source = tmp_path / "broken.mp4"
+    source.write_bytes(b"not a video")
+    index = KeyframeIndex()
+    monkeypatch.setattr(index, "enabled", False)
+    assert index.index(str(source)) is None
+
+    records = []
+    monkeypatch.setattr(index, "enabled", True)
+    monkeypatch.setattr(app.metrics, "record", lambda stage, seconds, **fields: records.append((stage, fields)))
+    monkeypatch.setattr(index, "_analyse", lambda path: (_ for _ in ()).throw(RuntimeError("no video packets")))
+    assert index.index(str(source)) is None
+    assert records == [("keyframe_index", {"source": "broken.mp4", "error": True, "message": "no video packets"})]
+
+
+@pytest.mark.parametrize(
+    "keyframes, clip_length, duration, cuts",
+    [
+        # Nearest keyframe to every multiple, so errors don't add up
+        ([0, 2.1, 3.9, 6.2, 8, 9.9], 2, 11, [2.1, 3.9, 6.2, 8, 9.9]),
+        # Keyframes further apart than the clip length: no empty chunks
+        ([0, 5, 10], 2, 12, [5, 10]),
+        # Nothing at or past the end
+        ([0, 4, 8], 4, 8, [4]),
+    ],
+)
+def test_copy_cuts(keyframes, clip_length, duration, cuts, monkeypatch):
+    index = KeyframeIndex()
+    monkeypatch.setattr(index, "keyframes", lambda path: np.array(keyframes, dtype=float))
+    assert index.copy_cuts("video.mp4", clip_length, duration) == cuts
+
+
+def test_copy_cuts_without_index(monkeypatch):
+    index = KeyframeIndex()
+    monkeypatch.setattr(index, "enabled", False)
+    assert index.copy_cuts("video.mp4", 2, 10) is None
+
+
+def test_indexed_seeks_return_the_frames_of_a_sequential_read(make_video):
+    from moviepy.editor import VideoFileClip
+
+    path = make_video("seek", 8, gop=50)
+    with VideoFileClip(path, audio=False) as stock:
+        # MoviePy's get_frame is exact when it reads on without seeking
+        frames = [stock.get_frame(n / stock.fps) for n in range(int(stock.duration * stock.fps))]
+    times = [0.0, 0.04, 3.52, 3.56, 1.0, 7.9, 0.5, 5.0, 4.96, 6.0, 2.0, 2.04, 7.96]
+    with VideoFileClip(path, audio=False) as clip:
+        app.keyframe_index.attach(clip)
+        assert clip.reader.keyframes is not None
+        for t in times:
+            assert np.array_equal(clip.get_frame(t), frames[int(t * 25 + 1e-5)]), t
@@ -0,0 +1,30 @@
+import app
+
+
+def test_loudness_of_a_tone(make_video):
+    # lavfi's sine peaks at 1/8 of full scale (-18 dBFS), about -21 LUFS
+    path = make_video("tone", 6, audio=True)
+    index = app.LoudnessIndex()
+
+    integrated, peak = index.loudness(path)
+    assert -23 < integrated < -19
+    assert -19 < peak < -17
+
+    # The gain brings it to the target, within MAX_GAIN_DB
+    assert abs(index.gain(path, -14.0) - 10 ** ((-14.0 - integrated) / 20)) < 1e-3
+    assert abs(index.gain(path, 0.0) - 10 ** (index.MAX_GAIN_DB / 20)) < 1e-3
+
+
+def test_failed_analysis_is_recorded(make_video, monkeypatch):
+    path = make_video("silent_video", 1)
+    records = []
+    monkeypatch.setattr(app.metrics, "record", lambda stage, seconds, **fields: records.append((stage, fields)))
+    index = app.LoudnessIndex()
+
+    assert index.index(path) is None
+    assert index.gain(path, -14.0) == 1.0
+    ((stage, fields),) = records
+    assert stage == "loudness"
+    assert fields["error"] is True
+    assert fields["source"] == "silent_video.mp4"
+    assert fields["message"]
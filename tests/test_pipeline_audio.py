@@ -0,0 +1,78 @@
+import threading
+import time
+
+import pytest
+
+import app
+
+
+class StubAI:
+    """Transcribes by reading the whole audio buffer after `delay` seconds."""
+
+    def __init__(self, delay=0.0, error=None, segments=True):
+        self.delay = delay
+        self.error = error
+        self.segments = segments
+        self.read = None
+
+    def is_available(self):
+        return True
+
+    def returns_segments(self):
+        return self.segments
+
+    def transcribe_audio(self, audio):
+        time.sleep(self.delay)
+        with audio.reader() as f:
+            self.read = len(f.read())
+        if self.error:
+            raise self.error
+        # Empty text stops the run right after transcription
+        return {"text": "", "segments": []}
+
+
+@pytest.fixture
+def closes(monkeypatch):
+    closed = []
+    close = app.AudioBuffer.close
+
+    def counting_close(self):
+        closed.append(threading.current_thread().name)
+        close(self)
+
+    monkeypatch.setattr(app.AudioBuffer, "close", counting_close)
+    return closed
+
+
+def run(ai, make_video, tmp_path):
+    path = make_video("speech", 3, audio=True)
+    with pytest.raises(app.PipelineError) as error:
+        app.SmartClipsPipeline(ai).run(path, str(tmp_path))
+    return error.value
+
+
+def test_audio_stays_open_while_transcription_reads_it(make_video, tmp_path, closes):
+    # The reaction scan of 3 s of audio is long done when the transcription reads
+    ai = StubAI(delay=1.0)
+    error = run(ai, make_video, tmp_path)
+    assert "empty text" in str(error)
+    assert ai.read > 0
+    assert len(closes) == 1
+
+
+def test_audio_closed_once_when_transcription_fails(make_video, tmp_path, closes):
+    ai = StubAI(error=RuntimeError("provider down"))
+    error = run(ai, make_video, tmp_path)
+    assert "provider down" in str(error)
+    for _ in range(50):
+        if closes:
+            break
+        time.sleep(0.1)
+    assert len(closes) == 1
+
+
+def test_audio_closed_without_reaction_scan(make_video, tmp_path, closes):
+    ai = StubAI(segments=False)
+    run(ai, make_video, tmp_path)
+    assert ai.read > 0
+    assert closes == [threading.current_thread().name]
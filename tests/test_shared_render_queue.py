@@ -0,0 +1,147 @@
+import json
+import os
+import time
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return app.SharedRenderQueue(str(tmp_path), lease_seconds=60, max_attempts=3)
+
+
+def read_lease(queue, task_id):
+    with open(queue._path("leases", task_id), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def expire_lease(queue, task_id):
+    lease = read_lease(queue, task_id)
+    lease["expires_at"] = time.time() - 1
+    queue._write_json(queue._path("leases", task_id), lease)
+
+
+def test_claim_report_wait(queue):
+    task_id = queue.submit({"idx": 1})
+    task = queue.claim("w1")
+    assert task["id"] == task_id
+    assert task["attempt"] == 1
+    assert read_lease(queue, task_id)["worker"] == "w1"
+
+    queue.report(task_id, "w1", {"clip": {"path": "a.mp4"}})
+    queue.release(task_id, "w1")
+    assert queue.claim("w2") is None
+
+    result = queue.wait(task_id, poll_interval=0.01, timeout=1)
+    assert result == {"clip": {"path": "a.mp4"}, "worker": "w1"}
+    assert queue.pending_count() == 0
+    assert not os.path.exists(queue._path("results", task_id))
+
+
+def test_claims_oldest_first(queue):
+    first = queue.submit({"idx": 1})
+    second = queue.submit({"idx": 2})
+    past = time.time() - 10
+    os.utime(queue._path("tasks", first), (past, past))
+    assert queue.claim("w1")["id"] == first
+    assert queue.claim("w1")["id"] == second
+    assert queue.claim("w1") is None
+
+
+def test_live_lease_is_not_reclaimed(queue):
+    task_id = queue.submit({"idx": 1})
+    queue.claim("w1")
+    assert queue.claim("w2") is None
+    assert queue.renew(task_id, "w1")
+    assert not queue.renew(task_id, "w2")
+
+
+def test_expired_lease_is_reclaimed(queue):
+    task_id = queue.submit({"idx": 1})
+    queue.claim("w1")
+    expire_lease(queue, task_id)
+
+    task = queue.claim("w2")
+    assert task["id"] == task_id
+    assert task["attempt"] == 2
+    assert read_lease(queue, task_id)["worker"] == "w2"
+    # The first worker finds out on its next heartbeat
+    assert not queue.renew(task_id, "w1")
+
+
+def test_gives_up_after_max_attempts(queue):
+    task_id = queue.submit({"idx": 1})
+    queue.claim("w1")
+    for worker in ("w2", "w3"):
+        expire_lease(queue, task_id)
+        assert queue.claim(worker)["attempt"] in (2, 3)
+    expire_lease(queue, task_id)
+
+    assert queue.claim("w4") is None
+    result = queue.wait(task_id, poll_interval=0.01, timeout=1)
+    assert result["error"] == "Gave up after 3 attempts"
+
+
+def test_unreadable_lease_expires_by_mtime(queue):
+    task_id = queue.submit({"idx": 1})
+    lease_path = queue._path("leases", task_id)
+    with open(lease_path, "w", encoding="utf-8") as f:
+        f.write('{"worker": ')
+    assert queue.claim("w1") is None
+
+    past = time.time() - 120
+    os.utime(lease_path, (past, past))
+    task = queue.claim("w1")
+    assert task["id"] == task_id
+    assert task["attempt"] == 2
+
+
+def test_reclaim_race_keeps_the_winners_lease(queue, monkeypatch):
+    """B judges w1's lease expired, then C reclaims it before B's rename."""
+    task_id = queue.submit({"idx": 1})
+    queue.claim("w1")
+    expire_lease(queue, task_id)
+
+    other = app.SharedRenderQueue(queue.root, lease_seconds=60)
+    snapshot = queue._lease_snapshot
+    reads = []
+
+    def racing_snapshot(path):
+        value = snapshot(path)
+        if not reads:
+            reads.append(path)
+            assert other.claim("C")["attempt"] == 2
+        return value
+
+    monkeypatch.setattr(queue, "_lease_snapshot", racing_snapshot)
+    assert queue.claim("B") is None
+
+    lease = read_lease(queue, task_id)
+    assert lease["worker"] == "C"
+    assert lease["attempt"] == 2
+    assert other.renew(task_id, "C")
+    assert [name for name in os.listdir(os.path.join(queue.root, "leases")) if ".stale." in name] == []
+
+
+def test_claim_skips_task_removed_while_listing(queue, monkeypatch):
+    removed = queue.submit({"idx": 1})
+    kept = queue.submit({"idx": 2})
+    scandir = os.scandir
+
+    def racing_scandir(path):
+        entries = list(scandir(path))
+        queue.remove(removed)
+        return iter(entries)
+
+    monkeypatch.setattr(app.os, "scandir", racing_scandir)
+    assert queue.claim("w1")["id"] == kept
+
+
+def test_wait_times_out_and_removes_task(queue):
+    task_id = queue.submit({"idx": 1})
+    with pytest.raises(TimeoutError):
+        queue.wait(task_id, poll_interval=0.01, timeout=0.05)
+    assert queue.pending_count() == 0
+    assert queue.claim("w1") is None
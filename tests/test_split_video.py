@@ -0,0 +1,46 @@
+import os
+
+import app
+
+VideoProcessor = app.VideoProcessor
+
+
+def test_failed_single_pass_falls_back_to_clip_by_clip(make_video, tmp_path, monkeypatch):
+    path = make_video("split_source", 2, audio=True)
+    records = []
+    record = app.metrics.record
+
+    def failing_segment(*args, **kwargs):
+        raise RuntimeError("ffmpeg segmenting failed: boom")
+
+    def capture(stage, seconds, **kwargs):
+        records.append((stage, kwargs))
+        return record(stage, seconds, **kwargs)
+
+    monkeypatch.setattr(VideoProcessor, "_segment_video", staticmethod(failing_segment))
+    monkeypatch.setattr(app.metrics, "record", capture)
+
+    clips = VideoProcessor.split_video(path, str(tmp_path), 1)
+
+    assert [os.path.basename(clip) for clip in clips] == ["clip_001.mp4", "clip_002.mp4"]
+    assert ("split_fallback", {
+        "error": True, "message": "ffmpeg segmenting failed: boom", "file": "split_source.mp4",
+    }) in records
+
+
+def test_copied_chunks_are_cut_at_the_nearest_keyframes(make_video, tmp_path):
+    from moviepy.editor import VideoFileClip
+
+    # Keyframes every 2 s; the multiples of 3 s are 3 and 6
+    path = make_video("split_gop", 8, gop=50)
+    cuts = app.keyframe_index.copy_cuts(path, 3, 8.0)
+    clips = VideoProcessor.split_video(path, str(tmp_path), 3)
+
+    assert len(clips) == len(cuts) + 1
+    durations = []
+    for clip in clips:
+        with VideoFileClip(clip, audio=False) as video:
+            durations.append(round(video.duration))
+    assert sum(durations) == 8
+    assert [sum(durations[:n]) for n in range(1, len(durations))] == [round(cut) for cut in cuts]
+    assert all(abs(cut - target) <= 1 for cut, target in zip(cuts, (3, 6)))
@@ -0,0 +1,101 @@
+import threading
+import time
+
+import pytest
+
+import app
+
+
+def test_dependencies_run_first_and_receive_results():
+    scheduler = app.TaskScheduler({"io": 2})
+    scheduler.add("a", lambda: 1)
+    scheduler.add("b", lambda: 2)
+    scheduler.add("sum", lambda a, b: a + b, deps=["a", "b"])
+    assert scheduler.run() == {"a": 1, "b": 2, "sum": 3}
+    assert scheduler.errors == {}
+
+
+def test_failure_skips_dependents_only():
+    def boom():
+        raise ValueError("boom")
+
+    done = []
+    scheduler = app.TaskScheduler({"io": 1}, on_task_done=lambda name, error: done.append(name))
+    scheduler.add("bad", boom)
+    scheduler.add("child", lambda value: value, deps=["bad"])
+    scheduler.add("grandchild", lambda value: value, deps=["child"])
+    scheduler.add("other", lambda: "ok")
+    results = scheduler.run()
+
+    assert results == {"other": "ok"}
+    assert isinstance(scheduler.errors["bad"], ValueError)
+    assert "'bad'" in str(scheduler.errors["child"])
+    assert "'child'" in str(scheduler.errors["grandchild"])
+    assert sorted(done) == ["bad", "child", "grandchild", "other"]
+
+
+def test_pool_limits_concurrency():
+    lock = threading.Lock()
+    running = [0]
+    peak = [0]
+
+    def task():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+
+    scheduler = app.TaskScheduler({"render": 2, "io": 4})
+    for i in range(6):
+        scheduler.add(f"render_{i}", task, pool="render")
+    scheduler.run()
+    assert peak[0] == 2
+
+
+def test_shared_limit_is_held_while_running():
+    limit = threading.BoundedSemaphore(1)
+    seen = []
+
+    def task():
+        # The scheduler holds the only slot
+        seen.append(limit.acquire(blocking=False))
+
+    scheduler = app.TaskScheduler({"ai": 2}, shared_limits={"ai": limit})
+    scheduler.add("one", task, pool="ai")
+    scheduler.run()
+    assert seen == [False]
+
+
+def test_cancel_skips_tasks_not_started():
+    cancel = threading.Event()
+    scheduler = app.TaskScheduler({"io": 1}, cancel_event=cancel)
+    scheduler.add("first", cancel.set)
+    scheduler.add("second", lambda value: value, deps=["first"])
+    scheduler.run()
+    assert "first" in scheduler.results
+    assert str(scheduler.errors["second"]) == "Cancelled"
+
+
+def test_add_validates_graph():
+    scheduler = app.TaskScheduler({"io": 1})
+    scheduler.add("a", lambda: None)
+    with pytest.raises(ValueError):
+        scheduler.add("a", lambda: None)
+    with pytest.raises(ValueError):
+        scheduler.add("b", lambda: None, deps=["missing"])
+    with pytest.raises(ValueError):
+        scheduler.add("c", lambda: None, pool="gpu")
+
+
+def test_clip_txt_waits_for_subtitles():
+    pipeline = app.SmartClipsPipeline(ai_helper=None)
+    scheduler, render_tasks = pipeline._build_clip_tasks(
+        "in.mp4", "out", [{"start_time": 0, "end_time": 10, "title": "a"}],
+        segments=[{"start": 0.0, "end": 5.0, "text": "hi"}],
+        intro_path=None, outro_path=None, logo_path=None, logo_position="bottom-right",
+        thumbnail_method=None, thumbnail_variants=[], output_targets=[],
+    )
+    assert render_tasks == ["render_1"]
+    assert scheduler._tasks["txt_1"][1] == ("subtitles_1", "hashtags_1")
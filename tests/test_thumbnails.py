@@ -0,0 +1,105 @@
+import os
+
+import numpy as np
+import pytest
+
+import app
+
+ThumbnailGenerator = app.ThumbnailGenerator
+
+
+@pytest.mark.parametrize(
+    "fraction, expected",
+    [
+        (0.1, ("intro", 1.0)),
+        (0.5, ("main", 13.0)),
+        (0.9, ("outro", 3.0)),
+    ],
+)
+def test_thumbnail_time_maps_the_rendered_clip(fraction, expected):
+    # 2 s intro + 4 s clip (10-14 s in the source) + 4 s outro = 10 s
+    source, timestamp = ThumbnailGenerator.thumbnail_time(10.0, 14.0, 2.0, 4.0, fraction)
+    assert (source, round(timestamp, 6)) == expected
+
+
+def test_thumbnail_time_defaults_to_a_third():
+    assert ThumbnailGenerator.thumbnail_time(0.0, 9.0) == ("main", 3.0)
+
+
+@pytest.fixture
+def branded(make_video):
+    return {
+        "input_path": make_video("main", 8),
+        "intro_path": make_video("intro", 2, source="color=c=red"),
+        "outro_path": make_video("outro", 2, source="color=c=blue"),
+    }
+
+
+def rank_by_position(direction):
+    def score(frames, next_frames):
+        return direction * np.arange(len(frames), dtype=np.float32)
+    return score
+
+
+def test_candidates_span_intro_and_outro(branded, monkeypatch):
+    monkeypatch.setattr(ThumbnailGenerator, "score_frames", staticmethod(rank_by_position(-1)))
+    (first,) = ThumbnailGenerator.best_frame_times(
+        branded["input_path"], [(2.0, 6.0)], 8, branded["intro_path"], branded["outro_path"]
+    )
+    assert first[0] == "intro"
+
+    monkeypatch.setattr(ThumbnailGenerator, "score_frames", staticmethod(rank_by_position(1)))
+    (last,) = ThumbnailGenerator.best_frame_times(
+        branded["input_path"], [(2.0, 6.0)], 8, branded["intro_path"], branded["outro_path"]
+    )
+    assert last[0] == "outro"
+
+
+def test_best_frame_stays_in_range_without_branding(make_video):
+    path = make_video("main", 8)
+    (best,) = ThumbnailGenerator.best_frame_times(path, [(2.0, 6.0)], 6)
+    assert best[0] == "main"
+    assert 2.0 < best[1] < 6.0
+
+
+def count_get_frame(monkeypatch):
+    calls = []
+    attach = app.keyframe_index.attach
+
+    def counting_attach(clip):
+        clip = attach(clip)
+        get_frame = clip.get_frame
+
+        def counted(t):
+            calls.append(t)
+            return get_frame(t)
+
+        clip.get_frame = counted
+        return clip
+
+    monkeypatch.setattr(app.keyframe_index, "attach", counting_attach)
+    return calls
+
+
+def test_shared_frames_are_decoded_once(make_video, monkeypatch):
+    path = make_video("main", 8)
+    calls = count_get_frame(monkeypatch)
+    best = ThumbnailGenerator.best_frame_times(path, [(2.0, 6.0), (2.0, 6.0)], 5)
+    assert best[0] == best[1]
+    # Each candidate and the frame after it, once for both clips
+    assert len(calls) == 2 * 5
+
+
+def test_create_thumbnails_decodes_each_winner_once(branded, make_video, tmp_path, monkeypatch):
+    items = [
+        {"start_time": 2.0, "end_time": 6.0, "title": f"Clip {i}", "output_path": str(tmp_path / f"{i}.jpg")}
+        for i in range(2)
+    ]
+    calls = count_get_frame(monkeypatch)
+    created = ThumbnailGenerator.create_thumbnails(
+        branded["input_path"], items, branded["intro_path"], branded["outro_path"], candidates=4, max_workers=1
+    )
+    assert created == [True, True]
+    assert all(os.path.getsize(item["output_path"]) > 0 for item in items)
+    # 4 candidates (plus their next frames) scored, then the shared winner
+    assert len(calls) == 2 * 4 + 1